@@ -0,0 +1,49 @@
+"""
+Round-trip check of metadata files: BRMFile.serialize, then BRMFile.deserialize with every field
+selected (including visibility and tags, read after the timestamps), must give back the values.
+
+Usage: python bench/brm_roundtrip.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+
+# pylint: disable=wrong-import-position,import-error
+from brickedit import BRMFile, BRMDeserializationConfig, Vec3
+
+CASES = (
+    dict(file_name='Car', description='', brick_count=12, size=Vec3(100.0, 200.0, 50.0),
+         weight=1.5, price=20.0, author=0, visibility=0, tags=[],
+         creation_time=638_000_000_000_000_000, last_update_time=638_000_000_100_000_000),
+    dict(file_name='Camion é', description='Déscription ' * 50, brick_count=65_000,
+         size=Vec3(1.0, 2.0, 3.0), weight=12_345.5, price=0.25, author=76561198000000042,
+         visibility=2, tags=['Vehicle', 'Air', 'bb'],
+         creation_time=2 ** 60, last_update_time=2 ** 60 + 1),
+)
+
+
+def main() -> None:
+    config = BRMDeserializationConfig(
+        version=True, name=True, description=True, brick_count=True, size=True, weight=True,
+        price=True, author=True, creation_time=True, last_update_time=True, visibility=True,
+        tags=True
+    )
+    for case in CASES:
+        data = BRMFile(14).serialize(**case)
+        record = BRMFile(14).deserialize_record(data, config)
+        expected = dict(case, version=14, name=case['file_name'])
+        del expected['file_name']
+        for field in record._fields:
+            value = getattr(record, field)
+            if field in ('weight', 'price'):
+                ok = abs(value - expected[field]) <= 1e-3 * max(1.0, abs(expected[field]))
+            else:
+                ok = value == expected[field]
+            if not ok:
+                sys.exit(f'{field}: read {value!r}, wrote {expected[field]!r}')
+    print(f'{len(CASES)} metadata files round-trip')
+
+
+if __name__ == '__main__':
+    main()
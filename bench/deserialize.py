@@ -0,0 +1,126 @@
+"""
+Deserialization benchmark: best time of BRVFile.deserialize on generated vehicles of 10k, 30k and
+65k bricks (garbage collector off).
+
+Pass a git revision to time the source tree of that revision as well, on the same files, e.g. the
+commit before a change to compare with it.
+
+Usage: python bench/deserialize.py [--against REVISION] [--runs RUNS]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SRC = os.path.join(ROOT, 'src')
+sys.path.insert(0, SRC)
+
+# pylint: disable=wrong-import-position,import-error
+from brickedit import BRVFile, Brick, ID, Vec3, bt, p, FILE_MAIN_VERSION
+
+SIZES = (10_000, 30_000, 65_000)
+
+# Run in a fresh interpreter for each source tree: argv is the vehicle file and the number of runs
+TIMER = '''
+import gc, sys, time
+from brickedit import BRVFile
+with open(sys.argv[1], 'rb') as f:
+    data = f.read()
+best = float('inf')
+for _ in range(int(sys.argv[2])):
+    vehicle = BRVFile()
+    gc.collect()
+    gc.disable()
+    start = time.perf_counter()
+    vehicle.deserialize(data)
+    best = min(best, time.perf_counter() - start)
+    gc.enable()
+    del vehicle
+print(best * 1e3)
+'''
+
+
+def make_vehicle(num_bricks: int, seed: int = 0) -> BRVFile:
+    """
+    Vehicle of scalable bricks, wedges and cones with random positions, colors, materials, groups,
+    seat names and input sources.
+    """
+    r = random.Random(seed)
+    vehicle = BRVFile(FILE_MAIN_VERSION)
+    for i in range(num_bricks):
+        kind = r.random()
+        ref = ID(
+            f'brick_{i}',
+            f'weld_{r.randrange(50)}' if r.random() < 0.5 else None,
+            f'editor_{r.randrange(20)}' if r.random() < 0.3 else None
+        )
+        if kind < 0.6:
+            brick = Brick(
+                ref, bt.SCALABLE_BRICK,
+                pos=Vec3(r.randrange(-500, 500) * 1.0, r.randrange(100) * 1.0, r.random()),
+                rot=Vec3(0.0, 90.0, r.choice((0.0, 45.0))),
+                ppatch={
+                    p.BRICK_SIZE: Vec3(r.randrange(1, 10) * 10.0, 30.0, 30.0),
+                    p.BRICK_COLOR: r.randrange(2 ** 32),
+                    p.BRICK_MATERIAL: r.choice((p.BrickMaterial.STEEL, p.BrickMaterial.GLASS))
+                }
+            )
+        elif kind < 0.8:
+            brick = Brick(ref, bt.SCALABLE_WEDGE, pos=Vec3(i * 1.0, 0.0, 0.0))
+        else:
+            ppatch = {p.SEAT_NAME: r.choice(('a', 'Bé', 'ccc'))} if r.random() < 0.5 else {}
+            if i > 0 and r.random() < 0.5:
+                ppatch[p.INPUT_CNL_SOURCE_BRICKS] = tuple(
+                    f'brick_{r.randrange(i)}' for _ in range(r.randrange(1, 3))
+                )
+            brick = Brick(ref, bt.SCALABLE_CONE, pos=Vec3(0.0, i * 2.0, 1.0), ppatch=ppatch)
+        vehicle.add(brick)
+    return vehicle
+
+
+def time_deserialize(src: str, path: str, runs: int) -> float:
+    """Best time in milliseconds of deserializing `path` with the brickedit package in `src`."""
+    env = dict(os.environ, PYTHONPATH=src)
+    out = subprocess.run(
+        [sys.executable, '-c', TIMER, path, str(runs)],
+        env=env, check=True, capture_output=True, text=True
+    )
+    return float(out.stdout)
+
+
+def export_src(revision: str, directory: str) -> str:
+    """Extracts the src folder of a git revision into `directory`, returns its path."""
+    archive = subprocess.run(
+        ['git', '-C', ROOT, 'archive', revision, 'src'], check=True, capture_output=True
+    )
+    subprocess.run(['tar', '-x', '-C', directory], input=archive.stdout, check=True)
+    return os.path.join(directory, 'src')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--against', help='git revision to compare with')
+    parser.add_argument('--runs', type=int, default=6, help='runs per measure, the best is kept')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        trees = {'current': SRC}
+        if args.against:
+            trees[args.against] = export_src(args.against, tmp)
+
+        for n in SIZES:
+            path = os.path.join(tmp, f'{n}.brv')
+            with open(path, 'wb') as f:
+                f.write(make_vehicle(n, seed=n).serialize())
+            times = {name: time_deserialize(src, path, args.runs) for name, src in trees.items()}
+            line = '   '.join(f'{name} {ms:6.1f} ms' for name, ms in times.items())
+            if args.against:
+                line += f'   x{times[args.against] / times["current"]:.2f}'
+            print(f'{n:>6} bricks: {line}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Startup benchmark: time of `import brickedit` in fresh interpreters, with the brick and property
+types loaded lazily (default) and loaded at import (as before they were lazy).
+
+Usage: python bench/startup.py [runs]
+"""
+import os
+import subprocess
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+
+CASES = {
+    'bare interpreter': 'pass',
+    'import brickedit (lazy)': 'import brickedit',
+    'import brickedit + load registries': (
+        'import brickedit\n'
+        'brickedit.bt.bt_registry.load()\n'
+        'brickedit.p.pmeta_registry.load()'
+    ),
+    'import brickedit + bt.SCALABLE_BRICK': 'import brickedit\nbrickedit.bt.SCALABLE_BRICK',
+    'import brickedit + p.BRICK_SIZE': 'import brickedit\nbrickedit.p.BRICK_SIZE',
+}
+
+
+def run(code: str, runs: int) -> float:
+    """Best wall time in milliseconds of `runs` fresh interpreters running `code`."""
+    env = dict(os.environ, PYTHONPATH=SRC, PYTHONDONTWRITEBYTECODE='')
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+        best = min(best, time.perf_counter() - start)
+    return best * 1e3
+
+
+def main() -> None:
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    run('import brickedit', 1)  # Compile .pyc files first
+    results = {name: run(code, runs) for name, code in CASES.items()}
+    bare = results['bare interpreter']
+    for name, ms in results.items():
+        print(f'{name:40} {ms:7.1f} ms  ({ms - bare:+.1f} ms over bare)')
+    saved = results['import brickedit + load registries'] - results['import brickedit (lazy)']
+    print(f'\nSaved by lazy loading when no brick or property type is used: {saved:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
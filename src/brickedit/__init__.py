@@ -7,6 +7,8 @@ from .id import *
 from .brick import *
 from .brv import *
 from .brm import *
+from .columnar import *
+from .index import *
 from . import p
 from . import bt
 from . import vhelper
@@ -5,7 +5,22 @@ from collections.abc import Hashable
 from . import bt
 from .id import ID as _ID
 from .exceptions import BrickError
-from .vec import Vec3
+from .vec import Vec2, Vec3, Vec4
+
+
+_IMMUTABLE_TYPES: frozenset[type] = frozenset((
+    type(None), bool, int, float, complex, str, bytes, Vec2, Vec3, Vec4
+))
+
+
+def _is_immutable(v: object) -> bool:
+    """Whether `v` cannot be modified in place, so it can be shared instead of deepcopied."""
+    t = type(v)
+    if t in _IMMUTABLE_TYPES:
+        return True
+    if t is tuple or t is frozenset:
+        return all(_is_immutable(item) for item in v)
+    return False
 
 
 class Brick:
@@ -31,7 +46,7 @@ class Brick:
 
     def get_property(self, p: str) -> Hashable:
         """Gets a property of the brick. If it has been modified, returns the modified value.
-        Otherwise, returns a deepcopy of the default value from the BrickMeta.
+        Otherwise, returns the default value from the BrickMeta (a deepcopy if it is mutable).
 
         Args:
             p (str): The name of the property to get.
@@ -40,14 +55,14 @@ class Brick:
             object: The value of the property.
         """
         # If the property key exists in the patch, return its stored value
-        # (including explicit None). Otherwise return a deepcopy of the
-        # default value from the BrickMeta.
+        # (including explicit None). Otherwise return the default value from the BrickMeta,
+        # deepcopied unless it is immutable (most defaults are numbers, strings or vectors).
         if p in self.ppatch:
             return self.ppatch[p]
         if p not in self._meta.p:
             raise BrickError(f"Property '{p}' does not exist on brick type '{self._meta.name()}'")
         pobj = self._meta.p.get(p)
-        return deepcopy(pobj)
+        return pobj if _is_immutable(pobj) else deepcopy(pobj)
 
     def set_property(self, p: str, v: Hashable) -> Self:
         """Sets a property of the brick.
@@ -98,9 +113,16 @@ class Brick:
         Returns:
             dict[str, Hashable]: A dictionary of all properties of the brick.
         """
+        # No repeated global lookups
+        ppatch = self.ppatch
+        is_immutable = _is_immutable
+
         props = {}
-        for p in self._meta.p.keys():
-            props[p] = self.get_property(p)
+        for p, pobj in self._meta.p.items():
+            if p in ppatch:
+                props[p] = ppatch[p]
+            else:
+                props[p] = pobj if is_immutable(pobj) else deepcopy(pobj)
         return props
 
     def __repr__(self) -> str:
@@ -1,12 +1,24 @@
 import io
+import os
 import struct
-from typing import Optional, Any
+import itertools
+from array import array
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Any, Callable, Iterable, Iterator, TypeVar
 
 from .vec import Vec3 as _Vec3
 from .brv import BRVFile
 from .p import TextMeta as _UserTextSerialization
 from .vhelper.time import net_ticks_now as _net_ticks_now
-from dataclasses import dataclass 
+from dataclasses import dataclass, field, fields as _fields
+
+
+_UNPACK_FROM_B = struct.Struct('B').unpack_from
+_UNPACK_FROM_h = struct.Struct('<h').unpack_from
+_UNPACK_FROM_H = struct.Struct('<H').unpack_from
+_UNPACK_FROM_5f = struct.Struct('<5f').unpack_from
+_UNPACK_FROM_2Q = struct.Struct('<2Q').unpack_from
 
 
 _ENCODE_2DIGITS = tuple((i % 10) | ((i // 10) << 4) for i in range(100))
@@ -52,7 +64,9 @@ class BRMDeserializationConfig:
     visibility: bool = False
     tags: bool = False
 
-    _length: int = 0
+    _length: int = field(init=False, repr=False, compare=False, default=0)
+    # See reader. Not an init field: dataclasses.replace must not copy it to the new config
+    _reader: Optional['BRMReader'] = field(init=False, repr=False, compare=False, default=None)
 
     def __post_init__(self):
         object.__setattr__(self, "_length", (
@@ -73,6 +87,20 @@ class BRMDeserializationConfig:
     def length(self) -> int:
         return self._length
 
+    def reader(self) -> 'BRMReader':
+        """
+        Returns:
+            BRMReader: Reader of the data selected by this config, compiled on first use.
+        """
+        # Kept on the config as well: hashing it for each lookup would cost more than some reads
+        reader = self._reader
+        if reader is None:
+            reader = _READERS.get(self)
+            if reader is None:
+                reader = _READERS[self] = BRMReader(self)
+            object.__setattr__(self, '_reader', reader)
+        return reader
+
 
 
 class BRMFile:
@@ -86,9 +114,9 @@ class BRMFile:
         file_name: Optional[str] = None,
         description: str = '',
         brick_count: Optional[int] = None,
-        size: _Vec3 = _Vec3(0, 0, 0),
-        weight: float = 0.0,
-        price: float = 0.0,
+        size: Optional[_Vec3] = None,
+        weight: Optional[float] = None,
+        price: Optional[float] = None,
         author: int = 0,
         visibility: int = 0,
         tags: Optional[list[str]] = None,
@@ -103,9 +131,12 @@ class BRMFile:
             description (str, optional): Description. Defaults to ''.
             brick_count (Optional[int], optional): Auto-generated if None and a brv is provided.
                 Defaults to None.
-            size (_Vec3, optional): Size. Defaults to _Vec3(0, 0, 0).
-            weight (float, optional): Weight. Defaults to 0.0.
-            price (float, optional): Price. Defaults to 0.0.
+            size (Optional[_Vec3], optional): Size in centimeters. Measured if None and a brv is
+                provided (see BRVFile.measure), else 0. Defaults to None.
+            weight (Optional[float], optional): Weight in kilograms. Measured if None and a brv is
+                provided, else 0. Defaults to None.
+            price (Optional[float], optional): Price. Measured if None and a brv is provided,
+                else 0. Defaults to None.
             creation_time (int | None, optional): Creation time in BR's format. Defaults to None.
             last_update_time (int | None, optional): Creation time in BR's format. Defaults to None.
         """
@@ -116,6 +147,15 @@ class BRMFile:
         if self.brv is not None:
             if brick_count is None:
                 brick_count = len(self.brv.bricks)
+            if size is None or weight is None or price is None:
+                measures = self.brv.measure()
+                size = measures.size() if size is None else size
+                weight = measures.weight if weight is None else weight
+                price = measures.price if price is None else price
+
+        size = _Vec3(0, 0, 0) if size is None else size
+        weight = 0.0 if weight is None else weight
+        price = 0.0 if price is None else price
 
         if file_name is None:
             file_name = f'BrickEdit-{last_update_time}'
@@ -160,6 +200,7 @@ class BRMFile:
         packed_author = encode_author(author)
         # (... + 7) // 8 is like ceil() for bytes.
         bin_author = packed_author.to_bytes((packed_author.bit_length() + 7)//8, 'little')
+        write(pack_B(len(bin_author)))
         write(bin_author)
 
         write(b'\x00\x00\x00\x00')  # The 4 forbidden bytes that breaks brms if you edit them
@@ -180,13 +221,6 @@ class BRMFile:
 
 
 
-    _UNPACK_FROM_B = struct.Struct('B').unpack_from
-    _UNPACK_FROM_h = struct.Struct('<h').unpack_from
-    _UNPACK_FROM_H = struct.Struct('<H').unpack_from
-    _UNPACK_FROM_5f = struct.Struct('<5f').unpack_from
-    _UNPACK_FROM_2Q = struct.Struct('<2Q').unpack_from
-
-
     def deserialize(self, buffer: bytes | bytearray, config: BRMDeserializationConfig, auto_version: bool = False) -> list[Any]:
         """Deserializes the BRMFile according to the config.
 
@@ -200,138 +234,370 @@ class BRMFile:
             dict: A dictionary with the deserialized data.
         """
 
-        result = []
-
         # Get memory view
         mv = memoryview(buffer)
 
         # Get version before running other stuff
-        brm_version: int = mv[0]
         if auto_version:
-            self.version = brm_version
-        if config.version:
-            result.append(brm_version)
-
-        # Precompute, local cache and other variables
-        last_step = config.length()
-        version = self.version
-        offset = 3  # 1 because we already loaded version + 2 because the next value also has a fixed size
-
-        unpack_from_B = self._UNPACK_FROM_B
-        unpack_from_h = self._UNPACK_FROM_h
-        unpack_from_H = self._UNPACK_FROM_H
-        unpack_from_5f = self._UNPACK_FROM_5f
-        unpack_from_2Q = self._UNPACK_FROM_2Q
-
-
-        # -- Name and description
-        # for UTF-16, we use -2*name_len because each element in a UTF-16 string is 2 bytes
-        #   we use - because utf-16/ascii is indicated by whether the length is negative or not
-
-        if last_step <= 1:
-            return result
-
-        name_len, = unpack_from_h(mv, 1)  # Compute before because we use it eitherway
-        name_byte_len = name_len if name_len >= 0 else -2*name_len
-        if config.name:
-            if name_len >= 0:  # ASCII
-                name = bytes(mv[offset : offset+name_byte_len]).decode('ascii')
-            else:  # UTF-16
-                name = bytes(mv[offset : offset+name_byte_len]).decode('utf-16-le')
-            result.append(name)
-        offset += name_byte_len
-
-        if last_step <= 2:
-            return result
-
-        desc_len, = unpack_from_h(mv, offset)
-        desc_byte_len = desc_len if desc_len >= 0 else -2*desc_len
-        offset += 2
-        if config.description:
-            if desc_len >= 0:  # ASCII
-                desc = bytes(mv[offset : offset+desc_byte_len]).decode('ascii')
-            else:  # UTF-16
-                desc = bytes(mv[offset : offset+desc_byte_len]).decode('utf-16-le')
-            result.append(desc)
-        offset += desc_byte_len
-
-        if last_step <= 3:
-            return result
-
-        # -- Brick count
-
-        brick_count, = unpack_from_H(mv, offset)
-        if config.brick_count:
-            result.append(brick_count)
-        offset += 2
-
-        if last_step <= 4:
-            return result
-
-        # -- Size, weight, price
-        sx, sy, sz, weight, price = unpack_from_5f(mv, offset)
-        offset += 20
-        
-        if config.size:
-            result.append(_Vec3(sx, sy, sz))
-        if config.weight:
-            result.append(weight)
-        if config.price:
-            result.append(price)
-
-        if last_step <= 6:
-            return result
-
-        # -- Author (insert thousand miles stare)
-        # AUTHOR_MARKER = 0x1D
-        # assert mv[offset] == AUTHOR_MARKER
-        offset += 1
-
-        author_len, = unpack_from_B(mv, offset)
-        offset += 1
-        if config.author:
-            author = decode_author(mv[offset : offset+author_len])
-            result.append(author)
-        offset += author_len
-
-        if last_step <= 7:
-            return result
-
-        # -- 4 bytes of dread
-        offset += 4
-
-        # Create and update time (.NET)
-        creation_time, last_update_time = unpack_from_2Q(mv, offset)
-        if config.creation_time:
-            result.append(creation_time)
-        if config.last_update_time:
-            result.append(last_update_time)
-        offset += 8
-
-        if last_step <= 9:
-            return result
-
-        # -- Visibility
-        if config.visibility:
-            result.append(mv[offset])
-        offset += 1
-
-        if last_step <= 10:
-            return result
-
-        # -- Tags
-        # Do not care about propertly updating offset if we don't load because this is EOF
-        if config.tags:
-            num_tags, = unpack_from_h(mv, offset)
-            offset += 2
-            tags = [None] * num_tags
-            for i in range(num_tags):
-                tag_len = mv[offset]
-                offset += 1
-                tag = mv[offset : offset+tag_len].decode('ascii')
-                offset += tag_len
-                tags[i] = tag
-            result.append(tags)
-
-
-        return result
+            self.version = mv[0]
+
+        return config.reader().read_values(mv)[0]
+
+
+    def deserialize_record(
+        self,
+        buffer: bytes | bytearray,
+        config: BRMDeserializationConfig,
+        auto_version: bool = False
+    ) -> tuple:
+        """
+        Deserializes the BRMFile according to the config, into a named tuple.
+
+        Args:
+            buffer (bytes | bytearray): The buffer to deserialize;
+            config (BRMDeserializationConfig): Configuration for deserialization;
+            auto_version (bool) (optional): If true, will automatically set self.version
+                to the version found in the buffer.
+
+        Returns:
+            BRMMetadata: Named tuple of the fields selected by `config` (see BRMReader), in the
+            same order as BRMFile.deserialize, e.g. `record.name`.
+        """
+        if auto_version:
+            self.version = buffer[0]
+        return config.reader().read(buffer)
+
+
+
+# -- Source of the code reading each span of a metadata file, see BRMReader. Each reads the span at
+# `offset` into local variables, then moves `offset` past it. `n` is a scratch variable.
+
+def _text_source(var: str) -> str:
+    # UTF-16 is indicated by a negative length, in characters (2 bytes each)
+    return (
+        'n, = unpack_from_h(mv, offset)\n'
+        'offset += 2\n'
+        'if n >= 0:\n'
+        f'    {var} = str(mv[offset : offset+n], "ascii")\n'
+        '    offset += n\n'
+        'else:\n'
+        f'    {var} = str(mv[offset : offset-2*n], "utf-16-le")\n'
+        '    offset -= 2*n\n'
+    )
+
+_SKIP_TEXT_SOURCE = (
+    'n, = unpack_from_h(mv, offset)\n'
+    'offset += 2 + (n if n >= 0 else -2*n)\n'
+)
+
+_TAGS_SOURCE = (
+    'n, = unpack_from_h(mv, offset)\n'
+    'offset += 2\n'
+    'tags = [None] * n\n'
+    'for i in range(n):\n'
+    '    n = mv[offset]\n'
+    '    offset += 1\n'
+    '    tags[i] = str(mv[offset : offset+n], "ascii")\n'
+    '    offset += n\n'
+)
+
+# Layout of a metadata file: (fields of the span, source reading it, source skipping it or its
+# size if fixed). Spans are read as a whole if any of their fields is selected.
+_LAYOUT: tuple[tuple[tuple[str, ...], str, str | int], ...] = (
+    (('version',), 'version = mv[offset]\noffset += 1\n', 1),
+    (('name',), _text_source('name'), _SKIP_TEXT_SOURCE),
+    (('description',), _text_source('description'), _SKIP_TEXT_SOURCE),
+    (('brick_count',), 'brick_count, = unpack_from_H(mv, offset)\noffset += 2\n', 2),
+    (('size', 'weight', 'price'),
+     'sx, sy, sz, weight, price = unpack_from_5f(mv, offset)\noffset += 20\n', 20),
+    # AUTHOR_MARKER = 0x1D, then the length of the author
+    (('author',),
+     'n = mv[offset + 1]\noffset += 2\n'
+     'author = decode_author(mv[offset : offset+n])\noffset += n\n',
+     'offset += 2 + mv[offset + 1]\n'),
+    ((), '', 4),  # 4 bytes of dread
+    (('creation_time', 'last_update_time'),
+     'creation_time, last_update_time = unpack_from_2Q(mv, offset)\noffset += 16\n', 16),
+    (('visibility',), 'visibility = mv[offset]\noffset += 1\n', 1),
+    (('tags',), _TAGS_SOURCE, ''),
+)
+
+# Expression of the value of each field, from the local variables of the read spans
+_FIELD_EXPRESSIONS = {'size': 'Vec3(sx, sy, sz)'}
+
+_READER_GLOBALS = {
+    'unpack_from_h': _UNPACK_FROM_h,
+    'unpack_from_H': _UNPACK_FROM_H,
+    'unpack_from_5f': _UNPACK_FROM_5f,
+    'unpack_from_2Q': _UNPACK_FROM_2Q,
+    'decode_author': decode_author,
+    'Vec3': _Vec3,
+}
+
+
+class BRMReader:
+    """
+    Reader of the data selected by a BRMDeserializationConfig, see BRMDeserializationConfig.reader.
+
+    The layout of the file is compiled once into a function reading the selected spans with no
+    branching on the config: consecutive fixed-size spans that are not needed are skipped in one
+    offset jump, and reading stops after the last selected value.
+
+    Attributes:
+        config (BRMDeserializationConfig): Selected data;
+        fields (tuple[str, ...]): Names of the selected fields, in file order;
+        record_type (type[tuple]): Named tuple type (fields `fields`) of the records, BRMMetadata;
+        read (Callable[[bytes | bytearray | memoryview], BRMMetadata]): Deserializes the selected
+            data of a metadata file into a record, e.g. `reader.read(buffer).name`;
+        read_values (Callable[[bytes | bytearray | memoryview], tuple[list[Any], int]]):
+            Deserializes the selected data of a metadata file, or of a prefix of it, into a list
+            (see BRMFile.deserialize). Also returns the offset where reading stopped: it is past
+            the end of the buffer if the buffer is a truncated prefix of the file (then the values
+            may be truncated as well).
+    """
+
+    __slots__ = ('config', 'fields', 'record_type', 'read_values', 'read')
+
+    def __init__(self, config: BRMDeserializationConfig):
+        """
+        Compiles the reader of `config`. Prefer BRMDeserializationConfig.reader, which caches
+        readers.
+
+        Args:
+            config (BRMDeserializationConfig): Data to read.
+        """
+        self.config: BRMDeserializationConfig = config
+        self.fields: tuple[str, ...] = tuple(
+            f.name for f in _fields(BRMDeserializationConfig)
+            if not f.name.startswith('_') and getattr(config, f.name)
+        )
+        self.record_type: type[tuple] = namedtuple('BRMMetadata', self.fields)
+
+        # Spans up to the last one holding a selected field
+        selected = [any(getattr(config, f) for f in fields) for fields, _, _ in _LAYOUT]
+        num_spans = max((i + 1 for i, s in enumerate(selected) if s), default=0)
+        lines = []
+        skip = 0
+        for (_, read_source, skip_source), is_selected in zip(_LAYOUT[:num_spans], selected):
+            if not is_selected and isinstance(skip_source, int):
+                skip += skip_source
+                continue
+            if not lines:
+                lines.append(f'offset = {skip}\n')
+            elif skip:
+                lines.append(f'offset += {skip}\n')
+            skip = 0
+            lines.append(read_source if is_selected else skip_source)
+        if not lines:
+            lines.append('offset = 0\n')
+        body = ''.join('    ' + line for line in ''.join(lines).splitlines(keepends=True))
+        values = ', '.join(_FIELD_EXPRESSIONS.get(f, f) for f in self.fields)
+
+        source = (
+            'def read_values(buffer):\n'
+            '    mv = memoryview(buffer)\n'
+            f'{body}'
+            f'    return [{values}], offset\n'
+            '\n'
+            'def read(buffer):\n'
+            '    mv = memoryview(buffer)\n'
+            f'{body}'
+            f'    return new(record_type, ({values}{"," if len(self.fields) == 1 else ""}))\n'
+        )
+        # Compiled with exec rather than interpreted from a tuple of steps: the reader then runs as
+        # straight-line code with no per-span call, config check or dispatch, which is most of the
+        # cost of reading a few fields (e.g. the name of thousands of files, see brm.scan). The
+        # source only combines the constant snippets of _LAYOUT, nothing comes from the caller
+        namespace = dict(_READER_GLOBALS, new=tuple.__new__, record_type=self.record_type)
+        exec(source, namespace)  # pylint: disable=exec-used
+
+        self.read_values: Callable[[bytes | bytearray | memoryview], tuple[list[Any], int]] = (
+            namespace['read_values']
+        )
+        self.read: Callable[[bytes | bytearray | memoryview], tuple] = namespace['read']
+
+
+# BRMReader of each config
+_READERS: dict[BRMDeserializationConfig, BRMReader] = {}
+
+
+_T = TypeVar('_T')
+
+_O_BINARY = getattr(os, 'O_BINARY', 0)  # Windows only
+
+# Number of files read by a thread at once
+_SCAN_BATCH_SIZE = 256
+
+# Typecode of the array of each numeric column of scan_columns. Sizes are stored as x, y, z triplets
+_SCAN_COLUMN_TYPECODES = {
+    'version': 'B',
+    'brick_count': 'H',
+    'size': 'f',
+    'weight': 'f',
+    'price': 'f',
+    'creation_time': 'Q',
+    'last_update_time': 'Q',
+    'visibility': 'B',
+}
+
+
+def _read_file(
+    path: str | os.PathLike,
+    config: BRMDeserializationConfig,
+    prefix_size: int
+) -> list[Any]:
+    """
+    Deserializes the data selected by `config` from the metadata file at `path`, reading only its
+    first `prefix_size` bytes if they contain everything needed, and the whole file otherwise.
+    """
+    read_values = config.reader().read_values
+    fd = os.open(path, os.O_RDONLY | _O_BINARY)
+    try:
+        data = os.read(fd, prefix_size)
+        if len(data) == prefix_size:
+            try:
+                result, end = read_values(data)
+                if end <= prefix_size:
+                    return result
+            except (IndexError, ValueError, struct.error):
+                # Truncated field (e.g. half a UTF-16 character). Real errors are raised below
+                pass
+            # The prefix is too short: read the rest
+            chunks = [data]
+            while chunk := os.read(fd, 1 << 16):
+                chunks.append(chunk)
+            data = b''.join(chunks)
+    finally:
+        os.close(fd)
+    return read_values(data)[0]
+
+
+def _scan_batch(
+    paths: tuple[str | os.PathLike, ...],
+    config: BRMDeserializationConfig,
+    prefix_size: int,
+    skip_errors: bool
+) -> list[tuple[str | os.PathLike, list[Any]]]:
+    """Reads the metadata files `paths`, see scan."""
+    read_file = _read_file
+    results = []
+    for path in paths:
+        try:
+            results.append((path, read_file(path, config, prefix_size)))
+        except (OSError, ValueError, IndexError, struct.error):
+            # UnicodeDecodeError is a ValueError
+            if not skip_errors:
+                raise
+    return results
+
+
+def _map_batches(
+    func: Callable[..., list[_T]],
+    items: Iterable[Any],
+    max_workers: Optional[int],
+    *args: Any
+) -> Iterator[_T]:
+    """
+    Calls `func(batch, *args)` for each batch of _SCAN_BATCH_SIZE items of `items` in a pool of
+    `max_workers` threads (see scan), and yields the elements of the returned lists in order.
+    """
+    if max_workers is None:
+        max_workers = min(32, (os.cpu_count() or 1) + 4)
+    items = iter(items)
+    batches = iter(lambda: tuple(itertools.islice(items, _SCAN_BATCH_SIZE)), ())
+
+    if max_workers <= 1:
+        for batch in batches:
+            yield from func(batch, *args)
+        return
+
+    executor = ThreadPoolExecutor(max_workers)
+    try:
+        # Only submit a few batches ahead, so that items are consumed lazily
+        pending = deque()
+        for batch in batches:
+            pending.append(executor.submit(func, batch, *args))
+            if len(pending) >= 2 * max_workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+def scan(
+    paths: Iterable[str | os.PathLike],
+    config: BRMDeserializationConfig,
+    max_workers: Optional[int] = None,
+    prefix_size: int = 4096,
+    skip_errors: bool = False
+) -> Iterator[tuple[str | os.PathLike, list[Any]]]:
+    """
+    Deserializes many metadata files (e.g. the MetaData.brm of each vehicle folder), like
+    BRMFile.deserialize. Only the first `prefix_size` bytes of each file are read, unless the data
+    selected by `config` goes further. Files are read by a pool of threads, by batches, and results
+    are yielded lazily in the order of `paths`.
+
+    Args:
+        paths (Iterable[str | os.PathLike]): Paths of the metadata files;
+        config (BRMDeserializationConfig): Data to deserialize from each file;
+        max_workers (int) (optional): Number of threads. 1 reads files in the calling thread.
+            Defaults to min(32, os.cpu_count() + 4), like ThreadPoolExecutor;
+        prefix_size (int) (optional): Number of bytes read first from each file;
+        skip_errors (bool) (optional): Skip files that cannot be read or deserialized instead of
+            raising.
+
+    Raises:
+        OSError: If a file cannot be read and skip_errors is False;
+        ValueError, IndexError, struct.error: If a file is invalid and skip_errors is False.
+
+    Returns:
+        Iterator[tuple[str | os.PathLike, list[Any]]]: The path and deserialized data (see
+        BRMFile.deserialize) of each file.
+    """
+    return _map_batches(_scan_batch, paths, max_workers, config, prefix_size, skip_errors)
+
+
+def scan_columns(
+    paths: Iterable[str | os.PathLike],
+    config: BRMDeserializationConfig,
+    max_workers: Optional[int] = None,
+    prefix_size: int = 4096,
+    skip_errors: bool = False
+) -> dict[str, list[Any] | array]:
+    """
+    Deserializes many metadata files like scan, into one column per selected field.
+
+    Args:
+        paths (Iterable[str | os.PathLike]): See scan;
+        config (BRMDeserializationConfig): See scan;
+        max_workers (int) (optional): See scan;
+        prefix_size (int) (optional): See scan;
+        skip_errors (bool) (optional): See scan. Skipped files have no row.
+
+    Raises:
+        See scan.
+
+    Returns:
+        dict[str, list[Any] | array]: 'path' (list of paths), then for each field selected by
+        `config`, its column under the name of the field. Numeric fields are stored in an array
+        (sizes as x, y, z triplets), others in a list.
+    """
+    fields = [f.name for f in _fields(BRMDeserializationConfig)
+              if not f.name.startswith('_') and getattr(config, f.name)]
+    columns: dict[str, list[Any] | array] = {'path': []}
+    for name in fields:
+        typecode = _SCAN_COLUMN_TYPECODES.get(name)
+        columns[name] = [] if typecode is None else array(typecode)
+
+    # No repeated global lookups
+    appends = [columns[name].append for name in fields]
+    if config.size:
+        appends[fields.index('size')] = lambda v, extend=columns['size'].extend: extend(v.as_tuple())
+    paths_append = columns['path'].append
+
+    for path, result in scan(paths, config, max_workers, prefix_size, skip_errors):
+        paths_append(path)
+        for append, value in zip(appends, result):
+            append(value)
+    return columns
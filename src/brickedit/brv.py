@@ -1,9 +1,15 @@
 """BRV file handling."""
+import os
+import mmap
 import struct
-from typing import Self, Optional, Iterable
+import shutil
+import tempfile
+from array import array
+from dataclasses import dataclass
+from typing import Self, Optional, Iterable, Iterator, Callable, BinaryIO, overload
 from collections import defaultdict
-from collections.abc import Hashable
-import io
+from itertools import accumulate
+from collections.abc import Hashable, MutableSequence
 
 from . import brick as _brick
 from . import vec as _vec
@@ -12,6 +18,760 @@ from . import bt as _bt
 from . import p as _p
 from . import exceptions as _e
 from . import id as _id
+from . import transform as _transform
+from . import measure as _measure
+from . import spatial as _spatial
+from . import refgraph as _refgraph
+from . import groups as _groups
+from .vhelper import mat as _mat
+
+
+_UNPACK_FROM_H = struct.Struct('<H').unpack_from
+_UNPACK_FROM_I = struct.Struct('<I').unpack_from
+_UNPACK_FROM_3H = struct.Struct('<3H').unpack_from
+_UNPACK_FROM_HI = struct.Struct('<HI').unpack_from
+_UNPACK_FROM_HIB = struct.Struct('<HIB').unpack_from
+_UNPACK_FROM_6f = struct.Struct('<6f').unpack_from
+_UNPACK_FROM_2H = struct.Struct('<2H').unpack_from
+
+
+
+def _to_handles(v: Hashable) -> Hashable:
+    """Brick names of a reference property value ('brick_{i}', or a tuple of them) to their
+    integer handles (i). Other values are returned as is."""
+    if isinstance(v, str) and v.startswith('brick_') and v[6:].isdecimal():
+        return int(v[6:])
+    if isinstance(v, tuple):
+        return tuple(_to_handles(x) for x in v)
+    return v
+
+
+def _to_names(v: Hashable) -> Hashable:
+    """Inverse of _to_handles: integer handles of a reference property value to brick names."""
+    if isinstance(v, int) and not isinstance(v, bool):
+        return f'brick_{v}'
+    if isinstance(v, tuple):
+        return tuple(_to_names(x) for x in v)
+    return v
+
+
+# Writing, shared by BRVFile.serialize, BRVFile.serialize_incremental and ColumnarBRVFile.serialize
+
+def _head(version: int, num_bricks: int, types: Iterable[_bt.BrickMeta], num_props: int) -> bytearray:
+    """Header and brick type names of a vehicle file: everything before the property tables."""
+    types = list(types)
+    head = bytearray(struct.pack('<B3H', version, num_bricks, len(types), num_props))
+    for t in types:
+        t_name_bytes = t.name().encode('ascii')
+        head += struct.pack('B', len(t_name_bytes))
+        head += t_name_bytes
+    return head
+
+
+def _property_table(prop: str, binaries: list[bytes]) -> bytes:
+    """Serialized property table: name, number of values and total length, values and footer."""
+    prop_bytes = prop.encode('ascii')
+    lengths = [len(binary) for binary in binaries]
+    table = [struct.pack('B', len(prop_bytes)), prop_bytes,
+             struct.pack('<HI', len(binaries), sum(lengths))]
+    table.extend(binaries)
+    # Property footer: none for 1 value, the shared length, or 0 then each length
+    if len(binaries) > 1:
+        if lengths.count(lengths[0]) == len(lengths):
+            table.append(struct.pack('<H', lengths[0]))
+        else:
+            table.append(b'\x00\x00')
+            table.append(struct.pack(f'<{len(lengths)}H', *lengths))
+    return b''.join(table)
+
+
+_RECORD_STRUCTS: dict[tuple[int, bool], struct.Struct] = {}
+
+def _record_struct(num_properties: int, post_groups_update: bool) -> struct.Struct:
+    """
+    Struct packing a whole brick record with `num_properties` properties: brick type index, size,
+    number of properties, property pairs, position & rotation, then (after the groups update)
+    editor and weld groups.
+    """
+    record = _RECORD_STRUCTS.get((num_properties, post_groups_update))
+    if record is None:
+        record = _RECORD_STRUCTS[num_properties, post_groups_update] = struct.Struct(
+            f'<HIB{2 * num_properties}H6f' + ('2H' if post_groups_update else '')
+        )
+    return record
+
+
+
+class _BrickRecordReader:
+    """
+    Reads the sections 1 to 3 (header, brick types, properties) of a BRV buffer,
+    then builds bricks from the records of section 4 on demand.
+    """
+
+    __slots__ = ('mv', 'version', 'num_bricks', 'bricks_offset', 'brick_metas', 'property_names',
+                 'property_values', 'int_refs', 'weld_refs', 'editor_refs')
+
+    def __init__(self, mv: memoryview, allow_unknown: bool, int_refs: bool = False):
+        """
+        Reads the header, the brick types and the property tables of `mv`.
+
+        Args:
+            mv (memoryview): Buffer of the whole vehicle file;
+            allow_unknown (bool): Accept unknown brick types and properties;
+            int_refs (bool) (optional): Name bricks and groups with integer handles, see
+                BRVFile.deserialize.
+
+        Raises:
+            BrickError: If the buffer has an unknown brick type / property and allow_unknown is
+                False, or if a property does not support the version of the buffer.
+        """
+
+        # No repeated global lookups and stuff
+        pmeta_registry_get = _p.pmeta_registry.get
+        bt_registry_get = _bt.bt_registry.get
+        BrickError = _e.BrickError
+        InvalidVersion = _p.InvalidVersion
+        unpack_from_H = _UNPACK_FROM_H
+        unpack_from_HI = _UNPACK_FROM_HI
+
+        # --------1. HEADER
+        version = mv[0]
+        num_bricks, num_brick_types, num_properties = _UNPACK_FROM_3H(mv, 1)
+        offset = 7
+
+        # --------2. BRICK TYPES
+        # Resolve all brick types now rather than for each brick
+        brick_meta_default = _bt.UnknownBrickMeta if allow_unknown else None
+        brick_metas = []
+        for _ in range(num_brick_types):
+            name_len = mv[offset]
+            offset += 1
+            brick_type_name = str(mv[offset : offset+name_len], 'ascii')
+            offset += name_len
+            brick_meta = bt_registry_get(brick_type_name, brick_meta_default)
+            if brick_meta is None:
+                raise BrickError(f"Unknown brick type '{brick_type_name}'")
+            brick_metas.append(brick_meta)
+
+        # --------3. PROPERTIES
+        # For each property index, the property name and the list where for each value index
+        # we can find its corresponding value.
+        property_names = []
+        property_values = []
+
+        # Get the default if the property deserialization class is not found
+        prop_deserialization_class_default = _p.UnknownPropertyMeta if allow_unknown else None
+        for _ in range(num_properties):
+            # Property name
+            prop_len = mv[offset]
+            offset += 1
+            prop = str(mv[offset : offset+prop_len], 'ascii')
+            offset += prop_len
+            # Get property's deserializer for later
+            prop_deserialization_class = pmeta_registry_get(prop, prop_deserialization_class_default)
+            if prop_deserialization_class is None:
+                raise BrickError(f"Unknown property '{prop}'")
+
+            # Number of values for this property, byte length of the property's values
+            num_values, len_binaries = unpack_from_HI(mv, offset)
+            offset += 6
+
+            # Values are followed by the footer: skip over them for now
+            value_offset = offset
+            offset += len_binaries
+
+            # Figure out the length of each element
+            if num_values > 1:
+
+                # Read the length of the first probable element
+                first_element_length, = unpack_from_H(mv, offset)
+                offset += 2
+                # If it's zero, then it means each element has a different length
+                if first_element_length == 0:
+                    elements_length = struct.unpack_from(f'<{num_values}H', mv, offset)
+                    offset += 2 * num_values
+                # Else all elements have the same length
+                else:
+                    elements_length = (first_element_length,) * num_values
+
+            # If there is only one value, brick rigs does not indicate it
+            else:
+                elements_length = (len_binaries,)
+
+            # Deserialize the whole table at once
+            values = prop_deserialization_class.deserialize_many(
+                mv[value_offset : value_offset+len_binaries], elements_length, version
+            )
+            for value in values:
+                if value is InvalidVersion:
+                    raise BrickError(f"Invalid version for property '{prop}'")
+            if int_refs and prop_deserialization_class.USES_BRICK_REFERENCES:
+                values = [_to_handles(value) for value in values]
+
+            property_names.append(prop)
+            property_values.append(values)
+
+        self.mv: memoryview = mv
+        self.version: int = version
+        self.num_bricks: int = num_bricks
+        self.bricks_offset: int = offset
+        self.brick_metas: list[_bt.BrickMeta] = brick_metas
+        self.property_names: list[str] = property_names
+        self.property_values: list[list[Hashable]] = property_values
+        self.int_refs: bool = int_refs
+        # Reference of each weld / editor group index: one object per group, not one per brick
+        self.weld_refs: list[str | int | None] = [None]
+        self.editor_refs: list[str | int | None] = [None]
+
+
+    def _add_group_refs(self, refs: list[str | int | None], prefix: str, idx: int) -> None:
+        """Extends the group references `refs` (weld_refs or editor_refs) up to index `idx`."""
+        if self.int_refs:
+            refs.extend(range(len(refs), idx + 1))
+        else:
+            refs.extend(f'{prefix}{k}' for k in range(len(refs), idx + 1))
+
+
+    def record_offsets(self) -> array:
+        """
+        Finds the offset of each brick record by hopping over their byte length.
+
+        Returns:
+            array: The offset of each brick record (typecode 'I').
+        """
+        unpack_from_I = _UNPACK_FROM_I
+        mv = self.mv
+        offsets = array('I', bytes(4 * self.num_bricks))
+        offset = self.bricks_offset
+        for i in range(self.num_bricks):
+            offsets[i] = offset
+            # Brick type index (2) + byte length (4) + the record itself
+            offset += 6 + unpack_from_I(mv, offset + 2)[0]
+        return offsets
+
+
+    def read_bricks(self, offset: int, start: int, count: int) -> list[_brick.Brick]:
+        """
+        Builds `count` consecutive bricks, the first one being at `offset`.
+
+        Args:
+            offset (int): Offset of the first brick record;
+            start (int): Index of the first brick in the file, used to name bricks;
+            count (int): Number of bricks to build.
+
+        Returns:
+            list[Brick]: The bricks.
+        """
+
+        # No repeated global lookups and stuff
+        mv = self.mv
+        brick_metas = self.brick_metas
+        property_names = self.property_names
+        property_values = self.property_values
+        is_post_groups_update: bool = self.version >= _var.GROUPS_UPDATE
+        unpack_from_HIB = _UNPACK_FROM_HIB
+        unpack_from_6f = _UNPACK_FROM_6f
+        unpack_from_2H = _UNPACK_FROM_2H
+        Brick = _brick.Brick
+        ID = _id.ID
+        Vec3 = _vec.Vec3
+        int_refs = self.int_refs
+        weld_refs = self.weld_refs
+        editor_refs = self.editor_refs
+
+        bricks = []
+        bricks_append = bricks.append
+        for i in range(start, start + count):
+            # Brick type, byte length of the properties part of this brick (we do not need it)
+            # and number of properties
+            brick_type_index, _, num_properties = unpack_from_HIB(mv, offset)
+            offset += 7
+
+            # Unpack the properties
+            properties: dict[str, Hashable] = {}
+            for _ in range(num_properties):
+                type_index, value_index = unpack_from_2H(mv, offset)
+                offset += 4
+                properties[property_names[type_index]] = property_values[type_index][value_index]
+
+            # Position and rotation
+            pos_x, pos_y, pos_z, rot_y, rot_z, rot_x = unpack_from_6f(mv, offset)
+            offset += 24
+
+            if is_post_groups_update:
+                # Get the indexes
+                editor_idx, weld_idx = unpack_from_2H(mv, offset)
+                offset += 4
+                if weld_idx >= len(weld_refs):
+                    self._add_group_refs(weld_refs, 'weld_', weld_idx)
+                if editor_idx >= len(editor_refs):
+                    self._add_group_refs(editor_refs, 'editor_', editor_idx)
+                ref = ID(i if int_refs else f'brick_{i}', weld_refs[weld_idx], editor_refs[editor_idx])
+            else:
+                ref = ID(i if int_refs else f'brick_{i}')
+
+            # Create the brick
+            bricks_append(Brick(
+                ref,
+                brick_metas[brick_type_index],
+                Vec3(pos_x, pos_y, pos_z),
+                Vec3(rot_x, rot_y, rot_z),
+                properties
+            ))
+
+        return bricks
+
+
+
+@dataclass(frozen=True, slots=True)
+class BRVSummary:
+    """
+    Summary of a vehicle file, see peek.
+
+    Attributes:
+        version (int): Version of the file;
+        brick_count (int): Number of bricks;
+        brick_types (tuple[str, ...]): Internal names of the brick types, in file order;
+        properties (tuple[str, ...]): Names of the properties, in file order;
+        brick_type_counts (dict[str, int]): Number of bricks of each brick type.
+    """
+
+    version: int
+    brick_count: int
+    brick_types: tuple[str, ...]
+    properties: tuple[str, ...]
+    brick_type_counts: dict[str, int]
+
+
+def peek(buffer: bytes | bytearray | memoryview | mmap.mmap) -> BRVSummary:
+    """
+    Reads the header, brick types and property names of a vehicle file and counts bricks of each
+    type without deserializing anything else: property values are skipped and only the brick type
+    index of each brick record is read. Pass a mmap.mmap to only load the pages that are read.
+
+    Args:
+        buffer (bytes | bytearray | memoryview | mmap.mmap): Vehicle file.
+
+    Returns:
+        BRVSummary: Summary of the vehicle.
+    """
+    unpack_from_H = _UNPACK_FROM_H
+    unpack_from_HI = _UNPACK_FROM_HI
+
+    with memoryview(buffer) as mv:
+        # --------1. HEADER
+        version = mv[0]
+        num_bricks, num_brick_types, num_properties = _UNPACK_FROM_3H(mv, 1)
+        offset = 7
+
+        # --------2. BRICK TYPES
+        brick_types = []
+        for _ in range(num_brick_types):
+            name_len = mv[offset]
+            offset += 1
+            brick_types.append(str(mv[offset : offset+name_len], 'ascii'))
+            offset += name_len
+
+        # --------3. PROPERTIES: names, then skip values and footer
+        properties = []
+        for _ in range(num_properties):
+            prop_len = mv[offset]
+            offset += 1
+            properties.append(str(mv[offset : offset+prop_len], 'ascii'))
+            offset += prop_len
+            num_values, len_binaries = unpack_from_HI(mv, offset)
+            offset += 6 + len_binaries
+            if num_values > 1:
+                # 0 → each element has its own length
+                offset += 2 if unpack_from_H(mv, offset)[0] != 0 else 2 + 2 * num_values
+
+        # --------4. BRICKS: only the brick type index, then hop over the record
+        counts = [0] * num_brick_types
+        for _ in range(num_bricks):
+            brick_type_index, size = unpack_from_HI(mv, offset)
+            counts[brick_type_index] += 1
+            offset += 6 + size
+
+    return BRVSummary(
+        version,
+        num_bricks,
+        tuple(brick_types),
+        tuple(properties),
+        dict(zip(brick_types, counts))
+    )
+
+
+
+class LazyBrickList(MutableSequence[_brick.Brick]):
+    """
+    List of bricks deserialized on demand, see BRVFile.deserialize(..., lazy=True).
+
+    It holds the offset of every brick record of the deserialized buffer and only builds a brick
+    the first time its index is accessed. The brick is then kept: later accesses return the same
+    object, and edits to it are kept. It otherwise behaves like a list of bricks.
+    """
+
+    __slots__ = ('_bricks', '_reader', '_offsets')
+
+    def __init__(self, reader: _BrickRecordReader):
+        """
+        Args:
+            reader (_BrickRecordReader): Reader of the deserialized buffer.
+        """
+        self._reader = reader
+        self._offsets = reader.record_offsets()
+        # Index of the brick record in the file if not built yet, else the brick itself
+        self._bricks: list[_brick.Brick | int] = list(range(reader.num_bricks))
+
+    def _materialize(self, i: int) -> _brick.Brick:
+        record_index = self._bricks[i]
+        brick, = self._reader.read_bricks(self._offsets[record_index], record_index, 1)
+        self._bricks[i] = brick
+        return brick
+
+    def num_materialized(self) -> int:
+        """
+        Returns:
+            int: How many bricks are built (deserialized, or added to the list).
+        """
+        return sum(1 for b in self._bricks if b.__class__ is not int)
+
+    @overload
+    def __getitem__(self, i: int) -> _brick.Brick: ...
+    @overload
+    def __getitem__(self, i: slice) -> list[_brick.Brick]: ...
+
+    def __getitem__(self, i: int | slice) -> _brick.Brick | list[_brick.Brick]:
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self._bricks)))]
+        brick = self._bricks[i]
+        if brick.__class__ is int:
+            return self._materialize(i)
+        return brick
+
+    def __setitem__(self, i: int | slice, value: _brick.Brick | Iterable[_brick.Brick]) -> None:
+        self._bricks[i] = value
+
+    def __delitem__(self, i: int | slice) -> None:
+        del self._bricks[i]
+
+    def __len__(self) -> int:
+        return len(self._bricks)
+
+    def __iter__(self) -> Iterator[_brick.Brick]:
+        # By index so materialized bricks are stored, like list iteration tolerates appends
+        bricks = self._bricks
+        i = 0
+        while i < len(bricks):
+            brick = bricks[i]
+            yield self._materialize(i) if brick.__class__ is int else brick
+            i += 1
+
+    def insert(self, index: int, value: _brick.Brick) -> None:
+        self._bricks.insert(index, value)
+
+    def append(self, value: _brick.Brick) -> None:
+        self._bricks.append(value)
+
+    def extend(self, values: Iterable[_brick.Brick]) -> None:
+        self._bricks.extend(values)
+
+    def clear(self) -> None:
+        self._bricks.clear()
+
+    def __repr__(self) -> str:
+        return f'LazyBrickList({len(self._bricks)} bricks, {self.num_materialized()} built)'
+
+
+
+class _IncrementalSerializer:
+    """
+    State kept by BRVFile.serialize_incremental between calls: the tables, the output buffer, the
+    record of each brick and the bricks marked as changed since the previous call.
+
+    Only marked and appended bricks are looked at. Value tables only grow, so the records of other
+    bricks stay valid. Tables are rebuilt from scratch when most bricks changed.
+    """
+
+    __slots__ = ('version', 'allow_unknown', 'types', 'type_to_index', 'prop_to_index', 'props',
+                 'prop_metas', 'value_to_index', 'values', 'binaries', 'file_prop_index',
+                 'num_file_props', 'tables',
+                 'welds', 'editors', 'ref_to_idx', 'marked', 'index_of', 'ids', 'records', 'head',
+                 'buffer', 'offsets')
+
+    def __init__(self, version: int, allow_unknown: bool):
+        self.version: int = version
+        self.allow_unknown: bool = allow_unknown
+        self.reset()
+
+
+    def reset(self) -> None:
+        """Forgets all tables and records."""
+        self.types: list[_bt.BrickMeta] = []
+        self.type_to_index: dict[_bt.BrickMeta, int] = {}
+        # Property index → name, serialization class, values, serialized values, index in the file
+        # (None if invalid in this version) and serialized table
+        self.prop_to_index: dict[str, int] = {}
+        self.props: list[str] = []
+        self.prop_metas: list[type[_p.PropertyMeta]] = []
+        self.value_to_index: list[dict[Hashable, int]] = []
+        self.values: list[list[Hashable]] = []
+        self.binaries: list[list[bytes]] = []
+        self.file_prop_index: list[int | None] = []
+        self.num_file_props: int = 0
+        self.tables: list[bytes] = []
+        self.welds: dict[str | None, int] = {None: 0}
+        self.editors: dict[str | None, int] = {None: 0}
+        self.ref_to_idx: dict[str, int] = {}
+        # Bricks marked as changed (ordered set), see BRVFile.mark_changed
+        self.marked: dict[_brick.Brick, None] = {}
+        # Index, ref.id and record of each brick when its record was built
+        self.index_of: dict[_brick.Brick, int] = {}
+        self.ids: list[str] = []
+        self.records: list[bytes] = []
+        self.head: bytes = b''
+        self.buffer: bytearray = bytearray()
+        # Offset of each record after the head, and the end of the last one. None until needed
+        # after records changed size
+        self.offsets: array | None = array('I', (0,))
+
+
+    def mark(self, bricks: Iterable[_brick.Brick]) -> None:
+        """Marks bricks as changed."""
+        marked = self.marked
+        for brick in bricks:
+            marked[brick] = None
+
+
+    def serialize(self, bricks: MutableSequence[_brick.Brick]) -> bytearray:
+        """Updates the buffer to match `bricks`. See BRVFile.serialize_incremental."""
+
+        num_bricks = len(bricks)
+        assert num_bricks <= 65_534, "Too many bricks! Max: 65,534"
+
+        # No repeated global lookups
+        records = self.records
+        num_prev = len(records)
+        index_of = self.index_of
+        ids = self.ids
+        InvalidVersion = _p.InvalidVersion
+
+        # --------Changed bricks: the marked ones, then the appended ones
+        if num_bricks < num_prev:
+            # Bricks were removed without BRVFile.remove_many
+            self.reset()
+            return self.serialize(bricks)
+        for i in range(num_prev, num_bricks):
+            index_of[bricks[i]] = i
+        changed = []
+        for brick in self.marked:
+            i = index_of.get(brick)
+            if i is None:
+                # Not a brick of this vehicle: bricks were replaced or inserted
+                self.reset()
+                return self.serialize(bricks)
+            if i < num_prev:
+                changed.append(i)
+        self.marked = {}
+        changed.sort()
+        changed.extend(range(num_prev, num_bricks))
+
+        # Tables only grow: start over when most bricks changed
+        if self.types and len(changed) * 2 > num_bricks:
+            self.reset()
+            return self.serialize(bricks)
+
+        refs_changed = False
+        for i in changed:
+            ref_id = bricks[i].ref.id
+            if i < num_prev:
+                if ids[i] != ref_id:
+                    ids[i] = ref_id
+                    refs_changed = True
+            else:
+                ids.append(ref_id)
+
+        # --------Tables
+        tables_changed = False
+        num_prev_props = len(self.props)
+        new_values: dict[int, list[Hashable]] = {}
+        for i in changed:
+            brick = bricks[i]
+            meta = brick.meta()
+            if meta not in self.type_to_index:
+                self.type_to_index[meta] = len(self.types)
+                self.types.append(meta)
+                tables_changed = True
+            self.welds.setdefault(brick.ref.weld, len(self.welds))
+            self.editors.setdefault(brick.ref.editor, len(self.editors))
+            for prop, value in brick.ppatch.items():
+                if value is None:
+                    continue
+                prop_index = self.prop_to_index.get(prop)
+                if prop_index is None:
+                    prop_index = self._add_prop(prop, brick)
+                sub_dict = self.value_to_index[prop_index]
+                try:
+                    if value in sub_dict:
+                        continue
+                except TypeError as e:
+                    if 'unhashable' not in str(e):
+                        raise
+                    raise _e.BrickError(f'Unhashable value {value!r} for property {prop!r} of brick '
+                                        f'{brick!r}. Do not use lists. Use Vec or tuples.') from e
+                sub_dict[value] = len(sub_dict)
+                self.values[prop_index].append(value)
+                new_values.setdefault(prop_index, []).append(value)
+
+        # Values of properties using brick references depend on the brick names: when one changed,
+        # rebuild their tables from the values in use, and the records of bricks using them
+        rebuilt_props = set()
+        if refs_changed:
+            ref_to_idx = {brick.ref.id: i+1 for i, brick in enumerate(bricks)}
+            refs_changed = ref_to_idx != self.ref_to_idx
+            self.ref_to_idx = ref_to_idx
+            if refs_changed:
+                rebuilt_props = {prop_index for prop_index, pmeta in enumerate(self.prop_metas)
+                                 if pmeta.USES_BRICK_REFERENCES}
+        else:
+            for i in range(num_prev, num_bricks):
+                self.ref_to_idx[ids[i]] = i + 1
+        if rebuilt_props:
+            old_value_to_index = {}
+            for prop_index in rebuilt_props:
+                old_value_to_index[prop_index] = self.value_to_index[prop_index]
+                self.value_to_index[prop_index] = {}
+                self.values[prop_index] = new_values[prop_index] = []
+            changed_set = set(changed)
+            for i, brick in enumerate(bricks):
+                ppatch = brick.ppatch
+                for prop_index in rebuilt_props:
+                    value = ppatch.get(self.props[prop_index])
+                    if value is None:
+                        continue
+                    sub_dict = self.value_to_index[prop_index]
+                    if value not in sub_dict:
+                        sub_dict[value] = len(sub_dict)
+                        self.values[prop_index].append(value)
+                    # Records only change if the value index did
+                    if i not in changed_set and old_value_to_index[prop_index].get(value) != sub_dict[value]:
+                        changed_set.add(i)
+                        changed.append(i)
+            # Empty tables are never written
+            if not all(self.values[prop_index] for prop_index in rebuilt_props):
+                self.reset()
+                return self.serialize(bricks)
+
+        # Serialize new values
+        cached_serialize = _p.serialized_value_cache.serialize
+        version = self.version
+        for prop_index in sorted(new_values):
+            prop = self.props[prop_index]
+            pmeta = self.prop_metas[prop_index]
+            old_binaries = self.binaries[prop_index]
+            binaries = [] if prop_index in rebuilt_props else old_binaries
+            binaries = binaries + [cached_serialize(prop, pmeta, v, version, self.ref_to_idx)
+                                   for v in new_values[prop_index]]
+            if binaries == old_binaries:
+                continue
+            self.binaries[prop_index] = binaries
+
+            # Properties are invalid for a version as a whole
+            if prop_index >= num_prev_props:
+                if binaries[0] is InvalidVersion:
+                    continue
+                self.file_prop_index[prop_index] = self.num_file_props
+                self.num_file_props += 1
+            elif self.file_prop_index[prop_index] is None:
+                continue
+            if InvalidVersion in binaries:
+                raise _e.BrickError(f"Property {prop!r} is only partly valid for version {version}.")
+            self.tables[prop_index] = _property_table(prop, binaries)
+            tables_changed = True
+
+        # --------Records
+        is_post_groups_update = version >= _var.GROUPS_UPDATE
+        resized = False
+        patched = []
+        for i in changed:
+            brick = bricks[i]
+            ref, pos, rot = brick.ref, brick.pos, brick.rot
+            pairs = []
+            for prop, value in brick.ppatch.items():
+                if value is None:
+                    continue
+                prop_index = self.prop_to_index[prop]
+                file_prop_index = self.file_prop_index[prop_index]
+                if file_prop_index is not None:
+                    pairs.append(file_prop_index)
+                    pairs.append(self.value_to_index[prop_index][value])
+            num_properties = len(pairs) // 2
+            record = _record_struct(num_properties, is_post_groups_update)
+            args = [self.type_to_index[brick.meta()], record.size - 6, num_properties, *pairs,
+                    pos.x, pos.y, pos.z, rot.y, rot.z, rot.x]
+            if is_post_groups_update:
+                args += (self.editors[ref.editor], self.welds[ref.weld])
+            packed = record.pack(*args)
+            if i < num_prev:
+                if len(packed) != len(records[i]):
+                    resized = True
+                records[i] = packed
+                patched.append(i)
+            else:
+                records.append(packed)
+
+        # --------Output: patch records in place, rebuild the buffer only if records changed size
+        if tables_changed or num_bricks != num_prev:
+            head = _head(version, num_bricks, self.types, self.num_file_props)
+            for table in self.tables:
+                head += table
+            head = bytes(head)
+        else:
+            head = self.head
+
+        buffer = self.buffer
+        if resized or not buffer:
+            buffer = bytearray(head)
+            buffer += b''.join(records)
+            self.offsets = None
+        else:
+            offsets = self.offsets
+            if offsets is None:
+                offsets = self.offsets = array('I', accumulate(map(len, records[:num_prev]), initial=0))
+            if head != self.head:
+                buffer[:len(self.head)] = head
+            start = len(head)
+            for i in patched:
+                offset = start + offsets[i]
+                buffer[offset:offset + len(records[i])] = records[i]
+            if num_bricks > num_prev:
+                appended = records[num_prev:]
+                offsets.extend(accumulate(map(len, appended), initial=offsets[-1]))
+                del offsets[num_prev]  # Was the end of the previous records, now the first added
+                buffer += b''.join(appended)
+
+        self.head, self.buffer = head, buffer
+        return buffer
+
+
+    def _add_prop(self, prop: str, brick: _brick.Brick) -> int:
+        """Adds a property to the tables and returns its index."""
+        prop_serialization_class = _p.pmeta_registry.get(prop)
+        if prop_serialization_class is None:
+            if not self.allow_unknown:
+                raise _e.BrickError(f"Property {prop!r} from brick {brick!r} "
+                                    "does not have any serialization class registered.")
+            prop_serialization_class = _p.UnknownPropertyMeta
+        prop_index = self.prop_to_index[prop] = len(self.props)
+        self.props.append(prop)
+        self.prop_metas.append(prop_serialization_class)
+        self.value_to_index.append({})
+        self.values.append([])
+        self.binaries.append([])
+        self.file_prop_index.append(None)
+        self.tables.append(b'')
+        return prop_index
+
 
 
 class BRVFile:
@@ -23,10 +783,15 @@ class BRVFile:
     def __init__(
         self,
         version: int = _var.FILE_EXP_VERSION,
-        bricks: Optional[list[_brick.Brick]] = None
+        bricks: Optional[MutableSequence[_brick.Brick]] = None
     ):
         self.version: int = version
-        self.bricks: list[_brick.Brick] = [] if bricks is None else bricks
+        # A list, or a LazyBrickList after a lazy deserialize
+        self.bricks: MutableSequence[_brick.Brick] = [] if bricks is None else bricks
+        self._incremental: _IncrementalSerializer | None = None
+        # Group indexes kept up to date once built, see weld_groups and editor_groups
+        self._weld_groups: _groups.GroupIndex | None = None
+        self._editor_groups: _groups.GroupIndex | None = None
 
 
     def __add__(self, other: Self) -> Self:
@@ -54,6 +819,8 @@ class BRVFile:
             Self
         """
         self.bricks.append(brick)
+        for index in self._group_indexes():
+            index.add(brick)
         return self
 
 
@@ -67,7 +834,9 @@ class BRVFile:
         Returns:
             Self
         """
+        start = len(self.bricks)
         self.bricks.extend(bricks)
+        self._index_groups(start)
         return self
 
 
@@ -83,10 +852,387 @@ class BRVFile:
             Self: The concatenated vehicle file.
         """
 
+        start = len(self.bricks)
         self.bricks.extend(other.bricks)
+        self._index_groups(start)
+        return self
+
+
+    def _group_indexes(self) -> list['_groups.GroupIndex']:
+        """Group indexes built by weld_groups and editor_groups."""
+        return [index for index in (self._weld_groups, self._editor_groups) if index is not None]
+
+
+    def _index_groups(self, start: int) -> None:
+        """Adds the bricks from index `start` to the group indexes."""
+        indexes = self._group_indexes()
+        if not indexes:
+            return
+        added = self.bricks[start:]
+        for index in indexes:
+            for brick in added:
+                index.add(brick)
+
+
+    def remove_many(
+        self,
+        bricks: Callable[[_brick.Brick], bool] | Iterable[int],
+        repair: bool = True
+    ) -> list[_brick.Brick]:
+        """
+        Removes many bricks in a single pass over the list of bricks, instead of one list.remove
+        per brick.
+
+        With `repair`, references to the removed bricks (properties using brick references, e.g.
+        input channels) are removed from the remaining bricks, else serialize would fail on them:
+        they are dropped from multiple references (SourceBricksMeta), and single references
+        (SingleSourceBrickMeta) or emptied multiple references are reset. References to remaining
+        bricks are kept as is: they are resolved by ID.id, not by position, when serializing.
+
+        Args:
+            bricks (Callable[[Brick], bool] | Iterable[int]): Function returning whether to remove
+                a brick, or indices of the bricks to remove (negative indices count from the end);
+            repair (bool) (optional): Whether to remove the references to the removed bricks.
+                Defaults to True.
+
+        Raises:
+            IndexError: If an index is out of range.
+
+        Returns:
+            list[Brick]: Removed bricks, in order.
+        """
+        # No repeated global lookups
+        current = self.bricks
+        num_bricks = len(current)
+        kept = []
+        removed = []
+        kept_append = kept.append
+        removed_append = removed.append
+
+        if callable(bricks):
+            for brick in current:
+                if bricks(brick):
+                    removed_append(brick)
+                else:
+                    kept_append(brick)
+        else:
+            indices = set()
+            for i in bricks:
+                if not -num_bricks <= i < num_bricks:
+                    raise IndexError(f'Brick index {i} out of range for {num_bricks} bricks')
+                indices.add(i % num_bricks)
+            if not indices:
+                return removed
+            for i, brick in enumerate(current):
+                if i in indices:
+                    removed_append(brick)
+                else:
+                    kept_append(brick)
+
+        if not removed:
+            return removed
+        current[:] = kept
+        # Records moved: serialize_incremental starts over
+        self._incremental = None
+        for index in self._group_indexes():
+            for brick in removed:
+                if brick in index:
+                    index.remove(brick)
+        if not repair:
+            return removed
+
+        # References to removed bricks, unless a remaining brick has the same reference
+        gone = {brick.ref.id for brick in removed}
+        gone.difference_update(brick.ref.id for brick in kept)
+        if not gone:
+            return removed
+
+        pmeta_registry_get = _p.pmeta_registry.get
+        uses_references: dict[str, bool] = {}
+        for brick in kept:
+            ppatch = brick.ppatch
+            if not ppatch:
+                continue
+            edits = None
+            for prop, value in ppatch.items():
+                uses = uses_references.get(prop)
+                if uses is None:
+                    pmeta = pmeta_registry_get(prop)
+                    uses = uses_references[prop] = pmeta is not None and pmeta.USES_BRICK_REFERENCES
+                if not uses or value is None:
+                    continue
+                if isinstance(value, tuple):
+                    if gone.isdisjoint(value):
+                        continue
+                    value = tuple(ref for ref in value if ref not in gone)
+                elif value not in gone:
+                    continue
+                else:
+                    value = ()
+                if edits is None:
+                    edits = {}
+                edits[prop] = value
+            if edits is not None:
+                for prop, value in edits.items():
+                    if value:
+                        ppatch[prop] = value
+                    else:
+                        del ppatch[prop]
+        return removed
+
+
+
+
+    def transform(
+        self,
+        matrix: _mat.Matrix3,
+        translation: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Applies a linear transform then a translation to bricks, in one pass (vectorized with
+        NumPy if it is installed). Positions become `matrix @ pos + translation`, rotations and the
+        BrickSize property follow the matrix. See transform.transform_arrays.
+
+        Args:
+            matrix (Matrix3): 3x3 matrix, as a tuple of rows;
+            translation (Vec3) (optional): Translation. Defaults to none;
+            selection (Iterable[int]) (optional): Indices of the bricks to transform. Defaults to all.
+
+        Returns:
+            Self
+        """
+        bricks = self.bricks if selection is None else [self.bricks[i] for i in selection]
+        t = (0.0, 0.0, 0.0) if translation is None else translation.as_tuple()
+        pos = [c for b in bricks for c in (b.pos.x, b.pos.y, b.pos.z)]
+        rot = [c for b in bricks for c in (b.rot.x, b.rot.y, b.rot.z)]
+        new_pos, new_rot, scales = _transform.transform_arrays(matrix, t, pos, rot)
+
+        Vec3 = _vec.Vec3
+        BRICK_SIZE = _p.BRICK_SIZE
+        for j, brick in zip(range(0, len(new_pos), 3), bricks):
+            brick.pos = Vec3(new_pos[j], new_pos[j+1], new_pos[j+2])
+            if new_rot is not None:
+                brick.rot = Vec3(new_rot[j], new_rot[j+1], new_rot[j+2])
+            if scales is not None:
+                size = brick.ppatch.get(BRICK_SIZE)
+                if size is None:
+                    size = brick.meta().p.get(BRICK_SIZE)
+                    if size is None:
+                        continue
+                brick.ppatch[BRICK_SIZE] = Vec3(size.x * scales[j], size.y * scales[j+1], size.z * scales[j+2])
+        self.mark_changed(bricks)
         return self
 
 
+    def translate(self, offset: _vec.Vec3, selection: Optional[Iterable[int]] = None) -> Self:
+        """
+        Moves bricks by `offset`. See BRVFile.transform.
+
+        Args:
+            offset (Vec3): Translation;
+            selection (Iterable[int]) (optional): Indices of the bricks to move. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self.transform(_transform.IDENTITY, offset, selection)
+
+
+    def rotate(
+        self,
+        rot: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Rotates bricks around `origin`. See BRVFile.transform.
+
+        Args:
+            rot (Vec3): Rotation, expressed like brick rotations (degrees);
+            origin (Vec3) (optional): Center of the rotation. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to rotate. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.rotation_matrix(rot.as_tuple()), origin, selection)
+
+
+    def scale(
+        self,
+        factors: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Scales bricks from `origin` along the x, y and z axes. Sizes are exact for bricks aligned
+        with these axes. See BRVFile.transform.
+
+        Args:
+            factors (Vec3): Scale factors;
+            origin (Vec3) (optional): Center of the scale. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to scale. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.scale_matrix(factors.as_tuple()), origin, selection)
+
+
+    def mirror(
+        self,
+        normal: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Mirrors bricks across the plane of normal `normal` going through `origin`. Brick types are
+        not changed (e.g. left wings stay left wings). See BRVFile.transform.
+
+        Args:
+            normal (Vec3): Normal of the plane;
+            origin (Vec3) (optional): Point of the plane. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to mirror. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.mirror_matrix(normal.as_tuple()), origin, selection)
+
+
+    def _transform_around(
+        self,
+        matrix: _mat.Matrix3,
+        origin: Optional[_vec.Vec3],
+        selection: Optional[Iterable[int]]
+    ) -> Self:
+        """BRVFile.transform with `origin` as the fixed point."""
+        if origin is None:
+            return self.transform(matrix, None, selection)
+        return self.transform(
+            matrix, _vec.Vec3(*_transform.pivot_translation(matrix, origin.as_tuple())), selection
+        )
+
+
+    def measure(
+        self,
+        densities: Optional[dict[str, float]] = None,
+        prices: Optional[dict[str, float]] = None
+    ) -> '_measure.VehicleMeasures':
+        """
+        Measures the size, weight and price of the vehicle, as used by BRMFile.serialize.
+        See measure.measure.
+
+        Args:
+            densities (dict[str, float]) (optional): Density of each material in kg/m³.
+                Defaults to measure.MATERIAL_DENSITIES;
+            prices (dict[str, float]) (optional): Price per kilogram of each material.
+                Defaults to measure.MATERIAL_PRICES.
+
+        Returns:
+            VehicleMeasures: Axis-aligned bounding box, weight and price.
+        """
+        return _measure.measure(self.bricks, self.version, densities, prices)
+
+
+    def bounds(self) -> '_measure.VehicleBounds':
+        """
+        Computes the axis-aligned and oriented bounding boxes of the bricks, in one vectorized pass
+        if NumPy is installed. See measure.bounds_arrays.
+
+        Returns:
+            VehicleBounds: Bounding boxes.
+        """
+        pos, rot, size, _, _, rot_index = _measure.brick_arrays(self.bricks, self.version)
+        return _measure.bounds_arrays(pos, rot, size, rot_index)
+
+
+    def mass_properties(self, densities: Optional[dict[str, float]] = None) -> '_measure.MassProperties':
+        """
+        Computes the total mass and the center of mass of the bricks, in one vectorized pass if
+        NumPy is installed. See measure.mass_arrays.
+
+        Args:
+            densities (dict[str, float]) (optional): Density of each material in kg/m³.
+                Defaults to measure.MATERIAL_DENSITIES.
+
+        Returns:
+            MassProperties: Mass and center of mass.
+        """
+        pos, _, size, density, _, _ = _measure.brick_arrays(self.bricks, self.version, densities)
+        return _measure.mass_arrays(pos, size, density)
+
+
+    def spatial_index(self, cell_size: Optional[float] = None) -> '_spatial.SpatialIndex':
+        """
+        Builds a spatial index of the bricks, to find bricks in a box or radius, nearest bricks and
+        overlapping bricks without going through every brick. See spatial.SpatialIndex.
+
+        Args:
+            cell_size (float) (optional): Size of the cells of the grid in centimeters. Defaults to
+                twice the median size of the bricks.
+
+        Returns:
+            SpatialIndex: Index of the bricks. It is not updated when bricks change: use its
+            add, update and remove methods.
+        """
+        return _spatial.SpatialIndex(self.bricks, self.version, cell_size)
+
+
+    def reference_graph(self) -> '_refgraph.ReferenceGraph':
+        """
+        Builds the graph of the references between bricks (properties using brick references,
+        e.g. input channels), to find the bricks reading from a brick without going through every
+        property of every brick. See refgraph.ReferenceGraph.
+
+        Returns:
+            ReferenceGraph: Graph of the bricks. It is not updated when bricks change: use its
+            set_property, reset_property, add, update and remove methods.
+        """
+        return _refgraph.ReferenceGraph(self.bricks)
+
+
+    def weld_groups(self) -> '_groups.GroupIndex':
+        """
+        Index of the weld groups of the bricks (ID.weld), to find the bricks of a group and edit
+        whole groups without going through every brick. See groups.GroupIndex.
+
+        The index is built on the first call, then kept: add, update, update_from_brvfile and
+        remove_many update it, and serialize numbers weld groups with it. Bricks added or removed
+        by editing self.bricks directly must be added to or removed from the index as well.
+        Deserializing drops it.
+
+        Returns:
+            GroupIndex: Weld group index of the vehicle.
+        """
+        if self._weld_groups is None:
+            self._weld_groups = _groups.GroupIndex(self.bricks, _groups.WELD)
+        return self._weld_groups
+
+
+    def editor_groups(self) -> '_groups.GroupIndex':
+        """
+        Index of the editor groups of the bricks (ID.editor). See weld_groups.
+
+        Returns:
+            GroupIndex: Editor group index of the vehicle.
+        """
+        if self._editor_groups is None:
+            self._editor_groups = _groups.GroupIndex(self.bricks, _groups.EDITOR)
+        return self._editor_groups
+
+
+    def _group_numbering(self, index: '_groups.GroupIndex | None') -> dict[str | int | None, int]:
+        """
+        Index of each group in the vehicle file to start serializing with: the numbering of a
+        group index matching the bricks, else only None (no group).
+        """
+        if index is None or len(index) != len(self.bricks):
+            return {None: 0}
+        return dict(index.numbering())
+
+
 
 
     def serialize(self, allow_unknown: bool = True) -> bytearray:
@@ -96,30 +1242,36 @@ class BRVFile:
         Returns:
             bytearray: The serialized vehicle file."""
 
-        assert len(self.bricks) <= 65_534, "Too many bricks! Max: 65,534"
+        buffer = self._serialize(allow_unknown, True)
+        if buffer is None:
+            # A property is valid for some of its values only: serialize values one by one
+            buffer = self._serialize(allow_unknown, False)
+        return buffer
 
-        # Init buffer
-        buffer = bytearray()
 
-        # No repeated global lookups
-        pmeta_registry_get = _p.pmeta_registry.get
-        BrickError = _e.BrickError
-        write = buffer.extend
+    def _serialize(self, allow_unknown: bool, batch: bool) -> bytearray | None:
+        """
+        See serialize. If batch, the first value of each property is serialized when it is found,
+        and the others with the whole table (PropertyMeta.serialize_many) at the end.
 
-        # Precompile struct
-        pack_B = struct.Struct('B').pack   # 'B'  → uint8
-        pack_H = struct.Struct('<H').pack  # '<H' → uint16 LE
-        pack_I = struct.Struct('<I').pack  # '<I' → uint32 LE
+        Returns:
+            bytearray | None: The serialized vehicle file, or None if batch and some values of
+            a property are not valid for the version, but not all of them.
+        """
 
-        # --------1. HEADER
+        assert len(self.bricks) <= 65_534, "Too many bricks! Max: 65,534"
 
-        # Version Byte
-        write(pack_B(self.version))
+        # No repeated global lookups
+        pmeta_registry_get = _p.pmeta_registry.get
+        cached_serialize = _p.serialized_value_cache.serialize
+        cached_serialize_many = _p.serialized_value_cache.serialize_many
+        InvalidVersion = _p.InvalidVersion
+        BrickError = _e.BrickError
+        version = self.version
 
-        # Number of bricks
-        write(pack_H(len(self.bricks)))
+        # --------1. HEADER (written once the properties are known)
 
-        # Number of unique brick types. No .name, strings are larger objects
+        # Unique brick types. No .name, strings are larger objects
         types = []
         types_to_index = {}
         for brick in self.bricks:
@@ -127,7 +1279,6 @@ class BRVFile:
             if meta not in types_to_index:
                 types_to_index[meta] = len(types)
                 types.append(meta)
-        write(pack_H(len(types)))
 
         # ---- Building property dicts (hardest part, I NEED comments yet I hate commenting)
 
@@ -138,20 +1289,44 @@ class BRVFile:
         value_to_index = defaultdict(dict)
         # A list that for each prop gives {for each value index gives us its serialized version}
         indexes_to_serialized = {}  # defaultdict(list)
-        prop_indices_to_serialized_len_sum = []
+        # For each prop index, its serialization class and its values to serialize with the table
+        prop_serialization_classes = {}
+        pending_values = defaultdict(list)
         # A list of reference to brick index for source brick properties
         reference_to_brick_index: dict[str, int] = {b.ref.id: i+1 for i, b in enumerate(self.bricks)}
-        # A list of weld references and editor references to _ index
-        weld_reference_to_weld_index: dict[str | None, int] = {None: 0}
-        editor_reference_to_editor_index: dict[str | None, int] = {None: 0}
-
+        # A list of weld references and editor references to _ index, numbered by the group
+        # indexes if they were built. Groups they do not know are numbered when found
+        weld_reference_to_weld_index = self._group_numbering(self._weld_groups)
+        editor_reference_to_editor_index = self._group_numbering(self._editor_groups)
+        weld_reference_to_weld_index_get = weld_reference_to_weld_index.get
+        editor_reference_to_editor_index_get = editor_reference_to_editor_index.get
+
+
+        # --------4. BRICKS (packed while exploring, written after the properties)
+        # A list of the record of each brick
+        records = []
+        records_append = records.append
+        # One struct packing a whole record for each number of properties, see _record_struct
+        record_structs: dict[int, struct.Struct] = {}
+        is_post_groups_update = self.version >= _var.GROUPS_UPDATE
 
         # Exploring all bricks
         for brick in self.bricks:
 
             # Log in all weld / editor groups
-            weld_reference_to_weld_index.setdefault(brick.ref.weld, len(weld_reference_to_weld_index))
-            editor_reference_to_editor_index.setdefault(brick.ref.editor, len(editor_reference_to_editor_index))
+            ref = brick.ref
+            weld_index = weld_reference_to_weld_index_get(ref.weld)
+            if weld_index is None:
+                weld_index = weld_reference_to_weld_index[ref.weld] = len(
+                    weld_reference_to_weld_index)
+            editor_index = editor_reference_to_editor_index_get(ref.editor)
+            if editor_index is None:
+                editor_index = editor_reference_to_editor_index[ref.editor] = len(
+                    editor_reference_to_editor_index)
+
+            # Property index, value index, property index, value index, ...
+            pairs = []
+            pairs_append = pairs.append
 
             # Exploring all properties
             for prop, value in brick.ppatch.items():
@@ -159,58 +1334,83 @@ class BRVFile:
                 if value is None:
                     continue
 
-                # Get the serialization class and make sure it's valid
-                prop_serialization_class = pmeta_registry_get(prop)
-                if prop_serialization_class is None:
-                    if allow_unknown:
-                        prop_serialization_class = _p.UnknownPropertyMeta
-                    else:
-                        raise BrickError(f"Property {prop!r} from brick {brick!r} "
-                                        "does not have any serialization class registered.")
-
                 # When a new property is discovered
                 # Put in the lists if it's not already
-                if prop not in prop_to_index:
-                    prop_to_index[prop] = len(prop_to_index)
+                prop_index = prop_to_index.get(prop)
+                if prop_index is None:
+                    prop_index = prop_to_index[prop] = len(prop_to_index)
                     indexes_to_serialized[len(indexes_to_serialized)] = []
-                    prop_indices_to_serialized_len_sum.append(0)
 
                     # value_to_index and indexes_to_serialized are defaultdicts,
                     # no need to init with an empty object.
 
-                # Keep what property index we're at
-                prop_index = prop_to_index[prop]
-
                 # Handing the value:
+                # Put value in property → value → index. Cannot be None because value_to_index
+                # is handled when a new property is discovered: value_to_index.append({})
+                sub_dict = value_to_index[prop_index]
                 try:
-                    # Serialize
-                    binary = prop_serialization_class.serialize(value, self.version, reference_to_brick_index)
+                    # Values already in the table are already serialized
+                    value_index = sub_dict.get(value)
+                except TypeError as e:
+                    if 'unhashable' not in str(e):
+                        raise
+                    raise BrickError(f'Unhashable value {value!r} for property {prop!r} of brick '
+                                        f'{brick!r}. Do not use lists. Use Vec or tuples.') from e
+
+                if value_index is None and batch and sub_dict:
+                    # Not the first value: serialized with the whole table at the end
+                    value_index = sub_dict[value] = len(sub_dict)
+                    pending_values[prop_index].append(value)
+
+                elif value_index is None:
+                    # Get the serialization class and make sure it's valid
+                    prop_serialization_class = pmeta_registry_get(prop)
+                    if prop_serialization_class is None:
+                        if allow_unknown:
+                            prop_serialization_class = _p.UnknownPropertyMeta
+                        else:
+                            raise BrickError(f"Property {prop!r} from brick {brick!r} "
+                                            "does not have any serialization class registered.")
+
+                    # Serialize, reusing the bytes from previous calls if possible
+                    binary = cached_serialize(prop, prop_serialization_class, value, version,
+                                              reference_to_brick_index)
                     # print(f'{prop} > {value} : {binary=}')
                     # If version is invalid, skip
-                    if binary is _p.InvalidVersion:
+                    if binary is InvalidVersion:
                         # If this invalid is alone in the list of properties, kill it!
-                        if len(value_to_index[prop_index]) == 0:
+                        # It is always the last property discovered: indices of others don't change
+                        if len(sub_dict) == 0:
                             prop_to_index.pop(prop)  # This one use property name as key
                             value_to_index.pop(prop_index)  # Uses index
                             indexes_to_serialized.pop(prop_index)  # Uses index
                         continue
 
-                    # Put value in property → value → index. Cannot be None because value_to_index
-                    # is handled when a new property is discovered: value_to_index.append({})
-                    sub_dict = value_to_index[prop_index]
-                    sub_dict_len = len(sub_dict)  # Remember the length for later, see if it changes
-                    sub_dict.setdefault(value, sub_dict_len)
+                    # It's new, put the binary:
+                    value_index = sub_dict[value] = len(sub_dict)
+                    indexes_to_serialized[prop_index].append(binary)
+                    prop_serialization_classes[prop_index] = prop_serialization_class
 
-                    # If it's new, put the binary:
-                    if sub_dict_len != len(sub_dict):  # len(sub_dict) changed → something added
-                        indexes_to_serialized[prop_index].append(binary)
-                        prop_indices_to_serialized_len_sum[prop_index] += len(binary)
+                pairs_append(prop_index)
+                pairs_append(value_index)
 
-                except TypeError as e:
-                    if 'unhashable' not in str(e):
-                        raise
-                    raise BrickError(f'Unhashable value {value!r} for property {prop!r} of brick '
-                                        f'{brick!r}. Do not use lists. Use Vec or tuples.') from e
+            # Pack the record in a single call
+            num_properties = len(pairs) >> 1
+            record = record_structs.get(num_properties)
+            if record is None:
+                record = record_structs[num_properties] = _record_struct(num_properties, is_post_groups_update)
+            pos, rot = brick.pos, brick.rot
+            if is_post_groups_update:
+                records_append(record.pack(
+                    types_to_index[brick.meta()], record.size - 6, num_properties, *pairs,
+                    pos.x, pos.y, pos.z, rot.y, rot.z, rot.x,
+                    editor_index, weld_index
+                ))
+            else:
+                records_append(record.pack(
+                    types_to_index[brick.meta()], record.size - 6, num_properties, *pairs,
+                    pos.x, pos.y, pos.z, rot.y, rot.z, rot.x
+                ))
 
         # print(
         #     f'prop_to_index = {str(prop_to_index)[ :10000]},\n'
@@ -222,284 +1422,494 @@ class BRVFile:
         #     f'editor_reference_to_editor_index = {str(editor_reference_to_editor_index)[ :10000]}'
         # )
 
-        # ---- Back to header!
-        write(pack_H(len(prop_to_index)))
+        # Serialize the values found after the first one of each property, table by table
+        for prop, prop_index in prop_to_index.items():
+            values = pending_values.get(prop_index)
+            if not values:
+                continue
+            binaries = cached_serialize_many(prop, prop_serialization_classes[prop_index], values,
+                                             version, reference_to_brick_index)
+            if InvalidVersion in binaries:
+                return None
+            indexes_to_serialized[prop_index] += binaries
 
+        # ---- Back to header!
+        buffer = _head(version, len(self.bricks), types, len(prop_to_index))
+        write = buffer.extend
 
-        # --------2. BRICK TYPES
-        for t in types:
-            # Len of t then t
-            t_name_bytes = t.name().encode('ascii')
-            write(pack_B(len(t_name_bytes)))
-            write(t_name_bytes)
+        # --------2. BRICK TYPES (written by _head)
 
         # --------3. PROPERTIES
         for prop, prop_index in prop_to_index.items():
+            write(_property_table(prop, indexes_to_serialized[prop_index]))
 
-            # Encode the property -- Len of prop then prop
-            write(pack_B(len(prop)))
-            write(prop.encode('ascii'))
 
-            # Number of properties
-            num_values = len(value_to_index[prop_index])
-            write(pack_H(num_values))
-
-            # Write the properties:
-            # Get the sum of all properties
-            binaries = indexes_to_serialized[prop_index]
-            # Write the length
-            total_len = prop_indices_to_serialized_len_sum[prop_index]
-            write(pack_I(total_len))
+        # --------4. BRICKS
+        write(b''.join(records))
 
-            # We check the len of the binaries.
-            expected_length = len(binaries[0])  # None represent a length differs.
-            # For every binary,
-            for binary in binaries:
-                write(binary)  # Write the values
-                if len(binary) != expected_length: # If lengths differ, keep this in mind for later
-                    expected_length = None
+        return buffer
 
 
-            # Property footer
-            # If 1 element, no footer
-            if num_values > 1:
-                # If all elements are of the same length, only show the length of one (the 1st)
-                if expected_length is not None:
-                    write(pack_H(len(binaries[0])))
-                # Else elements have different lenghts, write 0 then length of each element
-                else:
-                    write(b'\x00\x00')
-                    for binary in binaries:
-                        write(pack_H(len(binary)))
+    def serialize_incremental(self, allow_unknown: bool = True) -> bytearray:
+        """
+        Serialize the vehicle file into a bytearray, reusing the output of the previous call.
 
+        Only the records of bricks added since the previous call or marked with mark_changed are
+        rebuilt and patched into the previous output, and property tables are only rebuilt when
+        new values appear (or, for properties referencing bricks, when a brick was renamed). Tables
+        keep values no brick uses anymore until most bricks changed, so the output may be larger
+        than BRVFile.serialize's.
 
-        # --------4. BRICKS
+        Bricks added with add or update, removed with remove_many and edited with transform (and
+        the methods built on it) or name_refs are tracked. Call mark_changed after editing bricks
+        otherwise, including through weld_groups and editor_groups: unmarked edits are not seen.
 
-        packinto_HIB = struct.Struct('<HIB').pack_into
-        packinto_2H = struct.Struct('<2H').pack_into  # '<H' → LE uint16
-        packinto_6f = struct.Struct('<6f').pack_into  # '<f' → sp float LE
-        
-        is_post_groups_update = self.version >= _var.GROUPS_UPDATE
+        Args:
+            allow_unknown (bool) (optional): Serialize properties without a registered
+                serialization class as raw bytes (UnknownPropertyMeta).
 
-        # Remember. Index starts at 1 here because fluppi
-        for brick in self.bricks:
+        Raises:
+            BrickError: If a property has no serialization class and allow_unknown is False, a
+                property value is unhashable, or a property is only partly valid for this version.
 
-            # Prepare some values
-            brick_meta = brick.meta()  # Get brick meta object
-            brick_ppatch = brick.ppatch  # Properties, shortcut
-            pos, rot = brick.pos, brick.rot  # pos & rot
-            brick_type_index = types_to_index[brick_meta]  # Brick type
-            # Num of properties
-            num_properties = len(brick_ppatch)
-            this_brick_size = (  # Precompute size. len() is too slow
-                1 + num_properties * 4 + 24  # Base. 1 (num_properties) + property things + pos 6*4 (floats)
-                + (4 if is_post_groups_update else 0)  # >=1.10
-            )
+        Returns:
+            bytearray: The serialized vehicle file. It is the buffer kept for the next call, which
+                edits it: copy it to keep it, and do not edit it.
+        """
+        state = self._incremental
+        if state is None or state.version != self.version or state.allow_unknown != allow_unknown:
+            state = self._incremental = _IncrementalSerializer(self.version, allow_unknown)
+        try:
+            return state.serialize(self.bricks)
+        except BaseException:
+            # The state may be half updated
+            self._incremental = None
+            raise
+
+
+    def mark_changed(self, bricks: Optional[Iterable[_brick.Brick]] = None) -> Self:
+        """
+        Tells serialize_incremental that bricks were edited (position, rotation, ID or properties).
+        Without bricks, the next serialize_incremental rebuilds everything, e.g. after inserting,
+        replacing or reordering bricks in self.bricks.
 
-            # Create buffer with allocated memory : 2 for brick type + 4 for size + the rest "this_brick_size"
-            subbuf = bytearray(6 + this_brick_size)
-
-            # 1. Brick header: Brick type index and size & beginning of properties
-            packinto_HIB(subbuf, 0,
-                brick_type_index,  # Brick type index
-                this_brick_size,  # Size
-                num_properties  # Number of properties
-            ) # Offset 0 → 2+4+1=7
-
-            # 2. Properties
-            # Size of properties section
-            # Each property  # From now on, we need to calculate offset
-            offset = 7
-            for prop in brick_ppatch:
-                value = brick_ppatch[prop]
-                prop_index = prop_to_index[prop]  # Key index
-                sub_list = value_to_index[prop_index]  # Where to get vals → index of this property
-                value_index = sub_list[value]  # Value index
-                # Add key and value to subbuffer
-                packinto_2H(subbuf, offset, prop_index, value_index)
-                offset += 4  # Each property uses 4 bytes
-
-            # 3. Position and rotation
-            # For loop to reduce code repetition
-            packinto_6f(subbuf, offset,
-                pos.x, pos.y, pos.z,
-                rot.y, rot.z, rot.x
-            )
-            offset += 24
+        Args:
+            bricks (Iterable[Brick]) (optional): Edited bricks of this vehicle. Defaults to all.
 
-            # 4. Weld and editor groups
-            if is_post_groups_update:
-                weld_index = weld_reference_to_weld_index[brick.ref.weld]
-                editor_index = editor_reference_to_editor_index[brick.ref.editor]
-                # Last operation, no need to increment buffer offset
-                packinto_2H(subbuf, offset, editor_index, weld_index)
+        Returns:
+            Self
+        """
+        state = self._incremental
+        if state is None:
+            return self
+        if bricks is None:
+            self._incremental = None
+        else:
+            state.mark(bricks)
+        return self
 
-            write(subbuf)
 
+    def deserialize(
+        self,
+        buffer: bytes | bytearray | memoryview,
+        allow_unknown: bool = True,
+        check_version: bool = False,
+        lazy: bool = False,
+        int_refs: bool = False
+    ) -> None:
+        """Deserialize a bytearray into this vehicle.
 
-        return buffer
+        The buffer is walked through a single memoryview using offsets, property values are the only
+        bytes copied out of it.
 
+        Args:
+            buffer (bytes | bytearray | memoryview): Buffer to deserialize;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            check_version (bool) (optional): Raise if the buffer's version differs from self.version;
+            lazy (bool) (optional): Replace self.bricks with a LazyBrickList, building bricks only
+                when they are first accessed. The buffer is kept alive and must not be modified;
+            int_refs (bool) (optional): Name bricks and groups with integer handles instead of
+                strings: ID.id is the index of the brick in the file, ID.weld and ID.editor the
+                index of its group (None if it has none), and source brick properties hold brick
+                indices. No string is built per brick, see BRVFile.name_refs to get string names.
+
+        Raises:
+            BrickError: If the buffer is empty, has an unknown brick type / property and
+                allow_unknown is False, or if the versions mismatch and check_version is True.
+        """
+        if lazy:
+            # The lazy list keeps reading from the buffer
+            self._deserialize_view(memoryview(buffer), allow_unknown, check_version, True, int_refs)
+            return
+        # Released on exit so mapped files (see BRVFile.load) can be closed right after, even on error
+        with memoryview(buffer) as mv:
+            self._deserialize_view(mv, allow_unknown, check_version, False, int_refs)
 
 
-    def deserialize(self, buffer: bytes | bytearray, allow_unknown: bool = True, check_version: bool = False) -> None:
-        """Deserialize a bytearray into this vehicle.
+    def load(
+        self,
+        path: str | os.PathLike,
+        allow_unknown: bool = True,
+        check_version: bool = False,
+        lazy: bool = False,
+        int_refs: bool = False
+    ) -> Self:
+        """
+        Deserialize a vehicle file into this vehicle. The file is memory-mapped and parsed straight
+        from the mapping, it is never read into a bytes object.
 
         Args:
-            buffer (bytes): Bytearray to deserialize
+            path (str | os.PathLike): Path of the .brv file;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            check_version (bool) (optional): Raise if the file's version differs from self.version;
+            lazy (bool) (optional): See BRVFile.deserialize. The mapping stays open as long as
+                self.bricks is this LazyBrickList;
+            int_refs (bool) (optional): See BRVFile.deserialize.
+
+        Raises:
+            BrickError: See BRVFile.deserialize.
+
+        Returns:
+            Self
         """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped, deserialize reports them
+                self.deserialize(f.read(), allow_unknown, check_version, lazy, int_refs)
+                return self
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if lazy:
+            self.deserialize(mm, allow_unknown, check_version, True, int_refs)
+            return self
+        with mm:
+            self.deserialize(mm, allow_unknown, check_version, int_refs=int_refs)
+        return self
 
-        # Change the type of the buffer to something we want
-        if not isinstance(buffer, io.BytesIO):
-            buffer = io.BytesIO(buffer)
 
-        # No repeated global lookups and stuff
-        read = buffer.read
-        pmeta_registry_get = _p.pmeta_registry.get
-        BrickError = _e.BrickError
-        unpack_B = struct.Struct('B').unpack
-        unpack_H = struct.Struct('<H').unpack
-        unpack_I = struct.Struct('<I').unpack
-        unpack_6f = struct.Struct('<6f').unpack
+    @classmethod
+    def open(
+        cls,
+        path: str | os.PathLike,
+        allow_unknown: bool = True,
+        lazy: bool = False,
+        int_refs: bool = False
+    ) -> Self:
+        """
+        Create a new instance from a vehicle file, using the version found in the file.
+        See BRVFile.load.
 
+        Args:
+            path (str | os.PathLike): Path of the .brv file;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            lazy (bool) (optional): See BRVFile.deserialize;
+            int_refs (bool) (optional): See BRVFile.deserialize.
 
-        # --------1. HEADER
-        self.bricks.clear()
-        to_version, = unpack_B(read(1))
+        Raises:
+            BrickError: See BRVFile.deserialize.
+
+        Returns:
+            BRVFile: New instance
+        """
+        return cls().load(path, allow_unknown, lazy=lazy, int_refs=int_refs)
+
+
+    def _deserialize_view(
+        self,
+        mv: memoryview,
+        allow_unknown: bool,
+        check_version: bool,
+        lazy: bool,
+        int_refs: bool = False
+    ) -> None:
+        """Deserialize a memoryview into this vehicle. See BRVFile.deserialize."""
+
+        if not mv:
+            raise _e.BrickError('Cannot deserialize an empty buffer')
+        to_version = mv[0]
         if check_version and to_version != self.version:
-            raise BrickError(f'Version mismatch with check_version specified: {to_version} != {self.version}')
+            raise _e.BrickError(f'Version mismatch with check_version specified: {to_version} != {self.version}')
 
+        reader = _BrickRecordReader(mv, allow_unknown, int_refs)
         self.version = to_version
+        self._incremental = None
+        self._weld_groups = None
+        self._editor_groups = None
 
-        num_bricks, = unpack_H(read(2))
-        num_brick_types, = unpack_H(read(2))
-        num_properties, = unpack_H(read(2))
+        if lazy:
+            self.bricks = LazyBrickList(reader)
+        elif isinstance(self.bricks, LazyBrickList):
+            # A new list: clearing the LazyBrickList would keep its reader and buffer alive
+            self.bricks = reader.read_bricks(reader.bricks_offset, 0, reader.num_bricks)
+        else:
+            self.bricks.clear()
+            self.bricks.extend(reader.read_bricks(reader.bricks_offset, 0, reader.num_bricks))
 
-        # --------2. BRICK TYPES
-        # print(buffer.getvalue()[buffer.tell():])
-        brick_types_list = [read(unpack_B(read(1))[0]).decode('ascii') for _ in range(num_brick_types)]
 
+    def name_refs(self) -> Self:
+        """
+        Replaces the integer handles of bricks deserialized with int_refs (see BRVFile.deserialize)
+        with the names they would have had without it: 'brick_{i}', 'weld_{i}' and 'editor_{i}'.
+        References that are already strings are kept.
 
-        # --------3. PROPERTIES
-        # This will bind to each property a list,
-        # where for each index
-        # we can find its corresponding value.
-        # defaultdict will make sure we can append values to keys yet to be added
-        property_names_list = []
-        prop_to_index_to_value = defaultdict(list)
+        Returns:
+            Self
+        """
+        self.mark_changed()
 
-        # Get the default if the property deserialization class is not found
-        prop_deserialization_class_default = _p.UnknownPropertyMeta if allow_unknown else None
-        for i in range(num_properties):
-            # print(buffer.getvalue()[buffer.tell():])
-            # Property name
-            prop_len, = unpack_B(read(1))
-            prop = read(prop_len).decode('ascii')
-            # Add it to the list of index → property
-            property_names_list.append(prop)
-            # Get property's deserializer for later
-            prop_deserialization_class = pmeta_registry_get(prop, prop_deserialization_class_default)
-            if prop_deserialization_class is None:
-                raise BrickError(f"Unknown property '{prop}'")
+        # No repeated global lookups
+        pmeta_registry_get = _p.pmeta_registry.get
+        to_names = _to_names
+        uses_references: dict[str, bool] = {}
 
-            # Number of values for this property
-            num_values, = unpack_H(read(2))
-            # Byte length of the property's values
-            len_binaries, = unpack_I(read(4))
+        for brick in self.bricks:
+            ref = brick.ref
+            if isinstance(ref.id, int):
+                ref.id = f'brick_{ref.id}'
+            if isinstance(ref.weld, int):
+                ref.weld = f'weld_{ref.weld}'
+            if isinstance(ref.editor, int):
+                ref.editor = f'editor_{ref.editor}'
+            ppatch = brick.ppatch
+            for prop, value in ppatch.items():
+                uses = uses_references.get(prop)
+                if uses is None:
+                    pmeta = pmeta_registry_get(prop)
+                    uses = uses_references[prop] = pmeta is not None and pmeta.USES_BRICK_REFERENCES
+                if uses:
+                    ppatch[prop] = to_names(value)
+        return self
 
-            # Get properties in a separate buffer
-            property_buffer = io.BytesIO(read(len_binaries))
-            read_property = property_buffer.read
 
-            # print(f'{num_values=}, {len_binaries=},'
-            #       f'{property_buffer.getvalue()[property_buffer.tell():]},
-            #       f'\n{buffer.getvalue()[buffer.tell():]}')
 
-            # Figure out the length of each element
-            if num_values > 1:
+class BRVStreamWriter:
+    """
+    Writes a vehicle file from bricks given one at a time, without keeping them alive.
 
-                # Read the length of the first probable element
-                first_element_length, = unpack_H(read(2))
-                # print(f'{first_element_length=}')
-                # If it's zero, then it means each element has a different length
-                if first_element_length == 0:
-                    elements_length = tuple((unpack_H(read(2))[0] for _ in range(num_values)))
-                # Else all elements have the same length
-                else:
-                    elements_length = tuple((first_element_length for _ in range(num_values)))
+    Property values are interned into the value tables as bricks arrive, brick records are spooled
+    to a temporary file (kept in memory while small). The header, brick types, property tables and
+    spooled records are written to the file object on close. The output is the same as
+    BRVFile.serialize for the same bricks.
 
-            # If there is only one value, brick rigs does not indicate it → no read_property here
-            else:
-                elements_length = (len_binaries,)
+    Use it as a context manager: nothing is written if an exception is raised inside.
+    """
 
-            for elem_length in elements_length:
-                # Read the value
-                # print(f'{elements_length=}, {elem_length=}')
-                value = read_property(elem_length)
-                deserialized_value = prop_deserialization_class.deserialize(bytearray(value), self.version)
-                if deserialized_value is _p.InvalidVersion:
-                    raise BrickError(f"Invalid version for property '{prop}'")
-                prop_to_index_to_value[prop].append(deserialized_value)
+    def __init__(
+        self,
+        file: BinaryIO,
+        version: int = _var.FILE_EXP_VERSION,
+        allow_unknown: bool = True,
+        spool_max_size: int = 1 << 20
+    ):
+        """
+        Args:
+            file (BinaryIO): Writable binary file object, written to on close;
+            version (int) (optional): Version of the vehicle file;
+            allow_unknown (bool) (optional): Serialize properties without a registered
+                serialization class as raw bytes (UnknownPropertyMeta);
+            spool_max_size (int) (optional): Size in bytes of spooled records above which they are
+                moved from memory to a temporary file.
+        """
+        self.file: BinaryIO = file
+        self.version: int = version
+        self.allow_unknown: bool = allow_unknown
+        self.closed: bool = False
+        # Outlives __init__, closed by close() or __exit__
+        self._spool = tempfile.SpooledTemporaryFile(  # pylint: disable=consider-using-with
+            max_size=spool_max_size
+        )
+        self._num_bricks: int = 0
+        self._types: list[_bt.BrickMeta] = []
+        self._type_to_index: dict[_bt.BrickMeta, int] = {}
+        self._prop_to_index: dict[str, int] = {}
+        self._prop_metas: list[type[_p.PropertyMeta]] = []
+        self._value_to_index: list[dict[Hashable, int]] = []
+        self._reference_to_brick_index: dict[str, int] = {}
+        self._weld_to_index: dict[str | None, int] = {None: 0}
+        self._editor_to_index: dict[str | None, int] = {None: 0}
+        self._is_post_groups_update: bool = version >= _var.GROUPS_UPDATE
+
+
+    def __len__(self) -> int:
+        return self._num_bricks
+
+
+    def __enter__(self) -> Self:
+        return self
 
-        # -------- 4. BRICKS
-        
-        is_post_groups_update: bool = self.version >= _var.GROUPS_UPDATE
-        unpack_2H = struct.Struct('<2H').unpack
 
-        # For each brick
-        brick_meta_default = _bt.UnknownBrickMeta if allow_unknown else None
-        for i in range(num_bricks):
-            # Brick type
-            # print(f'{brick_types_list=}, {buffer.getvalue()[buffer.tell()-30:buffer.tell()]}'
-            #       f'|  {buffer.getvalue()[buffer.tell():]}')
-            brick_type_index = unpack_H(read(2))[0]
-            # print(f'{brick_type_index=}')
-            brick_type_name = brick_types_list[brick_type_index]
-            brick_meta = _bt.bt_registry.get(brick_type_name, brick_meta_default)
-            if brick_meta is None:
-                raise BrickError(f"Unknown brick type '{brick_type_name}'")
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.closed = True
+            self._spool.close()
 
-            # Properties
-            # Byte length of the properties part of this brick. We do not need it
-            read(4)
-            # Get the number of properties
-            num_properties, = unpack_B(read(1))
 
-            # Unpack the properties
-            properties: dict[str, Hashable] = {}
-            for _ in range(num_properties):
-                # Get the type
-                type_index, = unpack_H(read(2))
-                type_name = property_names_list[type_index]
-                # Get the value
-                value_index, = unpack_H(read(2))
-                value_deserialized = prop_to_index_to_value[type_name][value_index]
-                # Add the value to the list of found properties
-                properties[type_name] = value_deserialized
+    def add(self, brick: _brick.Brick) -> Self:
+        """
+        Adds a brick to the vehicle. The brick is not referenced afterwards.
 
-            # Position and rotation
-            pos_x, pos_y, pos_z, rot_y, rot_z, rot_x = unpack_6f(read(6 * 4))
+        Args:
+            brick (Brick): Brick to add.
 
+        Raises:
+            BrickError: If there are too many bricks, a property value is unhashable, or a property
+                has no serialization class and allow_unknown is False.
+            ValueError: If the writer is closed.
 
-            if is_post_groups_update:
-                # Get the indexes
-                editor_idx, weld_idx = unpack_2H(read(4))
-                # Then create the brick
-                self.add(_brick.Brick(
-                    ref=_id.ID(f'brick_{i}',
-                        f'weld_{weld_idx}' if weld_idx > 0 else None,
-                        f'editor_{editor_idx}' if editor_idx > 0 else None
-                    ),
-                    meta=brick_meta,
-                    pos=_vec.Vec3(pos_x, pos_y, pos_z),
-                    rot=_vec.Vec3(rot_x, rot_y, rot_z),
-                    ppatch=properties
-                ))
-            else:
-                # Create the brick
-                self.add(_brick.Brick(
-                    ref=_id.ID(f'brick_{i}'),
-                    meta=brick_meta,
-                    pos=_vec.Vec3(pos_x, pos_y, pos_z),
-                    rot=_vec.Vec3(rot_x, rot_y, rot_z),
-                    ppatch=properties
-                ))
+        Returns:
+            Self
+        """
+        if self.closed:
+            raise ValueError('I/O operation on closed BRVStreamWriter.')
+        if self._num_bricks >= 65_534:
+            raise _e.BrickError('Too many bricks! Max: 65,534')
+
+        # Brick type
+        meta = brick.meta()
+        type_index = self._type_to_index.get(meta)
+        if type_index is None:
+            type_index = self._type_to_index[meta] = len(self._types)
+            self._types.append(meta)
+
+        # Properties
+        prop_to_index = self._prop_to_index
+        pairs = []
+        for prop, value in brick.ppatch.items():
+            if value is None:
+                continue
+            prop_index = prop_to_index.get(prop)
+            if prop_index is None:
+                prop_serialization_class = _p.pmeta_registry.get(prop)
+                if prop_serialization_class is None:
+                    if not self.allow_unknown:
+                        raise _e.BrickError(f"Property {prop!r} from brick {brick!r} "
+                                            "does not have any serialization class registered.")
+                    prop_serialization_class = _p.UnknownPropertyMeta
+                prop_index = prop_to_index[prop] = len(self._prop_metas)
+                self._prop_metas.append(prop_serialization_class)
+                self._value_to_index.append({})
+            sub_dict = self._value_to_index[prop_index]
+            try:
+                value_index = sub_dict.setdefault(value, len(sub_dict))
+            except TypeError as e:
+                if 'unhashable' not in str(e):
+                    raise
+                raise _e.BrickError(f'Unhashable value {value!r} for property {prop!r} of brick '
+                                    f'{brick!r}. Do not use lists. Use Vec or tuples.') from e
+            pairs.append(prop_index)
+            pairs.append(value_index)
+
+        # References, weld and editor groups
+        ref = brick.ref
+        self._num_bricks += 1
+        self._reference_to_brick_index[ref.id] = self._num_bricks
+        weld_index = self._weld_to_index.setdefault(ref.weld, len(self._weld_to_index))
+        editor_index = self._editor_to_index.setdefault(ref.editor, len(self._editor_to_index))
+
+        # Record
+        num_properties = len(pairs) // 2
+        record = _record_struct(num_properties, self._is_post_groups_update)
+        pos, rot = brick.pos, brick.rot
+        if self._is_post_groups_update:
+            self._spool.write(record.pack(type_index, record.size - 6, num_properties, *pairs,
+                                          pos.x, pos.y, pos.z, rot.y, rot.z, rot.x,
+                                          editor_index, weld_index))
+        else:
+            self._spool.write(record.pack(type_index, record.size - 6, num_properties, *pairs,
+                                          pos.x, pos.y, pos.z, rot.y, rot.z, rot.x))
+        return self
+
+
+    def update(self, bricks: Iterable[_brick.Brick]) -> Self:
+        """
+        Adds all bricks from any iterable, e.g. a generator. See BRVStreamWriter.add.
+
+        Args:
+            bricks (Iterable[Brick]): Bricks to add.
+
+        Returns:
+            Self
+        """
+        add = self.add
+        for brick in bricks:
+            add(brick)
+        return self
+
+
+    def close(self) -> None:
+        """
+        Writes the vehicle file to the file object. The file object itself is not closed.
+        Does nothing if the writer is already closed.
+
+        Raises:
+            BrickError: If a property is only partly valid for this version.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self._write()
+        finally:
+            self._spool.close()
+
+
+    def _write(self) -> None:
+        """Writes the header, tables and spooled records. See BRVStreamWriter.close."""
+
+        version = self.version
+        InvalidVersion = _p.InvalidVersion
+
+        # --------3. PROPERTIES (first, as invalid properties are dropped from the header)
+        # Property index in the records → property index in the file, None if dropped
+        prop_remap: list[int | None] = []
+        properties_section = []
+        write_prop = properties_section.append
+        cached_serialize = _p.serialized_value_cache.serialize
+        for prop, prop_index in self._prop_to_index.items():
+            prop_serialization_class = self._prop_metas[prop_index]
+            binaries = [
+                cached_serialize(prop, prop_serialization_class, v, version, self._reference_to_brick_index)
+                for v in self._value_to_index[prop_index]
+            ]
+            # Properties are invalid for a version as a whole
+            if binaries[0] is InvalidVersion:
+                prop_remap.append(None)
+                continue
+            if InvalidVersion in binaries:
+                raise _e.BrickError(f"Property {prop!r} is only partly valid for version {version}.")
+
+            prop_remap.append(len(prop_remap) - prop_remap.count(None))
+            write_prop(_property_table(prop, binaries))
+
+        num_props = len(prop_remap) - prop_remap.count(None)
+
+        # --------1. HEADER and 2. BRICK TYPES
+        write = self.file.write
+        write(_head(version, self._num_bricks, self._types, num_props))
+
+        write(b''.join(properties_section))
+
+        # --------4. BRICKS
+        spool = self._spool
+        spool.seek(0)
+        if num_props == len(prop_remap):
+            shutil.copyfileobj(spool, self.file)
+            return
+
+        # Some properties were dropped: remove them from each record
+        read = spool.read
+        groups_size = 4 if self._is_post_groups_update else 0
+        for _ in range(self._num_bricks):
+            type_index, _size, num_properties = _UNPACK_FROM_HIB(read(7))
+            pairs = struct.unpack(f'<{2 * num_properties}H', read(4 * num_properties))
+            kept = []
+            for j in range(0, len(pairs), 2):
+                prop_index = prop_remap[pairs[j]]
+                if prop_index is not None:
+                    kept.append(prop_index)
+                    kept.append(pairs[j+1])
+            num_kept = len(kept) // 2
+            write(struct.pack(f'<HIB{2 * num_kept}H', type_index, 1 + 4 * num_kept + 24 + groups_size,
+                              num_kept, *kept))
+            write(read(24 + groups_size))
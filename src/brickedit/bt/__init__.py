@@ -1,4 +1,18 @@
 from .base import *
-from .meta import *
-from .classes import *
-from . import inner_properties
+from .. import lazy as _lazy
+
+# meta, classes and inner_properties define hundreds of brick types: they are imported on first
+# use, when looking up one of their names or bt_registry.
+_LAZY_MODULES: tuple[str, ...] = ('meta', 'classes')
+
+
+def __getattr__(name: str):
+    return _lazy.lazy_getattr(globals(), _LAZY_MODULES, bt_registry, name)
+
+
+def __dir__() -> list[str]:
+    try:
+        _lazy.lazy_getattr(globals(), _LAZY_MODULES, bt_registry, '__all__')
+    except AttributeError:
+        pass
+    return sorted(globals())
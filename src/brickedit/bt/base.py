@@ -1,6 +1,9 @@
 from collections.abc import Hashable
 from typing import TypeVar
 from abc import ABC, abstractmethod
+import importlib
+
+from .. import lazy as _lazy
 
 class BrickMeta(ABC):
 
@@ -31,7 +34,11 @@ class BrickMeta(ABC):
 
 
 
-bt_registry: dict[str, BrickMeta] = {}
+def _load_brick_types() -> None:
+    importlib.import_module('.classes', __package__)
+
+bt_registry: _lazy.LazyRegistry[str, BrickMeta] = _lazy.LazyRegistry(_load_brick_types)
+"""Default registry. Filled with BrickEdit's brick types (bt.classes) on first use."""
 
 _Tbm = TypeVar('_Tbm', bound=BrickMeta)
 
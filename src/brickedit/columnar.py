@@ -0,0 +1,859 @@
+"""Columnar (struct-of-arrays) storage of vehicles."""
+import os
+import mmap
+import struct
+from array import array
+from itertools import compress
+from typing import Self, Optional, Iterable, Iterator, Final
+from collections.abc import Hashable
+
+from . import brick as _brick
+from . import brv as _brv
+from . import vec as _vec
+from . import var as _var
+from . import bt as _bt
+from . import p as _p
+from . import exceptions as _e
+from . import id as _id
+from . import transform as _transform
+from . import measure as _measure
+from .vhelper import mat as _mat
+
+
+UNSET_VALUE_INDEX: Final[int] = 0xFFFF
+"""Value index of a property column for bricks that do not have this property."""
+
+_UNSET_VALUE_INDEX_BYTES: Final[bytes] = array('H', (UNSET_VALUE_INDEX,)).tobytes()
+
+
+def _used_groups_column(groups: list[str | None], column: array) -> array:
+    """
+    Group column of the groups in use: group tables keep groups no brick uses anymore. Index 0
+    (no group) is always kept. Returns `column` itself if all groups are in use.
+    """
+    used_groups = set(column)
+    used_groups.add(0)
+    if len(used_groups) == len(groups):
+        return column
+    remap = [0] * len(groups)
+    for new_index, old_index in enumerate(sorted(used_groups)):
+        remap[old_index] = new_index
+    return array('H', map(remap.__getitem__, column))
+
+
+
+class ColumnarBRVFile:
+    """
+    A Brick Rigs vehicle file storing its bricks as columns instead of Brick objects,
+    like the vehicle file itself. It offers the same methods as BRVFile, building Brick objects
+    only when they are requested.
+
+    Attributes:
+        version (int): Version of the vehicle file;
+        brick_types (list[BrickMeta]): Brick type table;
+        type_index (array): Index in brick_types of each brick (typecode 'H');
+        pos (array): Position of each brick, as x, y, z triplets (typecode 'f');
+        rot (array): Rotation of each brick, as x, y, z triplets (typecode 'f');
+        ids (list[str | int]): Reference (ID.id) of each brick;
+        welds (list[str | None]): Weld group table, welds[0] is None (no weld group);
+        weld_index (array): Index in welds of each brick (typecode 'H');
+        editors (list[str | None]): Editor group table, editors[0] is None (no editor group);
+        editor_index (array): Index in editors of each brick (typecode 'H');
+        key_sets (list[tuple[str, ...]]): Table of the property names set on bricks, in order;
+        key_set_index (array): Index in key_sets of each brick (typecode 'H');
+        prop_values (dict[str, list[Hashable]]): Value table of each property;
+        prop_columns (dict[str, array]): Index in prop_values of each brick's value for each
+            property (typecode 'H'). Only meaningful for bricks whose key set has this property,
+            may be shorter than the number of bricks. UNSET_VALUE_INDEX otherwise.
+    """
+
+    def __init__(
+        self,
+        version: int = _var.FILE_EXP_VERSION,
+        bricks: Optional[Iterable[_brick.Brick]] = None
+    ):
+        self.version: int = version
+        self.clear()
+        if bricks is not None:
+            self.update(bricks)
+
+
+    def clear(self) -> Self:
+        """
+        Removes all bricks and empties all tables.
+
+        Returns:
+            Self
+        """
+        self.brick_types: list[_bt.BrickMeta] = []
+        self._brick_type_to_index: dict[_bt.BrickMeta, int] = {}
+        self.type_index: array = array('H')
+        self.pos: array = array('f')
+        self.rot: array = array('f')
+        self.ids: list[str] = []
+        self.welds: list[str | None] = [None]
+        self._weld_to_index: dict[str | None, int] = {None: 0}
+        self.weld_index: array = array('H')
+        self.editors: list[str | None] = [None]
+        self._editor_to_index: dict[str | None, int] = {None: 0}
+        self.editor_index: array = array('H')
+        self.key_sets: list[tuple[str, ...]] = []
+        self._key_set_to_index: dict[tuple[str, ...], int] = {}
+        self.key_set_index: array = array('H')
+        self.prop_values: dict[str, list[Hashable]] = {}
+        # Built on demand for deserialized tables, see _value_index
+        self._prop_value_to_index: dict[str, dict[Hashable, int]] = {}
+        self.prop_columns: dict[str, array] = {}
+        return self
+
+
+    # -------- Tables
+
+
+    def _value_index(self, prop: str, value: Hashable) -> int:
+        """Index of `value` in the value table of `prop`, adding it if needed."""
+        value_to_index = self._prop_value_to_index.get(prop)
+        if value_to_index is None:
+            values = self.prop_values.setdefault(prop, [])
+            value_to_index = {v: i for i, v in enumerate(values)}
+            self._prop_value_to_index[prop] = value_to_index
+            self.prop_columns.setdefault(prop, array('H'))
+        try:
+            index = value_to_index.get(value)
+        except TypeError as e:
+            if 'unhashable' not in str(e):
+                raise
+            raise _e.BrickError(f'Unhashable value {value!r} for property {prop!r}. '
+                                'Do not use lists. Use Vec or tuples.') from e
+        if index is None:
+            index = len(value_to_index)
+            if index >= UNSET_VALUE_INDEX:
+                raise _e.BrickError(f'Too many values for property {prop!r}! Max: {UNSET_VALUE_INDEX}')
+            value_to_index[value] = index
+            self.prop_values[prop].append(value)
+        return index
+
+
+    def _write(self, i: int, brick: _brick.Brick) -> None:
+        """Writes `brick` at index `i` of every column. `i` may be the number of bricks (append)."""
+
+        # Brick type
+        meta = brick.meta()
+        type_index = self._brick_type_to_index.get(meta)
+        if type_index is None:
+            type_index = self._brick_type_to_index[meta] = len(self.brick_types)
+            self.brick_types.append(meta)
+
+        # Groups
+        ref = brick.ref
+        weld_index = self._weld_to_index.get(ref.weld)
+        if weld_index is None:
+            weld_index = self._weld_to_index[ref.weld] = len(self.welds)
+            self.welds.append(ref.weld)
+        editor_index = self._editor_to_index.get(ref.editor)
+        if editor_index is None:
+            editor_index = self._editor_to_index[ref.editor] = len(self.editors)
+            self.editors.append(ref.editor)
+
+        # Properties: None counts as not set
+        key_set = tuple(k for k, v in brick.ppatch.items() if v is not None)
+        key_set_index = self._key_set_to_index.get(key_set)
+        if key_set_index is None:
+            key_set_index = self._key_set_to_index[key_set] = len(self.key_sets)
+            self.key_sets.append(key_set)
+        for prop in key_set:
+            value_index = self._value_index(prop, brick.ppatch[prop])
+            column = self.prop_columns[prop]
+            if len(column) <= i:
+                column.frombytes(_UNSET_VALUE_INDEX_BYTES * (i + 1 - len(column)))
+            column[i] = value_index
+
+        pos, rot = brick.pos, brick.rot
+        if i == len(self.ids):
+            self.type_index.append(type_index)
+            self.pos.extend((pos.x, pos.y, pos.z))
+            self.rot.extend((rot.x, rot.y, rot.z))
+            self.ids.append(ref.id)
+            self.weld_index.append(weld_index)
+            self.editor_index.append(editor_index)
+            self.key_set_index.append(key_set_index)
+        else:
+            self.type_index[i] = type_index
+            self.pos[3*i : 3*i+3] = array('f', (pos.x, pos.y, pos.z))
+            self.rot[3*i : 3*i+3] = array('f', (rot.x, rot.y, rot.z))
+            self.ids[i] = ref.id
+            self.weld_index[i] = weld_index
+            self.editor_index[i] = editor_index
+            self.key_set_index[i] = key_set_index
+
+
+    # -------- BRVFile-like API
+
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+    def __getitem__(self, i: int) -> _brick.Brick:
+        """
+        Builds the brick at index `i`. Edits to the returned brick are not written back,
+        use __setitem__ or set_property.
+
+        Args:
+            i (int): Index of the brick.
+
+        Returns:
+            Brick: New brick.
+        """
+        i = range(len(self.ids))[i]
+        prop_values = self.prop_values
+        prop_columns = self.prop_columns
+        return _brick.Brick(
+            _id.ID(self.ids[i], self.welds[self.weld_index[i]], self.editors[self.editor_index[i]]),
+            self.brick_types[self.type_index[i]],
+            _vec.Vec3(*self.pos[3*i : 3*i+3]),
+            _vec.Vec3(*self.rot[3*i : 3*i+3]),
+            {k: prop_values[k][prop_columns[k][i]] for k in self.key_sets[self.key_set_index[i]]}
+        )
+
+
+    def __setitem__(self, i: int, brick: _brick.Brick) -> None:
+        self._write(range(len(self.ids))[i], brick)
+
+
+    def __delitem__(self, i: int) -> None:
+        i = range(len(self.ids))[i]
+        del self.type_index[i]
+        del self.pos[3*i : 3*i+3]
+        del self.rot[3*i : 3*i+3]
+        del self.ids[i]
+        del self.weld_index[i]
+        del self.editor_index[i]
+        del self.key_set_index[i]
+        for column in self.prop_columns.values():
+            if len(column) > i:
+                del column[i]
+
+
+    def __iter__(self) -> Iterator[_brick.Brick]:
+        for i in range(len(self.ids)):
+            yield self[i]
+
+
+    @property
+    def bricks(self) -> list[_brick.Brick]:
+        """
+        Builds all bricks. Edits to the returned list and bricks are not written back.
+
+        Returns:
+            list[Brick]: New bricks.
+        """
+        return list(self)
+
+
+    def add(self, brick: _brick.Brick) -> Self:
+        """
+        Add a new brick to the vehicle.
+
+        Args:
+            brick (Brick): The brick to add.
+
+        Returns:
+            Self
+        """
+        self._write(len(self.ids), brick)
+        return self
+
+
+    def update(self, bricks: Iterable[_brick.Brick]) -> Self:
+        """
+        Updates (extend) the columns with bricks.
+
+        Args:
+            bricks (Iterable[Brick]): Bricks to add.
+
+        Returns:
+            Self
+        """
+        for brick in bricks:
+            self._write(len(self.ids), brick)
+        return self
+
+
+    def update_from_brvfile(self, other: '_brv.BRVFile | ColumnarBRVFile') -> Self:
+        """
+        Updates (extend) the columns with the bricks of another vehicle file.
+
+        Args:
+            other (BRVFile | ColumnarBRVFile): The vehicle file to update from.
+
+        Returns:
+            Self
+        """
+        return self.update(other if isinstance(other, ColumnarBRVFile) else other.bricks)
+
+
+    def get_property(self, i: int, p: str) -> Hashable:
+        """
+        Gets a property of the brick at index `i` without building the brick.
+        Defaults to the value from its BrickMeta, like Brick.get_property.
+
+        Args:
+            i (int): Index of the brick;
+            p (str): The name of the property to get.
+
+        Raises:
+            BrickError: If the property does not exist on this brick.
+
+        Returns:
+            Hashable: The value of the property.
+        """
+        i = range(len(self.ids))[i]
+        if p in self.key_sets[self.key_set_index[i]]:
+            return self.prop_values[p][self.prop_columns[p][i]]
+        return self[i].get_property(p)
+
+
+    def set_property(self, i: int, p: str, v: Hashable) -> Self:
+        """
+        Sets a property of the brick at index `i` without building the brick.
+
+        Args:
+            i (int): Index of the brick;
+            p (str): The name of the property to set;
+            v (Hashable): The value to set the property to. None resets the property.
+
+        Returns:
+            Self
+        """
+        i = range(len(self.ids))[i]
+        key_set = self.key_sets[self.key_set_index[i]]
+        if v is None:
+            if p not in key_set:
+                return self
+            new_key_set = tuple(k for k in key_set if k != p)
+        else:
+            value_index = self._value_index(p, v)
+            column = self.prop_columns[p]
+            if len(column) <= i:
+                column.frombytes(_UNSET_VALUE_INDEX_BYTES * (i + 1 - len(column)))
+            column[i] = value_index
+            if p in key_set:
+                return self
+            new_key_set = key_set + (p,)
+        key_set_index = self._key_set_to_index.get(new_key_set)
+        if key_set_index is None:
+            key_set_index = self._key_set_to_index[new_key_set] = len(self.key_sets)
+            self.key_sets.append(new_key_set)
+        self.key_set_index[i] = key_set_index
+        return self
+
+
+    def to_brvfile(self) -> '_brv.BRVFile':
+        """
+        Builds a BRVFile holding Brick objects.
+
+        Returns:
+            BRVFile: New instance
+        """
+        return _brv.BRVFile(self.version, self.bricks)
+
+
+    @classmethod
+    def from_brvfile(cls, brv: '_brv.BRVFile') -> Self:
+        """
+        Builds the columns of a BRVFile.
+
+        Args:
+            brv (BRVFile): The vehicle file to store.
+
+        Returns:
+            ColumnarBRVFile: New instance
+        """
+        return cls(brv.version, brv.bricks)
+
+
+    # -------- Transforms
+
+
+    def transform(
+        self,
+        matrix: _mat.Matrix3,
+        translation: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Applies a linear transform then a translation to bricks, working on the pos and rot columns.
+        See BRVFile.transform.
+
+        Args:
+            matrix (Matrix3): 3x3 matrix, as a tuple of rows;
+            translation (Vec3) (optional): Translation. Defaults to none;
+            selection (Iterable[int]) (optional): Indices of the bricks to transform. Defaults to all.
+
+        Returns:
+            Self
+        """
+        t = (0.0, 0.0, 0.0) if translation is None else translation.as_tuple()
+        n = len(self.ids)
+        if selection is None:
+            indices = range(n)
+            pos, rot = self.pos, self.rot
+        else:
+            indices = [range(n)[i] for i in selection]
+            pos = [c for i in indices for c in self.pos[3*i:3*i+3]]
+            rot = [c for i in indices for c in self.rot[3*i:3*i+3]]
+        new_pos, new_rot, scales = _transform.transform_arrays(matrix, t, pos, rot)
+
+        if selection is None:
+            self.pos = array('f', new_pos)
+            if new_rot is not None:
+                self.rot = array('f', new_rot)
+        else:
+            for j, i in zip(range(0, len(new_pos), 3), indices):
+                self.pos[3*i:3*i+3] = array('f', new_pos[j:j+3])
+                if new_rot is not None:
+                    self.rot[3*i:3*i+3] = array('f', new_rot[j:j+3])
+
+        if scales is not None:
+            BRICK_SIZE = _p.BRICK_SIZE
+            for j, i in zip(range(0, len(scales), 3), indices):
+                if BRICK_SIZE in self.key_sets[self.key_set_index[i]]:
+                    size = self.prop_values[BRICK_SIZE][self.prop_columns[BRICK_SIZE][i]]
+                else:
+                    size = self.brick_types[self.type_index[i]].p.get(BRICK_SIZE)
+                    if size is None:
+                        continue
+                self.set_property(i, BRICK_SIZE, _vec.Vec3(
+                    size.x * scales[j], size.y * scales[j+1], size.z * scales[j+2]
+                ))
+        return self
+
+
+    def translate(self, offset: _vec.Vec3, selection: Optional[Iterable[int]] = None) -> Self:
+        """
+        Moves bricks by `offset`. See BRVFile.translate.
+
+        Args:
+            offset (Vec3): Translation;
+            selection (Iterable[int]) (optional): Indices of the bricks to move. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self.transform(_transform.IDENTITY, offset, selection)
+
+
+    def rotate(
+        self,
+        rot: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Rotates bricks around `origin`. See BRVFile.rotate.
+
+        Args:
+            rot (Vec3): Rotation, expressed like brick rotations (degrees);
+            origin (Vec3) (optional): Center of the rotation. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to rotate. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.rotation_matrix(rot.as_tuple()), origin, selection)
+
+
+    def scale(
+        self,
+        factors: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Scales bricks from `origin` along the x, y and z axes. See BRVFile.scale.
+
+        Args:
+            factors (Vec3): Scale factors;
+            origin (Vec3) (optional): Center of the scale. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to scale. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.scale_matrix(factors.as_tuple()), origin, selection)
+
+
+    def mirror(
+        self,
+        normal: _vec.Vec3,
+        origin: Optional[_vec.Vec3] = None,
+        selection: Optional[Iterable[int]] = None
+    ) -> Self:
+        """
+        Mirrors bricks across the plane of normal `normal` going through `origin`. See BRVFile.mirror.
+
+        Args:
+            normal (Vec3): Normal of the plane;
+            origin (Vec3) (optional): Point of the plane. Defaults to (0, 0, 0);
+            selection (Iterable[int]) (optional): Indices of the bricks to mirror. Defaults to all.
+
+        Returns:
+            Self
+        """
+        return self._transform_around(_transform.mirror_matrix(normal.as_tuple()), origin, selection)
+
+
+    def _transform_around(
+        self,
+        matrix: _mat.Matrix3,
+        origin: Optional[_vec.Vec3],
+        selection: Optional[Iterable[int]]
+    ) -> Self:
+        """ColumnarBRVFile.transform with `origin` as the fixed point."""
+        if origin is None:
+            return self.transform(matrix, None, selection)
+        return self.transform(
+            matrix, _vec.Vec3(*_transform.pivot_translation(matrix, origin.as_tuple())), selection
+        )
+
+
+    # -------- Measures
+
+
+    def measure(
+        self,
+        densities: Optional[dict[str, float]] = None,
+        prices: Optional[dict[str, float]] = None
+    ) -> '_measure.VehicleMeasures':
+        """
+        Measures the size, weight and price of the vehicle from its columns. See BRVFile.measure.
+
+        Args:
+            densities (dict[str, float]) (optional): Density of each material in kg/m³.
+                Defaults to measure.MATERIAL_DENSITIES;
+            prices (dict[str, float]) (optional): Price per kilogram of each material.
+                Defaults to measure.MATERIAL_PRICES.
+
+        Returns:
+            VehicleMeasures: Axis-aligned bounding box, weight and price.
+        """
+        return _measure.measure_arrays(*_measure.columnar_arrays(self, densities, prices))
+
+
+    def bounds(self) -> '_measure.VehicleBounds':
+        """
+        Computes the axis-aligned and oriented bounding boxes of the bricks from the pos and rot
+        columns. See BRVFile.bounds.
+
+        Returns:
+            VehicleBounds: Bounding boxes.
+        """
+        pos, rot, size, _, _ = _measure.columnar_arrays(self)
+        return _measure.bounds_arrays(pos, rot, size)
+
+
+    def mass_properties(self, densities: Optional[dict[str, float]] = None) -> '_measure.MassProperties':
+        """
+        Computes the total mass and the center of mass of the bricks from their columns.
+        See BRVFile.mass_properties.
+
+        Args:
+            densities (dict[str, float]) (optional): Density of each material in kg/m³.
+                Defaults to measure.MATERIAL_DENSITIES.
+
+        Returns:
+            MassProperties: Mass and center of mass.
+        """
+        pos, _, size, density, _ = _measure.columnar_arrays(self, densities)
+        return _measure.mass_arrays(pos, size, density)
+
+
+    # -------- (De)serialization
+
+
+    def serialize(self, allow_unknown: bool = True) -> bytearray:
+        """
+        Serialize the vehicle file into a bytearray. Brick records are packed with one precompiled
+        struct per set of properties. Table entries no brick uses are not written.
+
+        Args:
+            allow_unknown (bool) (optional): Serialize properties without a registered
+                serialization class as raw bytes (UnknownPropertyMeta).
+
+        Raises:
+            BrickError: If a property has no serialization class and allow_unknown is False.
+
+        Returns:
+            bytearray: The serialized vehicle file.
+        """
+
+        num_bricks = len(self.ids)
+        assert num_bricks <= 65_534, "Too many bricks! Max: 65,534"
+
+        version = self.version
+        BrickError = _e.BrickError
+        pmeta_registry_get = _p.pmeta_registry.get
+        cached_serialize_many = _p.serialized_value_cache.serialize_many
+        InvalidVersion = _p.InvalidVersion
+        # Writing shared with BRVFile
+        head = _brv._head  # pylint: disable=protected-access
+        property_table = _brv._property_table  # pylint: disable=protected-access
+        record_struct = _brv._record_struct  # pylint: disable=protected-access
+
+        # Only write brick types, key sets and properties that are in use
+        used_types = sorted(set(self.type_index))
+        type_remap = [0] * len(self.brick_types)
+        for new_index, old_index in enumerate(used_types):
+            type_remap[old_index] = new_index
+        used_key_sets = set(self.key_set_index)
+        used_props = set()
+        for key_set_index in used_key_sets:
+            used_props.update(self.key_sets[key_set_index])
+
+        reference_to_brick_index: dict[str, int] = {ref: i+1 for i, ref in enumerate(self.ids)}
+
+        # Value tables keep values no brick uses anymore (after set_property, __setitem__ or
+        # __delitem__): only write the values in use, remapping the columns if needed
+        prop_columns: dict[str, array] = {}
+        prop_values: dict[str, list[Hashable]] = {}
+        for prop, values in self.prop_values.items():
+            if prop not in used_props:
+                continue
+            column = self.prop_columns[prop]
+            with_prop = {k for k in used_key_sets if prop in self.key_sets[k]}
+            if len(with_prop) == len(used_key_sets):
+                used_values = set(column[:num_bricks])
+            else:
+                used_values = set(compress(column, map(with_prop.__contains__, self.key_set_index)))
+            if len(used_values) == len(values):
+                prop_columns[prop] = column
+                prop_values[prop] = values
+                continue
+            used_values = sorted(used_values)
+            remap = array('H', (UNSET_VALUE_INDEX,)) * (UNSET_VALUE_INDEX + 1)
+            for new_index, old_index in enumerate(used_values):
+                remap[old_index] = new_index
+            prop_columns[prop] = array('H', map(remap.__getitem__, column))
+            prop_values[prop] = [values[old_index] for old_index in used_values]
+
+        # Same for weld and editor groups
+        weld_index = _used_groups_column(self.welds, self.weld_index)
+        editor_index = _used_groups_column(self.editors, self.editor_index)
+
+        # --------3. PROPERTIES (first, as invalid properties are dropped from the header)
+        prop_to_index: dict[str, int] = {}
+        properties_section = []
+        write_prop = properties_section.append
+        for prop, values in prop_values.items():
+
+            prop_serialization_class = pmeta_registry_get(prop)
+            if prop_serialization_class is None:
+                if not allow_unknown:
+                    raise BrickError(f"Property {prop!r} does not have any serialization class registered.")
+                prop_serialization_class = _p.UnknownPropertyMeta
+
+            binaries = cached_serialize_many(prop, prop_serialization_class, values, version,
+                                             reference_to_brick_index)
+            # Properties are invalid for a version as a whole
+            if binaries[0] is InvalidVersion:
+                continue
+            if InvalidVersion in binaries:
+                raise BrickError(f"Property {prop!r} is only partly valid for version {version}.")
+
+            prop_to_index[prop] = len(prop_to_index)
+            write_prop(property_table(prop, binaries))
+
+        # --------1. HEADER and 2. BRICK TYPES
+        buffer = head(version, num_bricks, (self.brick_types[i] for i in used_types), len(prop_to_index))
+        write = buffer.extend
+        write(b''.join(properties_section))
+
+        # --------4. BRICKS
+        is_post_groups_update = version >= _var.GROUPS_UPDATE
+
+        # One struct for each set of properties: header, pairs, pos & rot, groups
+        key_set_structs: dict[int, tuple[struct.Struct, int, tuple[tuple[int, array], ...]]] = {}
+        for key_set_index in used_key_sets:
+            pairs = tuple((prop_to_index[k], prop_columns[k])
+                          for k in self.key_sets[key_set_index] if k in prop_to_index)
+            record = record_struct(len(pairs), is_post_groups_update)
+            # Size counts from the number of properties (after brick type index and size)
+            key_set_structs[key_set_index] = (record, record.size - 6, pairs)
+
+        type_index, pos, rot = self.type_index, self.pos, self.rot
+        key_set_index_column = self.key_set_index
+        records = []
+        records_append = records.append
+        for i in range(num_bricks):
+            record, size, pairs = key_set_structs[key_set_index_column[i]]
+            args = [type_remap[type_index[i]], size, len(pairs)]
+            for prop_index, column in pairs:
+                args.append(prop_index)
+                args.append(column[i])
+            j = 3 * i
+            args += (pos[j], pos[j+1], pos[j+2], rot[j+1], rot[j+2], rot[j])
+            if is_post_groups_update:
+                args += (editor_index[i], weld_index[i])
+            records_append(record.pack(*args))
+
+        write(b''.join(records))
+        return buffer
+
+
+    def deserialize(
+        self,
+        buffer: bytes | bytearray | memoryview,
+        allow_unknown: bool = True,
+        check_version: bool = False,
+        int_refs: bool = False
+    ) -> None:
+        """
+        Deserialize a bytearray into the columns of this vehicle, without building Brick objects.
+        Bricks are named like BRVFile.deserialize.
+
+        Args:
+            buffer (bytes | bytearray | memoryview): Buffer to deserialize;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            check_version (bool) (optional): Raise if the buffer's version differs from self.version;
+            int_refs (bool) (optional): Name bricks and groups with integer handles, see
+                BRVFile.deserialize.
+
+        Raises:
+            BrickError: If the buffer is empty, has an unknown brick type / property and
+                allow_unknown is False, or if the versions mismatch and check_version is True.
+        """
+        with memoryview(buffer) as mv:
+
+            if not mv:
+                raise _e.BrickError('Cannot deserialize an empty buffer')
+            to_version = mv[0]
+            if check_version and to_version != self.version:
+                raise _e.BrickError(f'Version mismatch with check_version specified: {to_version} != {self.version}')
+
+            reader = _brv._BrickRecordReader(mv, allow_unknown, int_refs)  # pylint: disable=protected-access
+            self.clear()
+            self.version = to_version
+            num_bricks = reader.num_bricks
+
+            # Tables are the ones of the file
+            self.brick_types = reader.brick_metas
+            self._brick_type_to_index = {meta: i for i, meta in enumerate(reader.brick_metas)}
+            property_names = reader.property_names
+            self.prop_values = dict(zip(property_names, reader.property_values))
+            columns = [array('H', _UNSET_VALUE_INDEX_BYTES * num_bricks) for _ in property_names]
+            self.prop_columns = dict(zip(property_names, columns))
+
+            # No repeated global lookups and stuff
+            unpack_from_HIB = _brv._UNPACK_FROM_HIB  # pylint: disable=protected-access
+            unpack_from_6f = _brv._UNPACK_FROM_6f  # pylint: disable=protected-access
+            unpack_from_2H = _brv._UNPACK_FROM_2H  # pylint: disable=protected-access
+            is_post_groups_update: bool = to_version >= _var.GROUPS_UPDATE
+            type_index_append = self.type_index.append
+            pos_extend, rot_extend = self.pos.extend, self.rot.extend
+            weld_index_append = self.weld_index.append
+            editor_index_append = self.editor_index.append
+            key_set_index_append = self.key_set_index.append
+            key_sets, key_set_to_index = self.key_sets, self._key_set_to_index
+            # Key set index from the tuple of property indices
+            prop_indices_to_key_set: dict[tuple[int, ...], int] = {}
+
+            offset = reader.bricks_offset
+            for i in range(num_bricks):
+                brick_type_index, _, num_properties = unpack_from_HIB(mv, offset)
+                offset += 7
+                type_index_append(brick_type_index)
+
+                prop_indices = []
+                for _ in range(num_properties):
+                    type_index, value_index = unpack_from_2H(mv, offset)
+                    offset += 4
+                    columns[type_index][i] = value_index
+                    prop_indices.append(type_index)
+                prop_indices = tuple(prop_indices)
+                key_set_index = prop_indices_to_key_set.get(prop_indices)
+                if key_set_index is None:
+                    key_set = tuple(property_names[k] for k in prop_indices)
+                    key_set_index = key_set_to_index.setdefault(key_set, len(key_sets))
+                    if key_set_index == len(key_sets):
+                        key_sets.append(key_set)
+                    prop_indices_to_key_set[prop_indices] = key_set_index
+                key_set_index_append(key_set_index)
+
+                pos_x, pos_y, pos_z, rot_y, rot_z, rot_x = unpack_from_6f(mv, offset)
+                offset += 24
+                pos_extend((pos_x, pos_y, pos_z))
+                rot_extend((rot_x, rot_y, rot_z))
+
+                if is_post_groups_update:
+                    editor_idx, weld_idx = unpack_from_2H(mv, offset)
+                    offset += 4
+                    editor_index_append(editor_idx)
+                    weld_index_append(weld_idx)
+
+            if not is_post_groups_update:
+                self.weld_index = array('H', bytes(2 * num_bricks))
+                self.editor_index = array('H', bytes(2 * num_bricks))
+
+            # Same names as BRVFile.deserialize
+            if int_refs:
+                self.ids = list(range(num_bricks))
+                self.welds = [None, *range(1, max(self.weld_index, default=0) + 1)]
+                self.editors = [None, *range(1, max(self.editor_index, default=0) + 1)]
+            else:
+                self.ids = [f'brick_{i}' for i in range(num_bricks)]
+                self.welds = [None] + [f'weld_{i}' for i in range(1, max(self.weld_index, default=0) + 1)]
+                self.editors = [None] + [f'editor_{i}' for i in range(1, max(self.editor_index, default=0) + 1)]
+            self._weld_to_index = {w: i for i, w in enumerate(self.welds)}
+            self._editor_to_index = {e: i for i, e in enumerate(self.editors)}
+
+
+    def load(
+        self,
+        path: str | os.PathLike,
+        allow_unknown: bool = True,
+        check_version: bool = False,
+        int_refs: bool = False
+    ) -> Self:
+        """
+        Deserialize a vehicle file into this vehicle, see BRVFile.load.
+
+        Args:
+            path (str | os.PathLike): Path of the .brv file;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            check_version (bool) (optional): Raise if the file's version differs from self.version;
+            int_refs (bool) (optional): See BRVFile.deserialize.
+
+        Raises:
+            BrickError: See ColumnarBRVFile.deserialize.
+
+        Returns:
+            Self
+        """
+        with open(path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                # Empty files cannot be mapped, deserialize reports them
+                self.deserialize(f.read(), allow_unknown, check_version, int_refs)
+                return self
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                self.deserialize(mm, allow_unknown, check_version, int_refs)
+        return self
+
+
+    @classmethod
+    def open(cls, path: str | os.PathLike, allow_unknown: bool = True, int_refs: bool = False) -> Self:
+        """
+        Create a new instance from a vehicle file, using the version found in the file.
+
+        Args:
+            path (str | os.PathLike): Path of the .brv file;
+            allow_unknown (bool) (optional): Accept unknown brick types and properties;
+            int_refs (bool) (optional): See BRVFile.deserialize.
+
+        Raises:
+            BrickError: See ColumnarBRVFile.deserialize.
+
+        Returns:
+            ColumnarBRVFile: New instance
+        """
+        return cls().load(path, allow_unknown, int_refs=int_refs)
@@ -0,0 +1,300 @@
+"""
+Index of the weld groups or editor groups of bricks (ID.weld, ID.editor), to find the bricks of a
+group without going through every brick, and to edit whole groups.
+"""
+from typing import Optional, Iterable, Iterator, Final
+
+from . import brick as _brick
+
+
+WELD: Final[str] = 'weld'
+"""Kind of GroupIndex indexing weld groups (ID.weld)."""
+
+EDITOR: Final[str] = 'editor'
+"""Kind of GroupIndex indexing editor groups (ID.editor)."""
+
+Group = str | int
+"""Reference of a group (ID.weld or ID.editor), None being no group."""
+
+
+class GroupIndex:
+    """
+    Weld groups or editor groups of bricks: the group of each brick, and the bricks of each group.
+    Bricks are the keys of the index. Bricks without a group (None) are indexed, but None is not
+    a group.
+
+    The group of a brick is its ID.weld or ID.editor: edit groups through regroup, merge and split,
+    or call update(brick) after editing the ID of a brick.
+    """
+
+    __slots__ = ('kind', '_group_of', '_members', '_numbers')
+
+    def __init__(self, bricks: Optional[Iterable[_brick.Brick]] = None, kind: str = WELD):
+        """
+        Args:
+            bricks (Iterable[Brick]) (optional): Bricks to index. Defaults to none;
+            kind (str) (optional): WELD or EDITOR. Defaults to WELD.
+
+        Raises:
+            ValueError: If kind is neither WELD nor EDITOR.
+        """
+        if kind != WELD and kind != EDITOR:
+            raise ValueError(f'Unknown group kind {kind!r}, expected {WELD!r} or {EDITOR!r}')
+        self.kind: str = kind
+        self._group_of: dict[_brick.Brick, Group | None] = {}
+        # Ordered set of the bricks of each group, in order of creation of the groups
+        self._members: dict[Group, dict[_brick.Brick, None]] = {}
+        # Cache of numbering(), cleared when a group is created or emptied
+        self._numbers: dict[Group | None, int] | None = None
+
+        if bricks is None:
+            return
+
+        # No repeated global lookups
+        group_of = self._group_of
+        members = self._members
+        weld = kind == WELD
+
+        for brick in bricks:
+            if brick in group_of:
+                self._remove(brick)
+            group = brick.ref.weld if weld else brick.ref.editor
+            group_of[brick] = group
+            if group is not None:
+                bucket = members.get(group)
+                if bucket is None:
+                    members[group] = {brick: None}
+                else:
+                    bucket[brick] = None
+
+
+    def __len__(self) -> int:
+        return len(self._group_of)
+
+    def __contains__(self, brick: _brick.Brick) -> bool:
+        return brick in self._group_of
+
+    def __iter__(self) -> Iterator[_brick.Brick]:
+        return iter(self._group_of)
+
+
+    # -------- Edition
+
+
+    def _insert(self, brick: _brick.Brick, group: Group | None) -> None:
+        self._group_of[brick] = group
+        if group is None:
+            return
+        bucket = self._members.get(group)
+        if bucket is None:
+            self._members[group] = {brick: None}
+            self._numbers = None
+        else:
+            bucket[brick] = None
+
+    def _remove(self, brick: _brick.Brick) -> None:
+        group = self._group_of.pop(brick)
+        if group is None:
+            return
+        bucket = self._members[group]
+        del bucket[brick]
+        if not bucket:
+            del self._members[group]
+            self._numbers = None
+
+    def _move(self, brick: _brick.Brick, group: Group | None) -> None:
+        """Moves an indexed brick to `group`, editing its ID."""
+        if self._group_of[brick] == group:
+            return
+        self._remove(brick)
+        setattr(brick.ref, self.kind, group)
+        self._insert(brick, group)
+
+    def add(self, brick: _brick.Brick) -> None:
+        """
+        Adds a brick to the index, or reads its group again if it is already indexed.
+
+        Args:
+            brick (Brick): Brick to add.
+        """
+        if brick in self._group_of:
+            self._remove(brick)
+        self._insert(brick, getattr(brick.ref, self.kind))
+
+    def update(self, brick: _brick.Brick) -> None:
+        """
+        Reads the group of a brick again, after its ID was edited.
+
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+        """
+        self._remove(brick)
+        self._insert(brick, getattr(brick.ref, self.kind))
+
+    def remove(self, brick: _brick.Brick) -> None:
+        """
+        Removes a brick from the index.
+
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+        """
+        self._remove(brick)
+
+    def regroup(self, bricks: Iterable[_brick.Brick], group: Group | None) -> None:
+        """
+        Moves bricks to a group, setting their ID.weld or ID.editor.
+
+        Args:
+            bricks (Iterable[Brick]): Indexed bricks;
+            group (str | int | None): Group to move them to, new or not. None removes them from
+                their group.
+
+        Raises:
+            KeyError: If a brick is not indexed.
+        """
+        move = self._move
+        for brick in bricks:
+            move(brick, group)
+
+    def merge(self, groups: Iterable[Group], into: Optional[Group] = None) -> Group:
+        """
+        Moves the bricks of groups into a single group.
+
+        Args:
+            groups (Iterable[str | int]): Groups to merge;
+            into (str | int) (optional): Group to move the bricks to, new or not. Defaults to the
+                first of `groups`.
+
+        Raises:
+            ValueError: If there is no group to merge into.
+
+        Returns:
+            str | int: The group the bricks were moved to.
+        """
+        groups = list(groups)
+        if into is None:
+            if not groups:
+                raise ValueError('No group to merge')
+            into = groups[0]
+        for group in groups:
+            if group != into and group in self._members:
+                self.regroup(list(self._members[group]), into)
+        return into
+
+    def split(
+        self,
+        group: Group,
+        bricks: Iterable[_brick.Brick],
+        new_group: Optional[Group] = None
+    ) -> Group:
+        """
+        Moves some bricks of a group to a new group.
+
+        Args:
+            group (str | int): Group to split;
+            bricks (Iterable[Brick]): Bricks of `group` to move;
+            new_group (str | int) (optional): Group to move them to. Defaults to a new group named
+                '{kind}_{n}', e.g. 'weld_12'.
+
+        Raises:
+            ValueError: If a brick is not in `group`.
+
+        Returns:
+            str | int: The group the bricks were moved to.
+        """
+        bricks = list(bricks)
+        bucket = self._members.get(group, {})
+        for brick in bricks:
+            if brick not in bucket:
+                raise ValueError(f'{brick!r} is not in {self.kind} group {group!r}')
+        if new_group is None:
+            new_group = self.new_group()
+        self.regroup(bricks, new_group)
+        return new_group
+
+    def new_group(self) -> str:
+        """
+        Returns:
+            str: A group name that is not in use, '{kind}_{n}' (e.g. 'weld_12').
+        """
+        n = len(self._members)
+        while f'{self.kind}_{n}' in self._members:
+            n += 1
+        return f'{self.kind}_{n}'
+
+
+    # -------- Queries
+
+
+    def group(self, brick: _brick.Brick) -> Group | None:
+        """
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+
+        Returns:
+            str | int | None: Group of the brick, None if it has none.
+        """
+        return self._group_of[brick]
+
+    def members(self, group: Group) -> list[_brick.Brick]:
+        """
+        Args:
+            group (str | int): Group.
+
+        Returns:
+            list[Brick]: Bricks of the group, empty if the group does not exist.
+        """
+        return list(self._members.get(group, ()))
+
+    def size(self, group: Group) -> int:
+        """
+        Args:
+            group (str | int): Group.
+
+        Returns:
+            int: Number of bricks of the group.
+        """
+        return len(self._members.get(group, ()))
+
+    def in_group(self, brick: _brick.Brick, group: Group) -> bool:
+        """
+        Args:
+            brick (Brick): Brick;
+            group (str | int): Group.
+
+        Returns:
+            bool: Whether the brick is indexed in the group.
+        """
+        bucket = self._members.get(group)
+        return bucket is not None and brick in bucket
+
+    def groups(self) -> list[Group]:
+        """
+        Returns:
+            list[str | int]: Groups having bricks, in order of creation.
+        """
+        return list(self._members)
+
+    def numbering(self) -> dict[Group | None, int]:
+        """
+        Index of each group in the vehicle file: None is 0, groups are numbered from 1 in order
+        of creation. Used by BRVFile.serialize. Do not modify the returned dict.
+
+        Returns:
+            dict[str | int | None, int]: Index of each group.
+        """
+        numbers = self._numbers
+        if numbers is None:
+            numbers = self._numbers = {None: 0}
+            for group in self._members:
+                numbers[group] = len(numbers)
+        return numbers
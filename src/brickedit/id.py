@@ -4,10 +4,15 @@ class ID:
 
     __slots__ = ('id', 'weld', 'editor')
 
-    def __init__(self, id_: str, weld: Optional[str] = None, editor: Optional[str] = None):
-        self.id: str = id_
-        self.weld: Optional[str] = weld
-        self.editor: Optional[str] = editor
+    def __init__(
+        self,
+        id_: str | int,
+        weld: Optional[str | int] = None,
+        editor: Optional[str | int] = None
+    ):
+        self.id: str | int = id_
+        self.weld: Optional[str | int] = weld
+        self.editor: Optional[str | int] = editor
 
     def __repr__(self):
         return f'ID({self.id!r}, {self.weld!r}, {self.editor!r})'
@@ -0,0 +1,395 @@
+"""
+Persistent index of the metadata of a folder of vehicles, stored in a SQLite database.
+
+Each vehicle is a folder holding a MetaData.brm file and usually a Vehicle.brv file. Refreshing the
+index only parses files whose size or modification time changed, and queries are answered from
+the database without reading any vehicle file.
+"""
+import os
+import struct
+from dataclasses import dataclass
+from typing import Optional, Any, Self, Final
+
+from . import brm as _brm
+from . import vec as _vec
+
+
+METADATA_FILE_NAME: Final[str] = 'MetaData.brm'
+VEHICLE_FILE_NAME: Final[str] = 'Vehicle.brv'
+
+# Every field of the metadata files is indexed
+_CONFIG = _brm.BRMDeserializationConfig(
+    version=True, name=True, description=True, brick_count=True, size=True, weight=True,
+    price=True, author=True, creation_time=True, last_update_time=True, visibility=True, tags=True
+)
+
+# Version (1), number of bricks, brick types and properties (2 each)
+_UNPACK_BRV_HEADER = struct.Struct('<B3H').unpack
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vehicles (
+    folder TEXT PRIMARY KEY,
+    root TEXT NOT NULL,
+    brm_mtime_ns INTEGER, brm_size INTEGER,
+    brv_mtime_ns INTEGER, brv_size INTEGER,
+    brm_version INTEGER, name TEXT, description TEXT, brick_count INTEGER,
+    size_x REAL, size_y REAL, size_z REAL, weight REAL, price REAL, author TEXT,
+    creation_time INTEGER, last_update_time INTEGER, visibility INTEGER, tags TEXT,
+    brv_version INTEGER, brv_brick_count INTEGER, brv_brick_type_count INTEGER,
+    brv_property_count INTEGER
+);
+CREATE INDEX IF NOT EXISTS vehicles_root ON vehicles (root);
+CREATE INDEX IF NOT EXISTS vehicles_brick_count ON vehicles (brick_count);
+CREATE INDEX IF NOT EXISTS vehicles_last_update_time ON vehicles (last_update_time);
+CREATE TABLE IF NOT EXISTS tags (
+    tag TEXT NOT NULL,
+    folder TEXT NOT NULL REFERENCES vehicles (folder) ON DELETE CASCADE,
+    PRIMARY KEY (tag, folder)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tags_folder ON tags (folder);
+'''
+
+# Columns of the vehicles table after the stat signature, in the order of _read_vehicle rows
+_DATA_COLUMNS = (
+    'brm_version', 'name', 'description', 'brick_count', 'size_x', 'size_y', 'size_z', 'weight',
+    'price', 'author', 'creation_time', 'last_update_time', 'visibility', 'tags', 'brv_version',
+    'brv_brick_count', 'brv_brick_type_count', 'brv_property_count'
+)
+
+_INSERT_VEHICLE = (
+    'INSERT OR REPLACE INTO vehicles (folder, root, brm_mtime_ns, brm_size, brv_mtime_ns, '
+    f'brv_size, {", ".join(_DATA_COLUMNS)}) VALUES ({", ".join("?" * (6 + len(_DATA_COLUMNS)))})'
+)
+
+# Columns returned by queries, in the order of IndexEntry fields
+_SELECT_ENTRY = f'SELECT folder, {", ".join(_DATA_COLUMNS)} FROM vehicles'
+
+# Columns accepted by VehicleIndex.query's order_by
+_ORDER_COLUMNS: Final[frozenset[str]] = frozenset(('folder',) + _DATA_COLUMNS)
+
+
+
+@dataclass(frozen=True, slots=True)
+class IndexEntry:
+    """
+    Indexed metadata of a vehicle, see VehicleIndex. Fields are None if the file they are read from
+    is missing or could not be deserialized.
+
+    Attributes:
+        folder (str): Path of the vehicle folder;
+        brm_version (int | None): Version of the metadata file;
+        name (str | None), description (str | None), brick_count (int | None), size (Vec3 | None),
+        weight (float | None), price (float | None), author (int | None),
+        creation_time (int | None), last_update_time (int | None), visibility (int | None),
+        tags (tuple[str, ...] | None): Data of the metadata file, see BRMFile.deserialize;
+        brv_version (int | None): Version of the vehicle file;
+        brv_brick_count (int | None): Number of bricks in the vehicle file;
+        brv_brick_type_count (int | None): Number of brick types in the vehicle file;
+        brv_property_count (int | None): Number of properties in the vehicle file.
+    """
+
+    folder: str
+    brm_version: int | None
+    name: str | None
+    description: str | None
+    brick_count: int | None
+    size: _vec.Vec3 | None
+    weight: float | None
+    price: float | None
+    author: int | None
+    creation_time: int | None
+    last_update_time: int | None
+    visibility: int | None
+    tags: tuple[str, ...] | None
+    brv_version: int | None
+    brv_brick_count: int | None
+    brv_brick_type_count: int | None
+    brv_property_count: int | None
+
+    @classmethod
+    def _from_row(cls, row: tuple) -> Self:
+        (folder, brm_version, name, description, brick_count, sx, sy, sz, weight, price, author,
+         creation_time, last_update_time, visibility, tags, *brv) = row
+        return cls(
+            folder, brm_version, name, description, brick_count,
+            None if sx is None else _vec.Vec3(sx, sy, sz), weight, price,
+            None if author is None else int(author), creation_time, last_update_time, visibility,
+            None if tags is None else tuple(tags.split('\n')) if tags else (), *brv
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class IndexRefreshResult:
+    """
+    Result of VehicleIndex.refresh.
+
+    Attributes:
+        parsed (int): Number of vehicles added or updated;
+        unchanged (int): Number of vehicles whose files did not change;
+        removed (int): Number of vehicles removed from the index;
+        failed (int): Number of vehicles whose files could not be read or deserialized (counted in
+            parsed as well, their fields are None).
+    """
+
+    parsed: int
+    unchanged: int
+    removed: int
+    failed: int
+
+
+
+def _stat_signature(path: str) -> tuple[int, int] | tuple[None, None]:
+    """Modification time (ns) and size of the file at `path`, or (None, None) if it is missing."""
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None, None
+    return st.st_mtime_ns, st.st_size
+
+
+def _read_vehicle(brm_path: str, brv_path: str) -> tuple[tuple, bool]:
+    """
+    Reads the metadata file and the header of the vehicle file of a vehicle folder.
+
+    Returns:
+        tuple[tuple, bool]: The values of _DATA_COLUMNS, and whether a file could not be read.
+    """
+    failed = False
+    try:
+        (brm_version, name, description, brick_count, size, weight, price, author, creation_time,
+         last_update_time, visibility, tags) = _brm._read_file(brm_path, _CONFIG, 4096)  # pylint: disable=protected-access
+        # Steam IDs may not fit in an SQLite integer
+        brm_row = (brm_version, name, description, brick_count, *size.as_tuple(), weight, price,
+                   str(author), creation_time, last_update_time, visibility, '\n'.join(tags))
+    except (OSError, ValueError, IndexError, struct.error):
+        failed = True
+        brm_row = (None,) * 14
+
+    try:
+        fd = os.open(brv_path, os.O_RDONLY | _brm._O_BINARY)  # pylint: disable=protected-access
+        try:
+            brv_row = _UNPACK_BRV_HEADER(os.read(fd, 7))
+        finally:
+            os.close(fd)
+    except FileNotFoundError:
+        brv_row = (None,) * 4
+    except (OSError, struct.error):
+        failed = True
+        brv_row = (None,) * 4
+
+    return brm_row + brv_row, failed
+
+
+def _refresh_batch(
+    folders: tuple[tuple[str, tuple | None], ...]
+) -> list[tuple[str, tuple, tuple | None, bool]]:
+    """
+    Stats the files of each (folder, stat signature in the index) of `folders` and reads those that
+    changed, see VehicleIndex.refresh.
+
+    Returns:
+        list[tuple[str, tuple, tuple | None, bool]]: For each vehicle folder (folder with a
+        metadata file), its path, stat signature, values of _DATA_COLUMNS (None if unchanged) and
+        whether a file could not be read.
+    """
+    join = os.path.join
+    results = []
+    for folder, old_signature in folders:
+        brm_path = join(folder, METADATA_FILE_NAME)
+        brm_signature = _stat_signature(brm_path)
+        if brm_signature[0] is None:
+            continue
+        brv_path = join(folder, VEHICLE_FILE_NAME)
+        signature = brm_signature + _stat_signature(brv_path)
+        if signature == old_signature:
+            results.append((folder, signature, None, False))
+        else:
+            results.append((folder, signature, *_read_vehicle(brm_path, brv_path)))
+    return results
+
+
+
+class VehicleIndex:
+    """
+    Index of the metadata of vehicle folders, stored in a SQLite database.
+
+    Attributes:
+        connection (sqlite3.Connection): Connection to the database, e.g. for custom queries. See
+            the tables `vehicles` and `tags` (tag, folder).
+    """
+
+    def __init__(self, database: str | os.PathLike = ':memory:'):
+        """
+        Opens the index stored in `database`, creating it if needed.
+
+        Args:
+            database (str | os.PathLike) (optional): Path of the SQLite database. Defaults to an
+                in-memory database.
+        """
+        # sqlite3 is only imported when an index is used
+        import sqlite3  # pylint: disable=import-outside-toplevel
+
+        self.connection: sqlite3.Connection = sqlite3.connect(database)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        self.connection.executescript(_SCHEMA)
+
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM vehicles').fetchone()[0]
+
+
+    def close(self) -> None:
+        """Closes the database."""
+        self.connection.close()
+
+
+    def refresh(
+        self,
+        root: str | os.PathLike,
+        max_workers: Optional[int] = None,
+        remove_missing: bool = True
+    ) -> IndexRefreshResult:
+        """
+        Indexes the vehicle folders of `root`: its subfolders holding a metadata file. Files are only read if their size or
+        modification time changed since they were last indexed. Files are read by a pool of
+        threads, see brm.scan.
+
+        Args:
+            root (str | os.PathLike): Folder holding vehicle folders;
+            max_workers (int) (optional): Number of threads, see brm.scan;
+            remove_missing (bool) (optional): Remove vehicles of `root` whose folder or metadata
+                file no longer exists.
+
+        Raises:
+            OSError: If `root` cannot be listed.
+
+        Returns:
+            IndexRefreshResult: Number of vehicles parsed, unchanged, removed and failed.
+        """
+        root = os.path.abspath(root)
+        connection = self.connection
+        signatures = {
+            row[0]: row[1:] for row in connection.execute(
+                'SELECT folder, brm_mtime_ns, brm_size, brv_mtime_ns, brv_size FROM vehicles '
+                'WHERE root = ?', (root,)
+            )
+        }
+        with os.scandir(root) as it:
+            folders = [entry.path for entry in it if entry.is_dir()]
+
+        parsed = unchanged = failed = 0
+        vehicles = set()
+        rows = []
+        tag_rows = []
+        for folder, signature, data, folder_failed in _brm._map_batches(  # pylint: disable=protected-access
+            _refresh_batch, ((f, signatures.get(f)) for f in folders), max_workers
+        ):
+            vehicles.add(folder)
+            if data is None:
+                unchanged += 1
+                continue
+            parsed += 1
+            failed += folder_failed
+            rows.append((folder, root, *signature, *data))
+            tags = data[13]
+            if tags:
+                tag_rows.extend((tag, folder) for tag in set(tags.split('\n')))
+
+        removed = 0
+        with connection:
+            if rows:
+                changed = [(row[0],) for row in rows]
+                connection.executemany('DELETE FROM tags WHERE folder = ?', changed)
+                connection.executemany(_INSERT_VEHICLE, rows)
+                connection.executemany('INSERT INTO tags (tag, folder) VALUES (?, ?)', tag_rows)
+            if remove_missing:
+                missing = signatures.keys() - vehicles
+                connection.executemany('DELETE FROM vehicles WHERE folder = ?',
+                                       [(f,) for f in missing])
+                removed = len(missing)
+
+        return IndexRefreshResult(parsed, unchanged, removed, failed)
+
+
+    def get(self, folder: str | os.PathLike) -> IndexEntry | None:
+        """
+        Args:
+            folder (str | os.PathLike): Path of a vehicle folder.
+
+        Returns:
+            IndexEntry | None: Indexed metadata of the vehicle, None if it is not indexed.
+        """
+        row = self.connection.execute(
+            f'{_SELECT_ENTRY} WHERE folder = ?', (os.path.abspath(folder),)
+        ).fetchone()
+        return None if row is None else IndexEntry._from_row(row)  # pylint: disable=protected-access
+
+
+    def query(
+        self,
+        min_brick_count: Optional[int] = None,
+        max_brick_count: Optional[int] = None,
+        tag: Optional[str] = None,
+        where: Optional[str] = None,
+        params: tuple[Any, ...] = (),
+        order_by: Optional[str] = None,
+        descending: bool = False,
+        limit: Optional[int] = None
+    ) -> list[IndexEntry]:
+        """
+        Finds indexed vehicles without reading any file.
+
+        Args:
+            min_brick_count (int) (optional): Minimum brick count (from the metadata file);
+            max_brick_count (int) (optional): Maximum brick count;
+            tag (str) (optional): Tag the vehicles must have;
+            where (str) (optional): Additional SQL condition on the columns of the `vehicles` table;
+            params (tuple[Any, ...]) (optional): Parameters of `where`;
+            order_by (str) (optional): Column of the `vehicles` table to sort by (e.g.
+                'last_update_time', 'brick_count', 'name');
+            descending (bool) (optional): Sort in descending order;
+            limit (int) (optional): Maximum number of vehicles.
+
+        Raises:
+            ValueError: If order_by is not a column.
+
+        Returns:
+            list[IndexEntry]: The vehicles, sorted by folder if order_by is None.
+        """
+        conditions = []
+        args = []
+        if min_brick_count is not None:
+            conditions.append('brick_count >= ?')
+            args.append(min_brick_count)
+        if max_brick_count is not None:
+            conditions.append('brick_count <= ?')
+            args.append(max_brick_count)
+        if tag is not None:
+            conditions.append('folder IN (SELECT folder FROM tags WHERE tag = ?)')
+            args.append(tag)
+        if where is not None:
+            conditions.append(f'({where})')
+            args.extend(params)
+
+        if order_by is None:
+            order_by = 'folder'
+        elif order_by not in _ORDER_COLUMNS:
+            raise ValueError(f"Cannot sort by {order_by!r}, expected one of {sorted(_ORDER_COLUMNS)}")
+
+        sql = _SELECT_ENTRY
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += f' ORDER BY {order_by} {"DESC" if descending else "ASC"}'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            args.append(limit)
+
+        from_row = IndexEntry._from_row  # pylint: disable=protected-access
+        return [from_row(row) for row in self.connection.execute(sql, args)]
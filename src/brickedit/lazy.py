@@ -0,0 +1,179 @@
+"""
+Lazy loading shared by the bt and p packages: registries filled on first use, and package
+__getattr__ importing submodules on first use. It lets `import brickedit` skip building hundreds of
+brick and property types until they are needed.
+"""
+import importlib
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
+from typing import Any, TypeVar
+
+_K = TypeVar('_K')
+_V = TypeVar('_V')
+
+
+class LazyRegistry(MutableMapping[_K, _V]):
+    """
+    Registry (mapping) filled on first use by `loader`, usually a function importing the module
+    defining and registering its entries.
+
+    Every read or write runs the loader first, so that entries registered before the first lookup
+    are not replaced by the default ones. Entries are stored in a dict, which `copy` and the `|`
+    operator return.
+    """
+
+    __slots__ = ('_loader', '_data')
+
+    def __init__(self, loader: Callable[[], object]):
+        self._loader: Callable[[], object] | None = loader
+        self._data: dict[_K, _V] = {}
+
+
+    def load(self) -> None:
+        """Runs the loader if it did not run yet."""
+        loader = self._loader
+        if loader is None:
+            return
+        self._loader = None  # Entries registered by the loader must not run it again
+        try:
+            loader()
+        except BaseException:
+            self._loader = loader
+            raise
+
+
+    # -------- Mapping
+
+    def __getitem__(self, key: _K) -> _V:
+        self.load()
+        return self._data[key]
+
+    def __setitem__(self, key: _K, value: _V) -> None:
+        self.load()
+        self._data[key] = value
+
+    def __delitem__(self, key: _K) -> None:
+        self.load()
+        del self._data[key]
+
+    def __contains__(self, key: object) -> bool:
+        self.load()
+        return key in self._data
+
+    def __iter__(self) -> Iterator[_K]:
+        self.load()
+        return iter(self._data)
+
+    def __reversed__(self) -> Iterator[_K]:
+        self.load()
+        return reversed(self._data)
+
+    def __len__(self) -> int:
+        self.load()
+        return len(self._data)
+
+    def __eq__(self, other: object) -> bool:
+        self.load()
+        if isinstance(other, LazyRegistry):
+            other.load()
+            return self._data == other._data
+        if isinstance(other, Mapping):
+            return self._data == dict(other)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        self.load()
+        return f'{self.__class__.__name__}({self._data!r})'
+
+    def get(self, key: _K, default: Any = None) -> _V | Any:
+        self.load()
+        return self._data.get(key, default)
+
+    def keys(self):
+        self.load()
+        return self._data.keys()
+
+    def values(self):
+        self.load()
+        return self._data.values()
+
+    def items(self):
+        self.load()
+        return self._data.items()
+
+    def pop(self, *args):
+        self.load()
+        return self._data.pop(*args)
+
+    def popitem(self) -> tuple[_K, _V]:
+        self.load()
+        return self._data.popitem()
+
+    def clear(self) -> None:
+        self.load()
+        self._data.clear()
+
+    def setdefault(self, key: _K, default: Any = None) -> _V | Any:
+        self.load()
+        return self._data.setdefault(key, default)
+
+    def update(self, other=(), /, **kwargs) -> None:
+        self.load()
+        self._data.update(other, **kwargs)
+
+    def copy(self) -> dict[_K, _V]:
+        """
+        Returns:
+            dict: Copy of the entries.
+        """
+        self.load()
+        return self._data.copy()
+
+    def __or__(self, other: Mapping) -> dict[_K, _V]:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        self.load()
+        return self._data | dict(other)
+
+    def __ror__(self, other: Mapping) -> dict[_K, _V]:
+        if not isinstance(other, Mapping):
+            return NotImplemented
+        self.load()
+        return dict(other) | self._data
+
+    def __ior__(self, other: Mapping) -> 'LazyRegistry[_K, _V]':
+        self.update(other)
+        return self
+
+
+def lazy_getattr(
+    namespace: dict[str, object],
+    modules: tuple[str, ...],
+    registry: LazyRegistry,
+    name: str
+) -> object:
+    """
+    Module `__getattr__` of a package (namespace being its globals) whose submodules `modules` are
+    imported on first use. Loads `registry`, adds the public attributes of these modules to the
+    namespace (like `from .module import *` would), then returns `name`.
+    `__all__` raises AttributeError once the attributes are added, so that
+    `from package import *` finds them.
+
+    Raises:
+        AttributeError: if no module defines `name`.
+    """
+    package = namespace['__name__']
+    if name.startswith('__') and name != '__all__':
+        raise AttributeError(f"module {package!r} has no attribute {name!r}")
+
+    registry.load()
+    # Add every name at once, not only `name`: the package __getattr__ then runs once, instead of
+    # once per name (e.g. ~200 times for the property names used by bt.classes)
+    for module_name in modules:
+        for k, v in vars(importlib.import_module('.' + module_name, package)).items():
+            if not k.startswith('_'):
+                namespace.setdefault(k, v)
+    if name != '__all__' and name in namespace:
+        return namespace[name]
+    raise AttributeError(f"module {package!r} has no attribute {name!r}")
@@ -0,0 +1,790 @@
+"""
+Size, weight, price, bounding boxes and center of mass of vehicles, computed from their bricks.
+
+Bricks are measured as boxes: scalable bricks use their BrickSize property, other brick types the
+size registered in `brick_sizes` (DEFAULT_BRICK_SIZE otherwise). Weights and prices use the
+density and price of the brick's material. BrickEdit does not know the exact values used by
+Brick Rigs: all tables are estimates and may be edited, or replaced by passing your own.
+
+Uses NumPy when it is installed, and a pure Python implementation otherwise.
+"""
+from dataclasses import dataclass
+from typing import Optional, Iterable, Sequence, Final
+import importlib
+
+from . import brick as _brick
+from . import p as _p
+from . import var as _var
+from . import vec as _vec
+from . import transform as _transform
+from .vhelper import mat as _mat
+
+
+DEFAULT_BRICK_SIZE: Final[_mat.TupleVec3] = (10.0, 10.0, 10.0)
+"""Size in centimeters of the bricks without BrickSize property whose type is not in brick_sizes."""
+
+brick_sizes: dict[str, _mat.TupleVec3] = {}
+"""Size in centimeters of brick types without BrickSize property, by brick type name."""
+
+DEFAULT_DENSITY: Final[float] = 950.0
+"""Density in kg/m³ of bricks without material, or whose material is not in MATERIAL_DENSITIES."""
+
+# Keys are the values of the p.BrickMaterial constants, written out: using p.BrickMaterial here
+# would import all property classes when brickedit is imported (see p.pmeta_registry)
+MATERIAL_DENSITIES: dict[str, float] = {
+    'Aluminium': 2_700.0,
+    'BrushedAlu': 2_700.0,
+    'Carbon': 1_600.0,
+    'ChannelledAlu': 2_700.0,
+    'Chrome': 7_190.0,
+    'CloudyGlass': 2_500.0,
+    'Concrete': 2_400.0,
+    'Copper': 8_960.0,
+    'Foam': 30.0,
+    'Glass': 2_500.0,
+    'Glow': 950.0,
+    'Gold': 19_300.0,
+    'LEDMatrix': 1_200.0,
+    'Oak': 750.0,
+    'Pine': 500.0,
+    'Plastic': 950.0,
+    'RoughWood': 600.0,
+    'Rubber': 1_100.0,
+    'RustedSteel': 7_850.0,
+    'Steel': 7_850.0,
+    'Tungsten': 19_250.0,
+}
+"""Density in kg/m³ of each BrickMaterial."""
+
+DEFAULT_PRICE: Final[float] = 2.0
+"""Price per kilogram of bricks without material, or whose material is not in MATERIAL_PRICES."""
+
+# Keys: see MATERIAL_DENSITIES
+MATERIAL_PRICES: dict[str, float] = {
+    'Aluminium': 3.0,
+    'BrushedAlu': 3.5,
+    'Carbon': 20.0,
+    'ChannelledAlu': 3.5,
+    'Chrome': 5.0,
+    'CloudyGlass': 2.0,
+    'Concrete': 0.1,
+    'Copper': 9.0,
+    'Foam': 5.0,
+    'Glass': 1.5,
+    'Glow': 4.0,
+    'Gold': 60_000.0,
+    'LEDMatrix': 10.0,
+    'Oak': 2.0,
+    'Pine': 1.0,
+    'Plastic': 2.0,
+    'RoughWood': 0.5,
+    'Rubber': 2.5,
+    'RustedSteel': 0.5,
+    'Steel': 1.0,
+    'Tungsten': 40.0,
+}
+"""Price per kilogram of each BrickMaterial, in Brick Rigs currency."""
+
+# Cubic centimeters to cubic meters
+_CM3_TO_M3: Final[float] = 1e-6
+
+
+@dataclass(frozen=True, slots=True)
+class VehicleMeasures:
+    """
+    Measures of a vehicle.
+
+    Attributes:
+        min (Vec3): Lowest corner of the axis-aligned bounding box, in centimeters;
+        max (Vec3): Highest corner of the axis-aligned bounding box, in centimeters;
+        weight (float): Total mass in kilograms;
+        price (float): Total price in Brick Rigs currency.
+    """
+    min: _vec.Vec3
+    max: _vec.Vec3
+    weight: float
+    price: float
+
+    def size(self) -> _vec.Vec3:
+        """
+        Returns:
+            Vec3: Size of the axis-aligned bounding box, in centimeters.
+        """
+        return self.max - self.min
+
+
+@dataclass(frozen=True, slots=True)
+class VehicleBounds:
+    """
+    Bounding boxes of a vehicle.
+
+    Attributes:
+        min (Vec3): Lowest corner of the axis-aligned bounding box, in centimeters;
+        max (Vec3): Highest corner of the axis-aligned bounding box, in centimeters;
+        center (Vec3): Center of the oriented bounding box;
+        axes (tuple[Vec3, Vec3, Vec3]): Unit axes of the oriented bounding box (right-handed),
+            along which the bricks spread the most first;
+        extents (Vec3): Size of the oriented bounding box along each of its axes.
+    """
+    min: _vec.Vec3
+    max: _vec.Vec3
+    center: _vec.Vec3
+    axes: tuple[_vec.Vec3, _vec.Vec3, _vec.Vec3]
+    extents: _vec.Vec3
+
+    def size(self) -> _vec.Vec3:
+        """
+        Returns:
+            Vec3: Size of the axis-aligned bounding box, in centimeters.
+        """
+        return self.max - self.min
+
+
+@dataclass(frozen=True, slots=True)
+class MassProperties:
+    """
+    Mass of a vehicle.
+
+    Attributes:
+        mass (float): Total mass in kilograms;
+        center_of_mass (Vec3): Center of mass, in centimeters.
+    """
+    mass: float
+    center_of_mass: _vec.Vec3
+
+
+def brick_arrays(
+    bricks: Iterable[_brick.Brick],
+    version: int = _var.FILE_EXP_VERSION,
+    densities: Optional[dict[str, float]] = None,
+    prices: Optional[dict[str, float]] = None
+) -> tuple[list[float], list[float], list[float], list[float], list[float], list[int]]:
+    """
+    Gathers the data measure_arrays needs from bricks.
+
+    Args:
+        bricks (Iterable[Brick]): Bricks;
+        version (int) (optional): Version of the vehicle file, sizes are converted to centimeters.
+            Defaults to FILE_EXP_VERSION;
+        densities (dict[str, float]) (optional): Density of each material. Defaults to MATERIAL_DENSITIES;
+        prices (dict[str, float]) (optional): Price of each material. Defaults to MATERIAL_PRICES.
+
+    Returns:
+        tuple[list[float], list[float], list[float], list[float], list[float], list[int]]:
+        Positions, distinct rotations and sizes as x, y, z triplets, the density and the price per
+        kilogram of each brick, then the index of each brick's rotation in the distinct rotations.
+    """
+    if densities is None:
+        densities = MATERIAL_DENSITIES
+    if prices is None:
+        prices = MATERIAL_PRICES
+    # Sizes were expressed in tens of centimeters before the unit update (1 unit = 10 cm)
+    size_unit = 1.0 if version >= _var.FILE_UNIT_UPDATE else 10.0
+
+    # No repeated global lookups
+    BRICK_SIZE = _p.BRICK_SIZE
+    BRICK_MATERIAL = _p.BRICK_MATERIAL
+    get_size = brick_sizes.get
+
+    # Default size and material of each brick type, density and price of each material
+    type_defaults = {}
+    material_values = {}
+    # Most bricks share a few rotations
+    rot_to_index = {}
+
+    pos = []
+    rot = []
+    size = []
+    density = []
+    price = []
+    rot_index = []
+    for brick in bricks:
+        meta = brick.meta()
+        defaults = type_defaults.get(meta)
+        if defaults is None:
+            meta_size = meta.p.get(BRICK_SIZE)
+            if meta_size is None:
+                meta_size = get_size(meta.name(), DEFAULT_BRICK_SIZE)
+            else:
+                meta_size = (meta_size.x * size_unit, meta_size.y * size_unit, meta_size.z * size_unit)
+            defaults = type_defaults[meta] = (meta_size, meta.p.get(BRICK_MATERIAL))
+        brick_size, material = defaults
+
+        ppatch = brick.ppatch
+        if ppatch:
+            patch_size = ppatch.get(BRICK_SIZE)
+            if patch_size is not None:
+                brick_size = (patch_size.x * size_unit, patch_size.y * size_unit, patch_size.z * size_unit)
+            material = ppatch.get(BRICK_MATERIAL, material)
+
+        values = material_values.get(material)
+        if values is None:
+            values = material_values[material] = (
+                densities.get(material, DEFAULT_DENSITY), prices.get(material, DEFAULT_PRICE)
+            )
+
+        p, r = brick.pos, brick.rot
+        pos += (p.x, p.y, p.z)
+        r = (r.x, r.y, r.z)
+        index = rot_to_index.get(r)
+        if index is None:
+            index = rot_to_index[r] = len(rot_to_index)
+            rot += r
+        rot_index.append(index)
+        size += brick_size
+        density.append(values[0])
+        price.append(values[1])
+
+    return pos, rot, size, density, price, rot_index
+
+
+def columnar_arrays(
+    vehicle: 'columnar.ColumnarBRVFile',
+    densities: Optional[dict[str, float]] = None,
+    prices: Optional[dict[str, float]] = None,
+    use_numpy: Optional[bool] = None
+) -> tuple[Sequence[float], Sequence[float], Sequence[float], Sequence[float], Sequence[float]]:
+    """
+    Gathers the data measure_arrays needs from the columns of a ColumnarBRVFile, without building
+    bricks. See brick_arrays.
+
+    Args:
+        vehicle (ColumnarBRVFile): Vehicle;
+        densities (dict[str, float]) (optional): Density of each material. Defaults to MATERIAL_DENSITIES;
+        prices (dict[str, float]) (optional): Price of each material. Defaults to MATERIAL_PRICES;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY. Sequences are NumPy arrays if True.
+
+    Returns:
+        tuple[Sequence[float], Sequence[float], Sequence[float], Sequence[float], Sequence[float]]:
+        Positions, rotations and sizes as x, y, z triplets, then the density and the price per
+        kilogram of each brick.
+    """
+    if densities is None:
+        densities = MATERIAL_DENSITIES
+    if prices is None:
+        prices = MATERIAL_PRICES
+    if use_numpy is None:
+        use_numpy = _transform.HAS_NUMPY
+    size_unit = 1.0 if vehicle.version >= _var.FILE_UNIT_UPDATE else 10.0
+
+    # No repeated global lookups
+    BRICK_SIZE = _p.BRICK_SIZE
+    BRICK_MATERIAL = _p.BRICK_MATERIAL
+
+    # Default size, density and price of each brick type
+    type_sizes = []
+    type_materials = []
+    for meta in vehicle.brick_types:
+        meta_size = meta.p.get(BRICK_SIZE)
+        if meta_size is None:
+            type_sizes.append(brick_sizes.get(meta.name(), DEFAULT_BRICK_SIZE))
+        else:
+            type_sizes.append((meta_size.x * size_unit, meta_size.y * size_unit, meta_size.z * size_unit))
+        type_materials.append(meta.p.get(BRICK_MATERIAL))
+    type_densities = [densities.get(m, DEFAULT_DENSITY) for m in type_materials]
+    type_prices = [prices.get(m, DEFAULT_PRICE) for m in type_materials]
+
+    # Values set on bricks: the key set of a brick tells whether its column entry is meaningful
+    # As x, y, z triplets: NumPy builds arrays from flat lists faster than from lists of tuples
+    size_values = [c for v in vehicle.prop_values.get(BRICK_SIZE, ()) for c in (v.x, v.y, v.z)]
+    if size_unit != 1.0:
+        size_values = [c * size_unit for c in size_values]
+    material_values = vehicle.prop_values.get(BRICK_MATERIAL, ())
+    value_densities = [densities.get(m, DEFAULT_DENSITY) for m in material_values]
+    value_prices = [prices.get(m, DEFAULT_PRICE) for m in material_values]
+    sets_size = [BRICK_SIZE in key_set for key_set in vehicle.key_sets]
+    sets_material = [BRICK_MATERIAL in key_set for key_set in vehicle.key_sets]
+    size_column = vehicle.prop_columns.get(BRICK_SIZE, ())
+    material_column = vehicle.prop_columns.get(BRICK_MATERIAL, ())
+
+    n = len(vehicle.type_index)
+    if use_numpy:
+        np = importlib.import_module('numpy')
+        type_index = np.frombuffer(vehicle.type_index, dtype=np.uint16) if n else np.zeros(0, np.intp)
+        key_set_index = np.frombuffer(vehicle.key_set_index, dtype=np.uint16) if n else np.zeros(0, np.intp)
+
+        def column_mask(sets_prop, column):
+            # Bricks setting the property, and the index of their values (0 elsewhere)
+            mask = np.array(sets_prop, dtype=bool)[key_set_index] if sets_prop else np.zeros(n, bool)
+            index = np.zeros(n, dtype=np.intp)
+            index[:len(column)] = np.frombuffer(column, dtype=np.uint16) if len(column) else 0
+            return mask, np.where(mask, index, 0)
+
+        size = np.array(type_sizes, dtype=np.float64).reshape(-1, 3)[type_index]
+        mask, index = column_mask(sets_size, size_column)
+        if mask.any():
+            size[mask] = np.array(size_values, dtype=np.float64).reshape(-1, 3)[index[mask]]
+        density = np.array(type_densities, dtype=np.float64)[type_index]
+        price = np.array(type_prices, dtype=np.float64)[type_index]
+        mask, index = column_mask(sets_material, material_column)
+        if mask.any():
+            density[mask] = np.array(value_densities, dtype=np.float64)[index[mask]]
+            price[mask] = np.array(value_prices, dtype=np.float64)[index[mask]]
+        return (
+            np.frombuffer(vehicle.pos, dtype=np.float32) if n else np.zeros(0),
+            np.frombuffer(vehicle.rot, dtype=np.float32) if n else np.zeros(0),
+            size.ravel(), density, price
+        )
+
+    size = []
+    density = []
+    price = []
+    for i, (t, k) in enumerate(zip(vehicle.type_index, vehicle.key_set_index)):
+        if sets_size[k]:
+            j = 3 * size_column[i]
+            size += size_values[j : j+3]
+        else:
+            size += type_sizes[t]
+        if sets_material[k]:
+            density.append(value_densities[material_column[i]])
+            price.append(value_prices[material_column[i]])
+        else:
+            density.append(type_densities[t])
+            price.append(type_prices[t])
+    return vehicle.pos, vehicle.rot, size, density, price
+
+
+def measure_arrays(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    density: Sequence[float],
+    price: Sequence[float],
+    rot_index: Optional[Sequence[int]] = None,
+    use_numpy: Optional[bool] = None
+) -> VehicleMeasures:
+    """
+    Measures bricks in one pass, as boxes rotated by their rotation. See brick_arrays.
+
+    Args:
+        pos (Sequence[float]): Positions in centimeters, as x, y, z triplets;
+        rot (Sequence[float]): Rotations in degrees, as x, y, z (roll, pitch, yaw) triplets;
+        size (Sequence[float]): Sizes in centimeters along local axes, as x, y, z triplets;
+        density (Sequence[float]): Density of each brick in kg/m³;
+        price (Sequence[float]): Price per kilogram of each brick;
+        rot_index (Sequence[int]) (optional): Index in `rot` of the rotation of each brick.
+            Defaults to none: `rot` holds the rotation of each brick;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        VehicleMeasures: Measures of the bricks. The bounding box is empty at (0, 0, 0) if there
+        are no bricks.
+    """
+    if use_numpy is None:
+        use_numpy = _transform.HAS_NUMPY
+    if len(pos) == 0:
+        origin = _vec.Vec3(0.0, 0.0, 0.0)
+        return VehicleMeasures(origin, origin, 0.0, 0.0)
+    if rot_index is None:
+        rot_index = range(len(pos) // 3)
+    if use_numpy:
+        return _measure_numpy(pos, rot, size, density, price, rot_index)
+    return _measure_python(pos, rot, size, density, price, rot_index)
+
+
+def _measure_python(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    density: Sequence[float],
+    price: Sequence[float],
+    rot_index: Sequence[int]
+) -> VehicleMeasures:
+    """See measure_arrays."""
+
+    # No repeated global lookups
+    euler_to_mat3 = _mat.euler_to_mat3
+
+    # Absolute rotation matrix of each rotation, by index: most bricks share a few rotations
+    abs_matrices = {}
+    inf = float('inf')
+    min_x = min_y = min_z = inf
+    max_x = max_y = max_z = -inf
+    total_weight = 0.0
+    total_price = 0.0
+    for j, d, p, i in zip(range(0, len(pos), 3), density, price, rot_index):
+        a = abs_matrices.get(i)
+        if a is None:
+            r = (rot[3*i], rot[3*i+1], rot[3*i+2])
+            a = abs_matrices[i] = tuple(abs(c) for row in euler_to_mat3(r) for c in row)
+        sx, sy, sz = size[j], size[j+1], size[j+2]
+
+        # Half extents along world axes
+        hx = 0.5 * (a[0] * sx + a[1] * sy + a[2] * sz)
+        hy = 0.5 * (a[3] * sx + a[4] * sy + a[5] * sz)
+        hz = 0.5 * (a[6] * sx + a[7] * sy + a[8] * sz)
+        x, y, z = pos[j], pos[j+1], pos[j+2]
+        if x - hx < min_x:
+            min_x = x - hx
+        if x + hx > max_x:
+            max_x = x + hx
+        if y - hy < min_y:
+            min_y = y - hy
+        if y + hy > max_y:
+            max_y = y + hy
+        if z - hz < min_z:
+            min_z = z - hz
+        if z + hz > max_z:
+            max_z = z + hz
+
+        weight = sx * sy * sz * d
+        total_weight += weight
+        total_price += weight * p
+
+    return VehicleMeasures(
+        _vec.Vec3(min_x, min_y, min_z),
+        _vec.Vec3(max_x, max_y, max_z),
+        total_weight * _CM3_TO_M3,
+        total_price * _CM3_TO_M3
+    )
+
+
+def _measure_numpy(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    density: Sequence[float],
+    price: Sequence[float],
+    rot_index: Sequence[int]
+) -> VehicleMeasures:
+    """See measure_arrays."""
+    np = importlib.import_module('numpy')
+
+    p = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+    s = np.asarray(size, dtype=np.float64).reshape(-1, 3)
+    a = np.abs(_transform.rotation_matrices_numpy(rot))
+    if not isinstance(rot_index, range):
+        a = a[np.asarray(rot_index, dtype=np.intp)]
+    # Half extents along world axes
+    h = 0.5 * np.einsum('nik,nk->ni', a, s)
+    # Reductions of (n, 3) arrays along axis 0 are several times slower than those of columns
+    lo = p - h
+    hi = p + h
+
+    weight = s[:, 0] * s[:, 1] * s[:, 2] * np.asarray(density, dtype=np.float64)
+    return VehicleMeasures(
+        _vec.Vec3(*(float(lo[:, k].min()) for k in range(3))),
+        _vec.Vec3(*(float(hi[:, k].max()) for k in range(3))),
+        float(weight.sum()) * _CM3_TO_M3,
+        float(weight @ np.asarray(price, dtype=np.float64)) * _CM3_TO_M3
+    )
+
+
+def boxes(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    rot_index: Optional[Sequence[int]] = None,
+    use_numpy: Optional[bool] = None
+) -> list[float]:
+    """
+    Axis-aligned bounding box of each brick, as a box rotated by its rotation. See measure_arrays.
+
+    Args:
+        pos (Sequence[float]): Positions in centimeters, as x, y, z triplets;
+        rot (Sequence[float]): Rotations in degrees, as x, y, z (roll, pitch, yaw) triplets;
+        size (Sequence[float]): Sizes in centimeters along local axes, as x, y, z triplets;
+        rot_index (Sequence[int]) (optional): Index in `rot` of the rotation of each brick.
+            Defaults to none: `rot` holds the rotation of each brick;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        list[float]: Lowest then highest corner of each box, as min x, y, z, max x, y, z sextuplets.
+    """
+    if use_numpy is None:
+        use_numpy = _transform.HAS_NUMPY
+    if rot_index is None:
+        rot_index = range(len(pos) // 3)
+    if len(pos) == 0:
+        return []
+
+    if use_numpy:
+        np = importlib.import_module('numpy')
+        p = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+        a = np.abs(_transform.rotation_matrices_numpy(rot))
+        if not isinstance(rot_index, range):
+            a = a[np.asarray(rot_index, dtype=np.intp)]
+        h = 0.5 * np.einsum('nik,nk->ni', a, np.asarray(size, dtype=np.float64).reshape(-1, 3))
+        return np.concatenate((p - h, p + h), axis=1).ravel().tolist()
+
+    # No repeated global lookups
+    euler_to_mat3 = _mat.euler_to_mat3
+
+    abs_matrices = {}
+    result = []
+    for j, i in zip(range(0, len(pos), 3), rot_index):
+        a = abs_matrices.get(i)
+        if a is None:
+            r = (rot[3*i], rot[3*i+1], rot[3*i+2])
+            a = abs_matrices[i] = tuple(abs(c) for row in euler_to_mat3(r) for c in row)
+        sx, sy, sz = size[j], size[j+1], size[j+2]
+        hx = 0.5 * (a[0] * sx + a[1] * sy + a[2] * sz)
+        hy = 0.5 * (a[3] * sx + a[4] * sy + a[5] * sz)
+        hz = 0.5 * (a[6] * sx + a[7] * sy + a[8] * sz)
+        x, y, z = pos[j], pos[j+1], pos[j+2]
+        result += (x - hx, y - hy, z - hz, x + hx, y + hy, z + hz)
+    return result
+
+
+def measure(
+    bricks: Iterable[_brick.Brick],
+    version: int = _var.FILE_EXP_VERSION,
+    densities: Optional[dict[str, float]] = None,
+    prices: Optional[dict[str, float]] = None,
+    use_numpy: Optional[bool] = None
+) -> VehicleMeasures:
+    """
+    Measures the size, weight and price of bricks. See brick_arrays and measure_arrays.
+
+    Args:
+        bricks (Iterable[Brick]): Bricks, e.g. BRVFile.bricks;
+        version (int) (optional): Version of the vehicle file. Defaults to FILE_EXP_VERSION;
+        densities (dict[str, float]) (optional): Density of each material. Defaults to MATERIAL_DENSITIES;
+        prices (dict[str, float]) (optional): Price of each material. Defaults to MATERIAL_PRICES;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        VehicleMeasures: Measures of the bricks.
+    """
+    pos, rot, size, density, price, rot_index = brick_arrays(bricks, version, densities, prices)
+    return measure_arrays(pos, rot, size, density, price, rot_index, use_numpy)
+
+
+def bounds_arrays(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    rot_index: Optional[Sequence[int]] = None,
+    use_numpy: Optional[bool] = None
+) -> VehicleBounds:
+    """
+    Axis-aligned and oriented bounding boxes of bricks, measured as boxes rotated by their rotation.
+
+    The axes of the oriented bounding box are the principal axes of the bricks: the eigenvectors
+    of the covariance of the volume of the bricks, each brick counting as a solid box.
+
+    Args:
+        pos (Sequence[float]): Positions in centimeters, as x, y, z triplets;
+        rot (Sequence[float]): Rotations in degrees, as x, y, z (roll, pitch, yaw) triplets;
+        size (Sequence[float]): Sizes in centimeters along local axes, as x, y, z triplets;
+        rot_index (Sequence[int]) (optional): Index in `rot` of the rotation of each brick.
+            Defaults to none: `rot` holds the rotation of each brick;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        VehicleBounds: Bounding boxes of the bricks. Boxes are empty at (0, 0, 0), with the world
+        axes, if there are no bricks.
+    """
+    if use_numpy is None:
+        use_numpy = _transform.HAS_NUMPY
+    if len(pos) == 0:
+        origin = _vec.Vec3(0.0, 0.0, 0.0)
+        axes = (_vec.Vec3(1.0, 0.0, 0.0), _vec.Vec3(0.0, 1.0, 0.0), _vec.Vec3(0.0, 0.0, 1.0))
+        return VehicleBounds(origin, origin, origin, axes, origin)
+    if rot_index is None:
+        rot_index = range(len(pos) // 3)
+    if use_numpy:
+        return _bounds_numpy(pos, rot, size, rot_index)
+    return _bounds_python(pos, rot, size, rot_index)
+
+
+def _principal_axes(covariance: _mat.Matrix3, use_numpy: bool) -> _mat.Matrix3:
+    """Unit eigenvectors (columns) of a covariance matrix, largest eigenvalue first, right-handed."""
+    if use_numpy:
+        np = importlib.import_module('numpy')
+        values, vectors = np.linalg.eigh(np.array(covariance, dtype=np.float64))
+        values, vectors = values.tolist(), tuple(map(tuple, vectors.tolist()))
+    else:
+        values, vectors = _mat.eigen_sym_mat3(covariance)
+    order = sorted(range(3), key=lambda k: -values[k])
+    axes = []
+    for k in order:
+        axis = [vectors[0][k], vectors[1][k], vectors[2][k]]
+        # Largest component positive, so that the same bricks always give the same axes
+        if max(axis, key=abs) < 0.0:
+            axis = [-c for c in axis]
+        axes.append(axis)
+    if _mat.det_mat3(_mat.transpose_mat3(axes)) < 0.0:
+        axes[2] = [-c for c in axes[2]]
+    return _mat.transpose_mat3(axes)
+
+
+def _bounds_python(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    rot_index: Sequence[int]
+) -> VehicleBounds:
+    """See bounds_arrays."""
+
+    # No repeated global lookups
+    euler_to_mat3 = _mat.euler_to_mat3
+    matrices = {}
+    for i in set(rot_index):
+        matrices[i] = euler_to_mat3((rot[3*i], rot[3*i+1], rot[3*i+2]))
+
+    # Axis-aligned bounding box, and weighted moments of the bricks
+    inf = float('inf')
+    lo = [inf, inf, inf]
+    hi = [-inf, -inf, -inf]
+    total = 0.0
+    first = [0.0, 0.0, 0.0]
+    second = [[0.0] * 3 for _ in range(3)]
+    volumes = [size[j] * size[j+1] * size[j+2] for j in range(0, len(size), 3)]
+    uniform = sum(volumes) <= 0.0
+    for j, i, v in zip(range(0, len(pos), 3), rot_index, volumes):
+        r = matrices[i]
+        s = (size[j], size[j+1], size[j+2])
+        p = (pos[j], pos[j+1], pos[j+2])
+        w = 1.0 if uniform else v
+        total += w
+        for a in range(3):
+            h = 0.5 * (abs(r[a][0]) * s[0] + abs(r[a][1]) * s[1] + abs(r[a][2]) * s[2])
+            lo[a] = min(lo[a], p[a] - h)
+            hi[a] = max(hi[a], p[a] + h)
+            first[a] += w * p[a]
+            for b in range(a, 3):
+                # Point mass, plus the spread of a solid box: R diag(s² / 12) Rᵀ
+                own = (r[a][0] * r[b][0] * s[0] * s[0] + r[a][1] * r[b][1] * s[1] * s[1]
+                       + r[a][2] * r[b][2] * s[2] * s[2]) / 12.0
+                second[a][b] += w * (p[a] * p[b] + own)
+
+    center = [c / total for c in first]
+    covariance = tuple(
+        tuple(second[min(a, b)][max(a, b)] / total - center[a] * center[b] for b in range(3))
+        for a in range(3)
+    )
+    u = _principal_axes(covariance, False)
+
+    # Oriented bounding box: project the boxes on the principal axes
+    olo = [inf, inf, inf]
+    ohi = [-inf, -inf, -inf]
+    for j, i in zip(range(0, len(pos), 3), rot_index):
+        r = matrices[i]
+        s = (size[j], size[j+1], size[j+2])
+        p = (pos[j], pos[j+1], pos[j+2])
+        for a in range(3):
+            ux, uy, uz = u[0][a], u[1][a], u[2][a]
+            q = ux * p[0] + uy * p[1] + uz * p[2]
+            h = 0.5 * sum(abs(ux * r[0][k] + uy * r[1][k] + uz * r[2][k]) * s[k] for k in range(3))
+            olo[a] = min(olo[a], q - h)
+            ohi[a] = max(ohi[a], q + h)
+
+    mid = tuple(0.5 * (olo[a] + ohi[a]) for a in range(3))
+    return VehicleBounds(
+        _vec.Vec3(*lo),
+        _vec.Vec3(*hi),
+        _vec.Vec3(*_mat.mul_mat3_vec3(u, mid)),
+        tuple(_vec.Vec3(u[0][a], u[1][a], u[2][a]) for a in range(3)),
+        _vec.Vec3(*(ohi[a] - olo[a] for a in range(3)))
+    )
+
+
+def _bounds_numpy(
+    pos: Sequence[float],
+    rot: Sequence[float],
+    size: Sequence[float],
+    rot_index: Sequence[int]
+) -> VehicleBounds:
+    """See bounds_arrays."""
+    np = importlib.import_module('numpy')
+
+    p = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+    s = np.asarray(size, dtype=np.float64).reshape(-1, 3)
+    # Terms depending on the rotation are computed once per rotation, then indexed
+    r = _transform.rotation_matrices_numpy(rot)
+    index = None if isinstance(rot_index, range) else np.asarray(rot_index, dtype=np.intp)
+
+    def per_brick(per_rotation):
+        return per_rotation if index is None else per_rotation[index]
+
+    # Axis-aligned bounding box. Reductions of (n, 3) arrays along axis 0 are several times slower
+    # than those of columns
+    h = 0.5 * np.einsum('nik,nk->ni', per_brick(np.abs(r)), s)
+    lo = p - h
+    hi = p + h
+
+    # Weighted covariance: point masses, plus the spread of solid boxes R diag(s² / 12) Rᵀ
+    w = s[:, 0] * s[:, 1] * s[:, 2]
+    if w.sum() <= 0.0:
+        w = np.ones(len(p))
+    total = w.sum()
+    center = (w @ p) / total
+    d = p - center
+    covariance = (d.T * w) @ d
+    spread = s * s * (w / 12.0)[:, None]
+    if index is not None:
+        # Sum of the spreads of the bricks sharing each rotation
+        spread = np.stack(
+            [np.bincount(index, weights=spread[:, k], minlength=len(r)) for k in range(3)], axis=1
+        )
+    covariance += np.tensordot(r * spread[:, None, :], r, axes=([0, 2], [0, 2]))
+    covariance /= total
+    u = np.array(_principal_axes(tuple(map(tuple, covariance.tolist())), True))
+
+    # Oriented bounding box: project the boxes on the principal axes
+    q = p @ u
+    oh = 0.5 * np.einsum('nak,nk->na', per_brick(np.abs(np.matmul(u.T, r))), s)
+    olo = q - oh
+    ohi = q + oh
+    olo = [float(olo[:, a].min()) for a in range(3)]
+    ohi = [float(ohi[:, a].max()) for a in range(3)]
+
+    mid = [0.5 * (olo[a] + ohi[a]) for a in range(3)]
+    axes = u.T.tolist()
+    return VehicleBounds(
+        _vec.Vec3(*(float(lo[:, k].min()) for k in range(3))),
+        _vec.Vec3(*(float(hi[:, k].max()) for k in range(3))),
+        _vec.Vec3(*(u @ np.array(mid)).tolist()),
+        tuple(_vec.Vec3(*axis) for axis in axes),
+        _vec.Vec3(*(ohi[a] - olo[a] for a in range(3)))
+    )
+
+
+def mass_arrays(
+    pos: Sequence[float],
+    size: Sequence[float],
+    density: Sequence[float],
+    use_numpy: Optional[bool] = None
+) -> MassProperties:
+    """
+    Total mass and center of mass of bricks, each brick being a solid box of uniform density.
+
+    Args:
+        pos (Sequence[float]): Positions in centimeters, as x, y, z triplets;
+        size (Sequence[float]): Sizes in centimeters along local axes, as x, y, z triplets;
+        density (Sequence[float]): Density of each brick in kg/m³;
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        MassProperties: Mass of the bricks. The center of mass is the mean position of the bricks
+        if they have no mass, (0, 0, 0) if there are no bricks.
+    """
+    if use_numpy is None:
+        use_numpy = _transform.HAS_NUMPY
+    n = len(pos) // 3
+    if n == 0:
+        return MassProperties(0.0, _vec.Vec3(0.0, 0.0, 0.0))
+
+    if use_numpy:
+        np = importlib.import_module('numpy')
+        p = np.asarray(pos, dtype=np.float64).reshape(-1, 3)
+        s = np.asarray(size, dtype=np.float64).reshape(-1, 3)
+        m = s[:, 0] * s[:, 1] * s[:, 2] * np.asarray(density, dtype=np.float64)
+        total = float(m.sum())
+        if total <= 0.0:
+            m = np.ones(n)
+        com = ((m @ p) / m.sum()).tolist()
+        return MassProperties(total * _CM3_TO_M3, _vec.Vec3(*com))
+
+    total = 0.0
+    mx = my = mz = 0.0
+    for j, d in zip(range(0, len(pos), 3), density):
+        m = size[j] * size[j+1] * size[j+2] * d
+        total += m
+        mx += m * pos[j]
+        my += m * pos[j+1]
+        mz += m * pos[j+2]
+    if total <= 0.0:
+        return MassProperties(0.0, _vec.Vec3(sum(pos[0::3]) / n, sum(pos[1::3]) / n, sum(pos[2::3]) / n))
+    return MassProperties(total * _CM3_TO_M3, _vec.Vec3(mx / total, my / total, mz / total))
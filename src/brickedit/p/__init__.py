@@ -1,3 +1,19 @@
 from .meta import *
-from .classes import *
 from .base import *
+from .. import lazy as _lazy
+
+# classes defines hundreds of property types: it is imported on first use, when looking up one
+# of its names or pmeta_registry.
+_LAZY_MODULES: tuple[str, ...] = ('classes',)
+
+
+def __getattr__(name: str):
+    return _lazy.lazy_getattr(globals(), _LAZY_MODULES, pmeta_registry, name)
+
+
+def __dir__() -> list[str]:
+    try:
+        _lazy.lazy_getattr(globals(), _LAZY_MODULES, pmeta_registry, '__all__')
+    except AttributeError:
+        pass
+    return sorted(globals())
@@ -1,5 +1,10 @@
-from typing import Callable, Generic, Type, TypeVar
+from typing import Callable, ClassVar, Generic, Hashable, Sequence, Type, TypeVar
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import MutableMapping
+import importlib
+
+from ..lazy import LazyRegistry
 
 _T = TypeVar("T")
 
@@ -23,6 +28,14 @@ InvalidVersion: InvalidVersionType = InvalidVersionType()
 class PropertyMeta(Generic[_T], ABC):
     """Base class for property metadata."""
 
+    USES_BRICK_REFERENCES: ClassVar[bool] = False
+    """Whether serialized values depend on ref_to_idx, i.e. on the position of other bricks."""
+
+    CACHE_SERIALIZED: ClassVar[bool] = False
+    """Whether serialized values may be kept in serialized_value_cache. Only for properties whose
+    serialized values only depend on the value and version, and which are slower to serialize
+    than a cache lookup."""
+
     @staticmethod
     @abstractmethod
     def serialize(
@@ -56,14 +69,66 @@ class PropertyMeta(Generic[_T], ABC):
             if the property does not support this version.
         """
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[_T],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes | InvalidVersionType]:
+        """Serializes each value of `values`, e.g. the value table of a property.
+        Calls serialize for each value by default: fixed-width properties pack them all at once.
+
+        Args:
+            values (Sequence[T]): Values to serialize
+            version (int): Version of the property
+            ref_to_idx (dict[str, int]): Index of a brick from its index
+
+        Returns:
+            list[bytes | InvalidVersionType]: Result of serialize for each value.
+        """
+        serialize = cls.serialize
+        return [serialize(v, version, ref_to_idx) for v in values]
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[_T | InvalidVersionType]:
+        """Deserializes the consecutive values of `buffer`, e.g. the value table of a property.
+        Calls deserialize for each value by default: fixed-width properties unpack them all at once.
 
-pmeta_registry: dict[str, Type[PropertyMeta]] = {}
+        Args:
+            buffer (bytes | memoryview): Serialized values, one after the other
+            lengths (Sequence[int]): Length in bytes of each value
+            version (int): Version of the property
+
+        Returns:
+            list[T | InvalidVersionType]: Result of deserialize for each value.
+        """
+        deserialize = cls.deserialize
+        values = []
+        offset = 0
+        for length in lengths:
+            end = offset + length
+            values.append(deserialize(bytes(buffer[offset : end]), version))
+            offset = end
+        return values
+
+
+def _load_property_types() -> None:
+    importlib.import_module('.classes', __package__)
+
+pmeta_registry: LazyRegistry[str, Type[PropertyMeta]] = LazyRegistry(_load_property_types)
+"""Default registry. Filled with BrickEdit's property types (p.classes) on first use."""
 
 _Tpm = TypeVar('_Tpm', bound=Type[PropertyMeta])
 
 def register(
     name: str,
-    registry: dict[str, Type[PropertyMeta]] | None = None
+    registry: MutableMapping[str, Type[PropertyMeta]] | None = None
 ) -> Callable[[_Tpm], _Tpm]:
     """
     Decorator to register a PropertyMeta subclasses.
@@ -71,7 +136,7 @@ def register(
     
     Args:
         name (str): Name of the property type.
-        registry (dict[str, Type[PropertyMeta]]), optional: Registry to use. Defaults to None.
+        registry (MutableMapping[str, Type[PropertyMeta]]), optional: Registry to use. Defaults to None.
     """
 
     if registry is None:
@@ -81,3 +146,113 @@ def register(
         registry[name] = class_
         return class_
     return _decorator
+
+
+
+class SerializedValueCache:
+    """
+    Bounded (least recently used) cache of serialized property values, keyed by
+    (property name, value, version) and shared by all vehicles.
+
+    Entries remember the PropertyMeta that serialized them: they are invalidated if the registry
+    entry of their property changes. Only properties with PropertyMeta.CACHE_SERIALIZED are
+    cached, others are always serialized.
+
+    Attributes:
+        maxsize (int): Maximum number of entries. 0 disables the cache;
+        hits (int): Number of values found in the cache;
+        misses (int): Number of values serialized and added to the cache.
+            Neither counts properties that are never cached.
+    """
+
+    __slots__ = ('maxsize', 'hits', 'misses', '_entries')
+
+    def __init__(self, maxsize: int = 65_536):
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self._entries: OrderedDict[
+            tuple[str, Hashable, int], tuple[Type[PropertyMeta], bytes | InvalidVersionType]
+        ] = OrderedDict()
+
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+    def serialize(
+        self,
+        prop: str,
+        pmeta: Type[PropertyMeta],
+        v: Hashable,
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> bytes | InvalidVersionType:
+        """Serializes the value `v` of property `prop` with `pmeta`, or returns the cached result.
+
+        Args:
+            prop (str): Name of the property
+            pmeta (Type[PropertyMeta]): Serialization class of the property
+            v (Hashable): Value to serialize
+            version (int): Version of the property
+            ref_to_idx (dict[str, int]): Index of a brick from its index
+
+        Returns:
+            bytes | InvalidVersionType: See PropertyMeta.serialize.
+        """
+        if not pmeta.CACHE_SERIALIZED or self.maxsize <= 0:
+            return pmeta.serialize(v, version, ref_to_idx)
+
+        entries = self._entries
+        key = (prop, v, version)
+        entry = entries.get(key)
+        if entry is not None and entry[0] is pmeta:
+            self.hits += 1
+            entries.move_to_end(key)
+            return entry[1]
+
+        self.misses += 1
+        binary = pmeta.serialize(v, version, ref_to_idx)
+        entries[key] = (pmeta, binary)
+        entries.move_to_end(key)
+        while len(entries) > self.maxsize:
+            entries.popitem(last=False)
+        return binary
+
+
+    def serialize_many(
+        self,
+        prop: str,
+        pmeta: Type[PropertyMeta],
+        values: Sequence[Hashable],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes | InvalidVersionType]:
+        """Serializes the values `values` of property `prop` with `pmeta`, using cached results
+        if pmeta.CACHE_SERIALIZED, or PropertyMeta.serialize_many otherwise.
+
+        Args:
+            prop (str): Name of the property
+            pmeta (Type[PropertyMeta]): Serialization class of the property
+            values (Sequence[Hashable]): Values to serialize
+            version (int): Version of the property
+            ref_to_idx (dict[str, int]): Index of a brick from its index
+
+        Returns:
+            list[bytes | InvalidVersionType]: See PropertyMeta.serialize_many.
+        """
+        if not pmeta.CACHE_SERIALIZED or self.maxsize <= 0:
+            return pmeta.serialize_many(values, version, ref_to_idx)
+        serialize = self.serialize
+        return [serialize(prop, pmeta, v, version, ref_to_idx) for v in values]
+
+
+    def clear(self) -> None:
+        """Removes all entries and resets the hit and miss counters."""
+        self._entries.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+serialized_value_cache: SerializedValueCache = SerializedValueCache()
+"""Cache used when serializing vehicles."""
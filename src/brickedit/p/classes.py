@@ -1,6 +1,6 @@
 # pylint: disable=invalid-name
 # pylint: disable=too-many-lines
-from typing import Final
+from typing import Final, Sequence
 import struct
 
 from . import base as _b
@@ -42,6 +42,32 @@ class BrickColor(_m.Color4ChannelsMeta):
             return _b.InvalidVersion
         return _STRUCT_UINT32_BIGENDIAN.unpack(v)[0]
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[int],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes | _b.InvalidVersionType]:
+        if cls.serialize is not BrickColor.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        if version <= _v.FILE_LEGACY_VERSION:
+            return [_b.InvalidVersion] * len(values)
+        return _m.Color4ChannelsMeta.serialize_many(values, version, ref_to_idx)
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[int | _b.InvalidVersionType]:
+        if cls.deserialize is not BrickColor.deserialize:
+            return super().deserialize_many(buffer, lengths, version)
+        if version <= _v.FILE_LEGACY_VERSION:
+            return [_b.InvalidVersion] * len(lengths)
+        return _m.Color4ChannelsMeta.deserialize_many(buffer, lengths, version)
+
 
 BRICK_MATERIAL = 'BrickMaterial'
 
@@ -142,6 +168,33 @@ class BrickSize(_b.PropertyMeta[_vec.Vec3]):
     def deserialize(v: bytes, version: int) -> _vec.Vec3:
         return _vec.Vec3(*_STRUCT_3SPFLOAT.unpack_from(v))
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[_vec.Vec3],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not BrickSize.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        floats = [f for v in values for f in v.as_tuple()]
+        if len(floats) != 3 * len(values):
+            # Let serialize raise the error of the value that is not a Vec3
+            return super().serialize_many(values, version, ref_to_idx)
+        packed = struct.pack(f'<{len(floats)}f', *floats)
+        return [packed[i : i+12] for i in range(0, len(packed), 12)]
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[_vec.Vec3]:
+        if cls.deserialize is not BrickSize.deserialize or lengths.count(12) != len(lengths):
+            return super().deserialize_many(buffer, lengths, version)
+        return _vec.Vec3.list_from_floats(struct.unpack_from(f'<{3 * len(lengths)}f', buffer))
+
 
 
 ACTUATOR_MODE: Final[str] = 'ActuatorMode'
@@ -337,6 +390,29 @@ class ConnectorSpacing(_b.PropertyMeta[int]):
     def deserialize(v: bytes, version: int) -> int:
         return _STRUCT_UINT16.unpack(v)[0]
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[int],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not ConnectorSpacing.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        packed = struct.pack(f'<{len(values)}H', *values)
+        return [packed[i : i+2] for i in range(0, len(packed), 2)]
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[int]:
+        if cls.deserialize is not ConnectorSpacing.deserialize or lengths.count(2) != len(lengths):
+            return super().deserialize_many(buffer, lengths, version)
+        return list(struct.unpack_from(f'<{len(lengths)}H', buffer))
+
     @staticmethod
     def create(xp: int, yp: int, zp: int, xn: int, yn: int, zn: int) -> int:
         """Builds the integer corresponding to this connector spacing.
@@ -1,5 +1,5 @@
 import struct
-from typing import Final
+from typing import Final, Sequence
 
 from . import base as _b
 from .. import vec as _vec
@@ -20,6 +20,11 @@ _STRUCT_UINT32_BIGENDIAN = struct.Struct('>I')
 _STRUCT_SPFLOAT = struct.Struct('<f')
 
 
+def _split(packed: bytes, width: int) -> list[bytes]:
+    """Splits values packed by serialize_many into one bytes object per value."""
+    return [packed[i : i+width] for i in range(0, len(packed), width)]
+
+
 
 class BooleanMeta(_b.PropertyMeta[bool]):
     """Base class for booleans"""
@@ -36,6 +41,28 @@ class BooleanMeta(_b.PropertyMeta[bool]):
     def deserialize(v: bytes, version: int) -> bool:
         return v == b'\x01'
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[bool],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not BooleanMeta.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        return [b'\x01' if v else b'\x00' for v in values]
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[bool]:
+        if cls.deserialize is not BooleanMeta.deserialize or lengths.count(1) != len(lengths):
+            return super().deserialize_many(buffer, lengths, version)
+        return [b == 1 for b in bytes(buffer)]
+
 class EnumMeta(_b.PropertyMeta[str]):
     """Base class for enum properties."""
 
@@ -57,6 +84,8 @@ class EnumMeta(_b.PropertyMeta[str]):
 class TextMeta(_b.PropertyMeta[str]):
     """Base class for text input properties."""
 
+    CACHE_SERIALIZED = True
+
     @staticmethod
     def serialize(
         v: str,
@@ -93,6 +122,28 @@ class Float32Meta(_b.PropertyMeta[float]):
     def deserialize(v: bytes, version: int) -> float:
         return _STRUCT_SPFLOAT.unpack(v)[0]
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[float],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not Float32Meta.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        return _split(struct.pack(f'<{len(values)}f', *values), 4)
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[float]:
+        if cls.deserialize is not Float32Meta.deserialize or lengths.count(4) != len(lengths):
+            return super().deserialize_many(buffer, lengths, version)
+        return list(struct.unpack_from(f'<{len(lengths)}f', buffer))
+
 
 _STRUCT_2SPFLOAT = struct.Struct('<2f')
 
@@ -111,6 +162,32 @@ class Vec2Meta(_b.PropertyMeta[_vec.Vec2]):
     def deserialize(v: bytes, version: int) -> _vec.Vec2:
         return _vec.Vec2(*_STRUCT_2SPFLOAT.unpack_from(v))
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[_vec.Vec2],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not Vec2Meta.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        floats = [f for v in values for f in v.as_tuple()]
+        if len(floats) != 2 * len(values):
+            # Let serialize raise the error of the value that is not a Vec2
+            return super().serialize_many(values, version, ref_to_idx)
+        return _split(struct.pack(f'<{len(floats)}f', *floats), 8)
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[_vec.Vec2]:
+        if cls.deserialize is not Vec2Meta.deserialize or lengths.count(8) != len(lengths):
+            return super().deserialize_many(buffer, lengths, version)
+        return _vec.Vec2.list_from_floats(struct.unpack_from(f'<{2 * len(lengths)}f', buffer))
+
 
 class Color3ChannelsMeta(_b.PropertyMeta[int]):
     """
@@ -134,6 +211,29 @@ class Color3ChannelsMeta(_b.PropertyMeta[int]):
         # We use big-endian since brickedit represent colors as 0xrrggbbaa
         return _STRUCT_UINT32_BIGENDIAN.unpack(v)[0]
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[int],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not Color3ChannelsMeta.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        return _split(struct.pack(f'>{len(values)}I', *values), 4)
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[int]:
+        if (cls.deserialize is not Color3ChannelsMeta.deserialize
+                or lengths.count(4) != len(lengths)):
+            return super().deserialize_many(buffer, lengths, version)
+        return list(struct.unpack_from(f'>{len(lengths)}I', buffer))
+
 
 class Color4ChannelsMeta(_b.PropertyMeta[int]):
     """Class for 4-channel colors"""
@@ -152,6 +252,29 @@ class Color4ChannelsMeta(_b.PropertyMeta[int]):
         # We use big-endian since brickedit represent colors as 0xrrggbbaa
         return _STRUCT_UINT32_BIGENDIAN.unpack(v)[0]
 
+    @classmethod
+    def serialize_many(
+        cls,
+        values: Sequence[int],
+        version: int,
+        ref_to_idx: dict[str, int]
+    ) -> list[bytes]:
+        if cls.serialize is not Color4ChannelsMeta.serialize:
+            return super().serialize_many(values, version, ref_to_idx)
+        return _split(struct.pack(f'>{len(values)}I', *values), 4)
+
+    @classmethod
+    def deserialize_many(
+        cls,
+        buffer: bytes | memoryview,
+        lengths: Sequence[int],
+        version: int
+    ) -> list[int]:
+        if (cls.deserialize is not Color4ChannelsMeta.deserialize
+                or lengths.count(4) != len(lengths)):
+            return super().deserialize_many(buffer, lengths, version)
+        return list(struct.unpack_from(f'>{len(lengths)}I', buffer))
+
 
 class InputAxisMeta(EnumMeta):
     """Class for input channel input axis"""
@@ -212,6 +335,7 @@ class SingleSourceBrickMeta(_b.PropertyMeta[str]):
     """Class for single input channel argument (seats, ...)"""
 
     EMPTY: Final[str] = None
+    USES_BRICK_REFERENCES = True
 
     @staticmethod
     def serialize(
@@ -235,6 +359,7 @@ class SourceBricksMeta(_b.PropertyMeta[tuple[str, ...]]):
     """Class for custom input channel argument"""
 
     EMPTY: Final[tuple] = ()
+    USES_BRICK_REFERENCES = True
 
     @staticmethod
     def serialize(
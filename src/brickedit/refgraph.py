@@ -0,0 +1,474 @@
+"""
+Graph of the references between bricks, to find the bricks reading from a brick without going
+through every property of every brick.
+
+Properties using brick references (SourceBricksMeta such as input channels, SingleSourceBrickMeta
+such as OwningSeat) hold the ID.id of the bricks a brick reads from.
+"""
+from array import array
+from dataclasses import dataclass
+from typing import Optional, Iterable, Iterator
+from collections.abc import Hashable
+
+from . import brick as _brick
+from . import p as _p
+
+
+Ref = str | int
+"""Reference of a brick (ID.id), as stored in properties using brick references."""
+
+
+def _targets(v: Hashable) -> tuple[Ref, ...]:
+    """References held by the value of a property using brick references."""
+    if v is None:
+        return ()
+    if isinstance(v, tuple):
+        return v
+    return (v,)
+
+
+@dataclass(frozen=True, slots=True)
+class ReferenceCSR:
+    """
+    Reference graph as compressed sparse row arrays. Bricks are numbered by their position in
+    `bricks`: bricks[i] reads from the bricks sources[offsets[i]:offsets[i+1]], and is read by
+    the bricks readers[reader_offsets[i]:reader_offsets[i+1]]. References to bricks that are not
+    in the graph are left out.
+
+    Attributes:
+        bricks (list[Brick]): Bricks of the graph;
+        offsets (array): Start of the sources of each brick, and the number of edges (typecode 'I');
+        sources (array): Index of the bricks read by each brick, in order (typecode 'I');
+        reader_offsets (array): Start of the readers of each brick, and the number of edges
+            (typecode 'I');
+        readers (array): Index of the bricks reading from each brick, ascending (typecode 'I').
+    """
+    bricks: list[_brick.Brick]
+    offsets: array
+    sources: array
+    reader_offsets: array
+    readers: array
+
+
+class ReferenceGraph:
+    """
+    Adjacency and reverse adjacency of the references between bricks. Bricks are the keys of the
+    graph, references are resolved through their ID.id: a reference to a brick that is not in the
+    graph (yet) is kept, and is resolved once a brick with this reference is added.
+
+    The graph is not updated when bricks change: edit properties through set_property and
+    reset_property, or call update(brick) after editing a brick.
+    """
+
+    __slots__ = ('_uses', '_ids', '_by_id', '_out', '_in')
+
+    def __init__(self, bricks: Optional[Iterable[_brick.Brick]] = None):
+        """
+        Args:
+            bricks (Iterable[Brick]) (optional): Bricks to add. Defaults to none.
+        """
+        # Whether each property uses brick references
+        self._uses: dict[str, bool] = {}
+        # ID.id of each brick when it was added, in order
+        self._ids: dict[_brick.Brick, Ref] = {}
+        self._by_id: dict[Ref, _brick.Brick] = {}
+        # References of each brick by property, for bricks having any
+        self._out: dict[_brick.Brick, dict[str, tuple[Ref, ...]]] = {}
+        # Ordered set of (brick, property) referencing each ID.id
+        self._in: dict[Ref, dict[tuple[_brick.Brick, str], None]] = {}
+
+        if bricks is None:
+            return
+
+        # No repeated global lookups
+        ids = self._ids
+        by_id = self._by_id
+        out = self._out
+        in_ = self._in
+        uses = self._uses
+        uses_references = self._uses_references
+        targets_of = _targets
+
+        for brick in bricks:
+            if brick in ids:
+                self._remove(brick)
+            ref = brick.ref.id
+            ids[brick] = ref
+            by_id[ref] = brick
+            refs = None
+            for prop, value in brick.ppatch.items():
+                use = uses.get(prop)
+                if use is None:
+                    use = uses_references(prop)
+                if not use:
+                    continue
+                targets = targets_of(value)
+                if not targets:
+                    continue
+                if refs is None:
+                    refs = out[brick] = {}
+                refs[prop] = targets
+                edge = (brick, prop)
+                for target in targets:
+                    readers = in_.get(target)
+                    if readers is None:
+                        in_[target] = {edge: None}
+                    else:
+                        readers[edge] = None
+
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, brick: _brick.Brick) -> bool:
+        return brick in self._ids
+
+    def __iter__(self) -> Iterator[_brick.Brick]:
+        return iter(self._ids)
+
+    def brick(self, ref: Ref) -> _brick.Brick:
+        """
+        Args:
+            ref (str | int): Reference (ID.id) of a brick.
+
+        Raises:
+            KeyError: If no brick of the graph has this reference.
+
+        Returns:
+            Brick: Brick of the graph with this reference (the last added if several have it).
+        """
+        return self._by_id[ref]
+
+
+    # -------- Edition
+
+
+    def _uses_references(self, prop: str) -> bool:
+        """Whether `prop` uses brick references, cached."""
+        pmeta = _p.pmeta_registry.get(prop)
+        use = self._uses[prop] = pmeta is not None and pmeta.USES_BRICK_REFERENCES
+        return use
+
+    def _link(self, brick: _brick.Brick, prop: str, value: Hashable) -> None:
+        targets = _targets(value)
+        if not targets:
+            return
+        self._out.setdefault(brick, {})[prop] = targets
+        in_ = self._in
+        edge = (brick, prop)
+        for target in targets:
+            in_.setdefault(target, {})[edge] = None
+
+    def _unlink(self, brick: _brick.Brick, prop: str) -> None:
+        refs = self._out.get(brick)
+        if refs is None or prop not in refs:
+            return
+        targets = refs.pop(prop)
+        if not refs:
+            del self._out[brick]
+        in_ = self._in
+        edge = (brick, prop)
+        for target in targets:
+            readers = in_.get(target)
+            if readers is not None and edge in readers:
+                del readers[edge]
+                if not readers:
+                    del in_[target]
+
+    def _insert(self, brick: _brick.Brick) -> None:
+        ref = brick.ref.id
+        self._ids[brick] = ref
+        self._by_id[ref] = brick
+        uses = self._uses
+        for prop, value in brick.ppatch.items():
+            use = uses.get(prop)
+            if use is None:
+                use = self._uses_references(prop)
+            if use:
+                self._link(brick, prop, value)
+
+    def _remove(self, brick: _brick.Brick) -> None:
+        ref = self._ids.pop(brick)
+        if self._by_id.get(ref) is brick:
+            del self._by_id[ref]
+        refs = self._out.get(brick)
+        if refs is not None:
+            for prop in list(refs):
+                self._unlink(brick, prop)
+
+    def add(self, brick: _brick.Brick) -> None:
+        """
+        Adds a brick to the graph, or reads its references again if it is already in the graph.
+
+        Args:
+            brick (Brick): Brick to add.
+        """
+        if brick in self._ids:
+            self._remove(brick)
+        self._insert(brick)
+
+    def update(self, brick: _brick.Brick) -> None:
+        """
+        Reads the reference (ID.id) and the references to other bricks of a brick again, after it
+        was edited.
+
+        Args:
+            brick (Brick): Brick of the graph.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+        """
+        self._remove(brick)
+        self._insert(brick)
+
+    def set_property(self, brick: _brick.Brick, p: str, v: Hashable) -> _brick.Brick:
+        """
+        Sets a property of a brick (Brick.set_property), updating its references if the property
+        uses brick references.
+
+        Args:
+            brick (Brick): Brick of the graph;
+            p (str): The name of the property to set;
+            v (Hashable): The value to set the property to.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+
+        Returns:
+            Brick: The brick.
+        """
+        if brick not in self._ids:
+            raise KeyError(brick)
+        brick.set_property(p, v)
+        use = self._uses.get(p)
+        if use is None:
+            use = self._uses_references(p)
+        if use:
+            self._unlink(brick, p)
+            self._link(brick, p, v)
+        return brick
+
+    def reset_property(self, brick: _brick.Brick, p: str) -> _brick.Brick:
+        """
+        Resets a property of a brick (Brick.reset_property), removing its references if the
+        property uses brick references.
+
+        Args:
+            brick (Brick): Brick of the graph;
+            p (str): The name of the property to reset.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+
+        Returns:
+            Brick: The brick.
+        """
+        if brick not in self._ids:
+            raise KeyError(brick)
+        brick.reset_property(p)
+        self._unlink(brick, p)
+        return brick
+
+    def remove(self, brick: _brick.Brick, repair: bool = False) -> list[_brick.Brick]:
+        """
+        Removes a brick from the graph. See remove_many.
+
+        Args:
+            brick (Brick): Brick of the graph;
+            repair (bool) (optional): Whether to remove the references to this brick from the
+                bricks reading from it. Defaults to False.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+
+        Returns:
+            list[Brick]: Repaired bricks.
+        """
+        return self.remove_many((brick,), repair)
+
+    def remove_many(self, bricks: Iterable[_brick.Brick], repair: bool = False) -> list[_brick.Brick]:
+        """
+        Removes bricks from the graph. With `repair`, the references to these bricks are removed
+        from the bricks of the graph reading from them: they are dropped from multiple references
+        (SourceBricksMeta), and single references (SingleSourceBrickMeta) or emptied multiple
+        references are reset. Every repaired property is written once, however many of its
+        references were removed.
+
+        Bricks are not removed from the vehicle: remove them with BRVFile.remove_many as well.
+
+        Args:
+            bricks (Iterable[Brick]): Bricks of the graph;
+            repair (bool) (optional): Whether to remove the references to these bricks from the
+                bricks reading from them. Defaults to False.
+
+        Raises:
+            KeyError: If a brick is not in the graph.
+
+        Returns:
+            list[Brick]: Repaired bricks, in no particular order.
+        """
+        # No repeated global lookups
+        ids = self._ids
+        by_id = self._by_id
+        in_ = self._in
+
+        gone = set()
+        for brick in bricks:
+            if brick not in ids:
+                raise KeyError(brick)
+            ref = ids[brick]
+            self._remove(brick)
+            # Another brick of the graph may have the same reference
+            if ref not in by_id:
+                gone.add(ref)
+        if not repair:
+            return []
+
+        # Properties to repair, each once
+        edges = {}
+        for ref in gone:
+            readers = in_.get(ref)
+            if readers is not None:
+                edges.update(readers)
+
+        repaired = {}
+        for brick, prop in edges:
+            value = brick.ppatch.get(prop)
+            kept = tuple(t for t in value if t not in gone) if isinstance(value, tuple) else ()
+            self._unlink(brick, prop)
+            if kept:
+                brick.set_property(prop, kept)
+                self._link(brick, prop, kept)
+            else:
+                brick.reset_property(prop)
+            repaired[brick] = None
+        return list(repaired)
+
+
+    # -------- Queries
+
+
+    def references(self, brick: _brick.Brick) -> dict[str, tuple[Ref, ...]]:
+        """
+        Args:
+            brick (Brick): Brick of the graph.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+
+        Returns:
+            dict[str, tuple[str | int, ...]]: References held by each property of the brick,
+            for its properties holding any.
+        """
+        if brick not in self._ids:
+            raise KeyError(brick)
+        return dict(self._out.get(brick, {}))
+
+    def sources(self, brick: _brick.Brick) -> list[_brick.Brick]:
+        """
+        Args:
+            brick (Brick): Brick of the graph.
+
+        Raises:
+            KeyError: If the brick is not in the graph.
+
+        Returns:
+            list[Brick]: Bricks of the graph the brick reads from, each once, in order of its
+            properties.
+        """
+        if brick not in self._ids:
+            raise KeyError(brick)
+        by_id = self._by_id
+        found = {}
+        for targets in self._out.get(brick, {}).values():
+            for target in targets:
+                source = by_id.get(target)
+                if source is not None:
+                    found[source] = None
+        return list(found)
+
+    def readers(self, brick: _brick.Brick | Ref) -> list[_brick.Brick]:
+        """
+        Args:
+            brick (Brick | str | int): Brick, or reference (ID.id) of a brick that may not be in
+                the graph.
+
+        Returns:
+            list[Brick]: Bricks of the graph reading from the brick, each once.
+        """
+        ref = brick.ref.id if isinstance(brick, _brick.Brick) else brick
+        readers = self._in.get(ref)
+        if readers is None:
+            return []
+        return list(dict.fromkeys(reader for reader, _ in readers))
+
+    def reader_properties(self, brick: _brick.Brick | Ref) -> list[tuple[_brick.Brick, str]]:
+        """
+        Args:
+            brick (Brick | str | int): Brick, or reference (ID.id) of a brick that may not be in
+                the graph.
+
+        Returns:
+            list[tuple[Brick, str]]: Bricks of the graph reading from the brick, and the name
+            of the property holding the reference.
+        """
+        ref = brick.ref.id if isinstance(brick, _brick.Brick) else brick
+        return list(self._in.get(ref, ()))
+
+    def dangling(self) -> list[tuple[_brick.Brick, str, Ref]]:
+        """
+        Returns:
+            list[tuple[Brick, str, str | int]]: References to bricks that are not in the graph:
+            the brick holding the reference, the name of the property and the reference.
+        """
+        by_id = self._by_id
+        return [(brick, prop, ref)
+                for ref, readers in self._in.items() if ref not in by_id
+                for brick, prop in readers]
+
+    def csr(self) -> ReferenceCSR:
+        """
+        Builds compressed sparse row arrays of the graph, numbering bricks in the order they were
+        added. Suited to going through the references of large vehicles, e.g. with NumPy
+        (numpy.frombuffer).
+
+        Returns:
+            ReferenceCSR: Adjacency and reverse adjacency arrays.
+        """
+        bricks = list(self._ids)
+        index = {brick: i for i, brick in enumerate(bricks)}
+        by_id = self._by_id
+        out = self._out
+
+        offsets = array('I', [0])
+        sources = array('I')
+        in_degree = [0] * len(bricks)
+        for brick in bricks:
+            refs = out.get(brick)
+            if refs is not None:
+                found = {}
+                for targets in refs.values():
+                    for target in targets:
+                        source = by_id.get(target)
+                        if source is not None:
+                            found[index[source]] = None
+                sources.extend(found)
+                for j in found:
+                    in_degree[j] += 1
+            offsets.append(len(sources))
+
+        # Counting sort of the edges by source brick
+        reader_offsets = array('I', [0]) * (len(bricks) + 1)
+        total = 0
+        for j, degree in enumerate(in_degree):
+            reader_offsets[j] = total
+            total += degree
+        reader_offsets[len(bricks)] = total
+        readers = array('I', [0]) * total
+        fill = reader_offsets[:-1] if bricks else array('I')
+        for i in range(len(bricks)):
+            for k in range(offsets[i], offsets[i+1]):
+                j = sources[k]
+                readers[fill[j]] = i
+                fill[j] += 1
+        return ReferenceCSR(bricks, offsets, sources, reader_offsets, readers)
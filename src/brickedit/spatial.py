@@ -0,0 +1,439 @@
+"""
+Spatial index of bricks, to find the bricks of a region without going through every brick.
+
+Bricks are stored in a uniform grid of cubic cells, in every cell their axis-aligned bounding box
+overlaps (see measure.boxes). Bricks overlapping too many cells are kept aside and checked by
+every query.
+"""
+from math import floor
+from typing import Optional, Iterable, Iterator, Final
+import heapq
+
+from . import brick as _brick
+from . import measure as _measure
+from . import var as _var
+from . import vec as _vec
+
+
+DEFAULT_CELL_SIZE: Final[float] = 30.0
+"""Size in centimeters of the cells of empty indexes."""
+
+MAX_CELLS_PER_BRICK: Final[int] = 64
+"""Bricks overlapping more cells are not stored in the grid, but checked by every query."""
+
+Box = tuple[float, float, float, float, float, float]
+"""Axis-aligned bounding box: min x, y, z, max x, y, z."""
+
+
+class SpatialIndex:
+    """
+    Uniform grid of bricks, answering range, nearest neighbour and overlap queries without going
+    through every brick. Bricks are the keys of the index: edit a brick's position, rotation or
+    size, then call update(brick) to move it in the index.
+    """
+
+    __slots__ = ('version', '_cell_size', '_inv_cell_size', '_boxes', '_cells', '_large', '_bounds')
+
+    def __init__(
+        self,
+        bricks: Optional[Iterable[_brick.Brick]] = None,
+        version: int = _var.FILE_EXP_VERSION,
+        cell_size: Optional[float] = None
+    ):
+        """
+        Args:
+            bricks (Iterable[Brick]) (optional): Bricks to index. Defaults to none;
+            version (int) (optional): Version of the vehicle file of the bricks, see measure.
+                Defaults to FILE_EXP_VERSION;
+            cell_size (float) (optional): Size of the cells in centimeters. Defaults to twice the
+                median size of the bricks (largest side of their bounding box), or
+                DEFAULT_CELL_SIZE if there are none.
+        """
+        self.version: int = version
+        self._boxes: dict[_brick.Brick, Box] = {}
+        self._cells: dict[tuple[int, int, int], list[_brick.Brick]] = {}
+        # Ordered set of the bricks overlapping more than MAX_CELLS_PER_BRICK cells
+        self._large: dict[_brick.Brick, None] = {}
+        # Lowest and highest cell coordinates ever used, along each axis
+        self._bounds: list[int] | None = None
+
+        bricks = [] if bricks is None else list(bricks)
+        pos, rot, size, _, _, rot_index = _measure.brick_arrays(bricks, version)
+        flat = _measure.boxes(pos, rot, size, rot_index)
+        box_list = [tuple(flat[j:j+6]) for j in range(0, len(flat), 6)]
+
+        if cell_size is None:
+            cell_size = DEFAULT_CELL_SIZE
+            if box_list:
+                sides = sorted(max(b[3] - b[0], b[4] - b[1], b[5] - b[2]) for b in box_list)
+                median = sides[len(sides) // 2]
+                if median > 0.0:
+                    cell_size = 2.0 * median
+        if cell_size <= 0.0:
+            raise ValueError(f'cell_size must be positive, got {cell_size}')
+        self._cell_size: float = cell_size
+        self._inv_cell_size: float = 1.0 / cell_size
+
+        for brick, box in zip(bricks, box_list):
+            if brick in self._boxes:
+                self._remove(brick)
+            self._insert(brick, box)
+
+
+    @property
+    def cell_size(self) -> float:
+        """Size of the cells in centimeters."""
+        return self._cell_size
+
+    def __len__(self) -> int:
+        return len(self._boxes)
+
+    def __contains__(self, brick: _brick.Brick) -> bool:
+        return brick in self._boxes
+
+    def __iter__(self) -> Iterator[_brick.Brick]:
+        return iter(self._boxes)
+
+    def box(self, brick: _brick.Brick) -> tuple[_vec.Vec3, _vec.Vec3]:
+        """
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+
+        Returns:
+            tuple[Vec3, Vec3]: Lowest and highest corner of the bounding box stored for the brick.
+        """
+        b = self._boxes[brick]
+        return _vec.Vec3(b[0], b[1], b[2]), _vec.Vec3(b[3], b[4], b[5])
+
+
+    # -------- Edition
+
+
+    def _cell_range(self, box: Box) -> tuple[int, int, int, int, int, int]:
+        """Lowest and highest cell coordinates overlapped by `box`."""
+        inv = self._inv_cell_size
+        return (
+            floor(box[0] * inv), floor(box[1] * inv), floor(box[2] * inv),
+            floor(box[3] * inv), floor(box[4] * inv), floor(box[5] * inv)
+        )
+
+    def _insert(self, brick: _brick.Brick, box: Box) -> None:
+        self._boxes[brick] = box
+        x0, y0, z0, x1, y1, z1 = self._cell_range(box)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1) > MAX_CELLS_PER_BRICK:
+            self._large[brick] = None
+            return
+
+        cells = self._cells
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for z in range(z0, z1 + 1):
+                    bucket = cells.get((x, y, z))
+                    if bucket is None:
+                        cells[(x, y, z)] = [brick]
+                    else:
+                        bucket.append(brick)
+
+        bounds = self._bounds
+        if bounds is None:
+            self._bounds = [x0, y0, z0, x1, y1, z1]
+        else:
+            bounds[0] = min(bounds[0], x0)
+            bounds[1] = min(bounds[1], y0)
+            bounds[2] = min(bounds[2], z0)
+            bounds[3] = max(bounds[3], x1)
+            bounds[4] = max(bounds[4], y1)
+            bounds[5] = max(bounds[5], z1)
+
+    def _remove(self, brick: _brick.Brick) -> None:
+        box = self._boxes.pop(brick)
+        if brick in self._large:
+            del self._large[brick]
+            return
+
+        cells = self._cells
+        x0, y0, z0, x1, y1, z1 = self._cell_range(box)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for z in range(z0, z1 + 1):
+                    bucket = cells[(x, y, z)]
+                    bucket.remove(brick)
+                    if not bucket:
+                        del cells[(x, y, z)]
+
+    def _measure_box(self, brick: _brick.Brick) -> Box:
+        pos, rot, size, _, _, rot_index = _measure.brick_arrays((brick,), self.version)
+        return tuple(_measure.boxes(pos, rot, size, rot_index, use_numpy=False))
+
+    def add(self, brick: _brick.Brick) -> None:
+        """
+        Adds a brick to the index, or moves it if it is already indexed.
+
+        Args:
+            brick (Brick): Brick to add.
+        """
+        if brick in self._boxes:
+            self._remove(brick)
+        self._insert(brick, self._measure_box(brick))
+
+    def update(self, brick: _brick.Brick) -> None:
+        """
+        Moves a brick in the index after its position, rotation or size changed.
+
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+        """
+        self._remove(brick)
+        self._insert(brick, self._measure_box(brick))
+
+    def remove(self, brick: _brick.Brick) -> None:
+        """
+        Removes a brick from the index.
+
+        Args:
+            brick (Brick): Indexed brick.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+        """
+        self._remove(brick)
+
+
+    # -------- Queries
+
+
+    def _candidates(self, box: Box) -> dict[_brick.Brick, None]:
+        """Bricks stored in the cells overlapped by `box`, and large bricks (ordered set)."""
+        cells = self._cells
+        found = dict.fromkeys(self._large)
+        x0, y0, z0, x1, y1, z1 = self._cell_range(box)
+        if (x1 - x0 + 1) * (y1 - y0 + 1) * (z1 - z0 + 1) > len(cells):
+            # Fewer non-empty cells than cells in the box
+            for (x, y, z), bucket in cells.items():
+                if x0 <= x <= x1 and y0 <= y <= y1 and z0 <= z <= z1:
+                    found.update(dict.fromkeys(bucket))
+            return found
+
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for z in range(z0, z1 + 1):
+                    bucket = cells.get((x, y, z))
+                    if bucket is not None:
+                        found.update(dict.fromkeys(bucket))
+        return found
+
+    def query_box(self, lo: _vec.Vec3, hi: _vec.Vec3) -> list[_brick.Brick]:
+        """
+        Bricks whose bounding box intersects the box from `lo` to `hi` (touching counts).
+
+        Args:
+            lo (Vec3): Lowest corner of the box;
+            hi (Vec3): Highest corner of the box.
+
+        Returns:
+            list[Brick]: Bricks in the box.
+        """
+        qx0, qy0, qz0 = lo.x, lo.y, lo.z
+        qx1, qy1, qz1 = hi.x, hi.y, hi.z
+        boxes = self._boxes
+        result = []
+        for brick in self._candidates((qx0, qy0, qz0, qx1, qy1, qz1)):
+            b = boxes[brick]
+            if b[0] <= qx1 and b[3] >= qx0 and b[1] <= qy1 and b[4] >= qy0 and b[2] <= qz1 and b[5] >= qz0:
+                result.append(brick)
+        return result
+
+    def query_radius(self, center: _vec.Vec3, radius: float) -> list[_brick.Brick]:
+        """
+        Bricks whose bounding box is at most `radius` away from `center`.
+
+        Args:
+            center (Vec3): Center of the sphere;
+            radius (float): Radius of the sphere, in centimeters.
+
+        Returns:
+            list[Brick]: Bricks in the sphere.
+        """
+        cx, cy, cz = center.x, center.y, center.z
+        sq_radius = radius * radius
+        boxes = self._boxes
+        result = []
+        for brick in self._candidates((cx - radius, cy - radius, cz - radius, cx + radius, cy + radius, cz + radius)):
+            if _sq_distance(boxes[brick], cx, cy, cz) <= sq_radius:
+                result.append(brick)
+        return result
+
+    def nearest(self, point: _vec.Vec3, k: int = 1) -> list[_brick.Brick]:
+        """
+        The `k` bricks closest to `point`, by distance to their bounding box (0 inside it).
+
+        Args:
+            point (Vec3): Point;
+            k (int) (optional): Number of bricks. Defaults to 1.
+
+        Returns:
+            list[Brick]: Up to `k` bricks, closest first.
+        """
+        if k <= 0 or not self._boxes:
+            return []
+
+        # No repeated global lookups
+        cells = self._cells
+        boxes = self._boxes
+        sq_distance = _sq_distance
+
+        px, py, pz = point.x, point.y, point.z
+        inv = self._inv_cell_size
+        cx, cy, cz = floor(px * inv), floor(py * inv), floor(pz * inv)
+        distances = {brick: sq_distance(boxes[brick], px, py, pz) for brick in self._large}
+
+        bounds = self._bounds
+        max_ring = -1 if bounds is None else max(
+            cx - bounds[0], bounds[3] - cx, cy - bounds[1], bounds[4] - cy, cz - bounds[2], bounds[5] - cz
+        )
+        r = 0
+        while r <= max_ring:
+            if 24 * r * r + 2 > len(cells):
+                # Fewer non-empty cells than cells in the ring: go through the remaining cells
+                for (x, y, z), bucket in cells.items():
+                    if max(abs(x - cx), abs(y - cy), abs(z - cz)) >= r:
+                        for brick in bucket:
+                            if brick not in distances:
+                                distances[brick] = sq_distance(boxes[brick], px, py, pz)
+                break
+
+            for key in _ring(cx, cy, cz, r):
+                bucket = cells.get(key)
+                if bucket is not None:
+                    for brick in bucket:
+                        if brick not in distances:
+                            distances[brick] = sq_distance(boxes[brick], px, py, pz)
+            # Bricks only stored in the next rings are at least r cells away
+            if len(distances) >= k:
+                kth = heapq.nsmallest(k, distances.values())[-1]
+                if kth <= (r * self._cell_size) ** 2:
+                    break
+            r += 1
+
+        return heapq.nsmallest(k, distances, key=distances.__getitem__)
+
+    def overlapping(self, brick: _brick.Brick, tolerance: float = 0.01) -> list[_brick.Brick]:
+        """
+        Bricks whose bounding box overlaps the one of `brick`.
+
+        Args:
+            brick (Brick): Indexed brick;
+            tolerance (float) (optional): Boxes must overlap by more than `tolerance` centimeters
+                along each axis, so that touching bricks do not overlap. Defaults to 0.01.
+
+        Raises:
+            KeyError: If the brick is not indexed.
+
+        Returns:
+            list[Brick]: Overlapping bricks, except `brick`.
+        """
+        a = self._boxes[brick]
+        boxes = self._boxes
+        return [
+            other for other in self._candidates(a)
+            if other is not brick and _overlap(a, boxes[other], tolerance)
+        ]
+
+    def overlap_pairs(self, tolerance: float = 0.01) -> list[tuple[_brick.Brick, _brick.Brick]]:
+        """
+        All pairs of bricks whose bounding boxes overlap. See SpatialIndex.overlapping.
+
+        Args:
+            tolerance (float) (optional): Boxes must overlap by more than `tolerance` centimeters
+                along each axis. Defaults to 0.01.
+
+        Returns:
+            list[tuple[Brick, Brick]]: Pairs of overlapping bricks, each pair once.
+        """
+        # No repeated global lookups
+        boxes = self._boxes
+        inv = self._inv_cell_size
+        x0_key = _x0_key
+
+        # Boxes overlap by more than `tolerance` if the boxes shrunk by tolerance / 2 on each side
+        # strictly overlap. Bricks thinner than `tolerance` cannot overlap anything.
+        h = 0.5 * tolerance
+        shrunk = {}
+        for brick, b in boxes.items():
+            sb = (b[0] + h, b[1] + h, b[2] + h, b[3] - h, b[4] - h, b[5] - h)
+            if sb[0] < sb[3] and sb[1] < sb[4] and sb[2] < sb[5]:
+                shrunk[brick] = sb
+
+        pairs = []
+        for (x, y, z), bucket in self._cells.items():
+            if len(bucket) < 2:
+                continue
+            # Sweep along x: stop at the first box starting after the end of the current one
+            items = sorted([(shrunk[b], b) for b in bucket if b in shrunk], key=x0_key)
+            n = len(items)
+            for i in range(n - 1):
+                (_, ay0, az0, ax1, ay1, az1), a = items[i]
+                for j in range(i + 1, n):
+                    bb, b = items[j]
+                    if bb[0] >= ax1:
+                        break
+                    if bb[1] < ay1 and ay0 < bb[4] and bb[2] < az1 and az0 < bb[5]:
+                        # Only reported by the cell holding the lowest corner of the intersection
+                        # (bb[0] is at least the x0 of a after sorting)
+                        if (floor(bb[0] * inv) == x and floor(max(ay0, bb[1]) * inv) == y
+                                and floor(max(az0, bb[2]) * inv) == z):
+                            pairs.append((a, b))
+
+        large = self._large
+        checked = set()
+        for a in large:
+            ba = boxes[a]
+            checked.add(a)
+            for b in self._candidates(ba):
+                if b not in checked and _overlap(ba, boxes[b], tolerance):
+                    pairs.append((a, b))
+        return pairs
+
+
+
+def _sq_distance(b: Box, x: float, y: float, z: float) -> float:
+    """Squared distance from (x, y, z) to box `b`, 0 inside it."""
+    dx = b[0] - x if x < b[0] else (x - b[3] if x > b[3] else 0.0)
+    dy = b[1] - y if y < b[1] else (y - b[4] if y > b[4] else 0.0)
+    dz = b[2] - z if z < b[2] else (z - b[5] if z > b[5] else 0.0)
+    return dx * dx + dy * dy + dz * dz
+
+
+def _overlap(a: Box, b: Box, tolerance: float) -> bool:
+    """Whether boxes `a` and `b` overlap by more than `tolerance` along each axis."""
+    return (
+        min(a[3], b[3]) - max(a[0], b[0]) > tolerance
+        and min(a[4], b[4]) - max(a[1], b[1]) > tolerance
+        and min(a[5], b[5]) - max(a[2], b[2]) > tolerance
+    )
+
+
+def _x0_key(item: tuple[Box, _brick.Brick]) -> float:
+    return item[0][0]
+
+
+def _ring(cx: int, cy: int, cz: int, r: int) -> Iterator[tuple[int, int, int]]:
+    """Cells at Chebyshev distance `r` from cell (cx, cy, cz)."""
+    if r == 0:
+        yield (cx, cy, cz)
+        return
+    for x in range(cx - r, cx + r + 1):
+        x_side = x == cx - r or x == cx + r
+        for y in range(cy - r, cy + r + 1):
+            if x_side or y == cy - r or y == cy + r:
+                for z in range(cz - r, cz + r + 1):
+                    yield (x, y, z)
+            else:
+                yield (x, y, cz - r)
+                yield (x, y, cz + r)
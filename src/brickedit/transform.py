@@ -0,0 +1,210 @@
+"""
+Bulk transforms of brick positions and rotations.
+
+Uses NumPy when it is installed, and a pure Python implementation built on vhelper.mat otherwise.
+Positions, rotations and scales are passed as flat sequences of x, y, z triplets.
+"""
+from typing import Optional, Sequence, Final
+import importlib
+import importlib.util
+
+from .vhelper import mat as _mat
+
+
+# NumPy is only imported by the first transform using it: it takes longer to import than brickedit
+HAS_NUMPY: Final[bool] = importlib.util.find_spec('numpy') is not None
+
+IDENTITY: Final[_mat.Matrix3] = ((1.0, 0.0, 0.0), (0.0, 1.0, 0.0), (0.0, 0.0, 1.0))
+
+
+def is_orthogonal(m: _mat.Matrix3, tol: float = 1e-6) -> bool:
+    """Whether `m` is a rotation or a reflection (does not scale).
+
+    Args:
+        m (Matrix3): Matrix.
+        tol (float) (optional): Tolerance.
+
+    Returns:
+        bool: True if m.T @ m is the identity.
+    """
+    mtm = _mat.mul_mat3(_mat.transpose_mat3(m), m)
+    return all(abs(mtm[i][j] - IDENTITY[i][j]) <= tol for i in range(3) for j in range(3))
+
+
+def transform_arrays(
+    m: _mat.Matrix3,
+    t: _mat.TupleVec3,
+    pos: Sequence[float],
+    rot: Sequence[float],
+    use_numpy: Optional[bool] = None
+) -> tuple[list[float], list[float] | None, list[float] | None]:
+    """
+    Applies `p → m @ p + t` to positions, and `m` to the orientation of bricks.
+
+    The orientation `R` of a brick (see vhelper.mat.euler_to_mat3) becomes `m @ R` with normalized
+    axes. The lengths of the transformed axes are the scale factors of the brick along its local
+    axes. If `m` is a reflection, the local axis most changed by it is flipped to keep a valid
+    rotation: bricks symmetric along this axis are mirrored exactly.
+
+    Args:
+        m (Matrix3): Matrix.
+        t (TupleVec3): Translation.
+        pos (Sequence[float]): Positions, as x, y, z triplets.
+        rot (Sequence[float]): Rotations in degrees, as x, y, z (roll, pitch, yaw) triplets.
+        use_numpy (bool) (optional): Defaults to HAS_NUMPY.
+
+    Returns:
+        tuple[list[float], list[float] | None, list[float] | None]: New positions, new rotations
+        (None if m is the identity) and scales along local axes (None if m does not scale).
+    """
+    if use_numpy is None:
+        use_numpy = HAS_NUMPY
+
+    if m == IDENTITY:
+        tx, ty, tz = t
+        new_pos = list(pos)
+        for j in range(0, len(new_pos), 3):
+            new_pos[j] += tx
+            new_pos[j+1] += ty
+            new_pos[j+2] += tz
+        return new_pos, None, None
+
+    scales = not is_orthogonal(m)
+    reflects = _mat.det_mat3(m) < 0
+    if use_numpy:
+        return _transform_numpy(m, t, pos, rot, scales, reflects)
+    return _transform_python(m, t, pos, rot, scales, reflects)
+
+
+def _transform_python(
+    m: _mat.Matrix3,
+    t: _mat.TupleVec3,
+    pos: Sequence[float],
+    rot: Sequence[float],
+    scales: bool,
+    reflects: bool
+) -> tuple[list[float], list[float], list[float] | None]:
+    """See transform_arrays."""
+
+    # No repeated global lookups
+    mul_mat3_vec3 = _mat.mul_mat3_vec3
+    mul_mat3 = _mat.mul_mat3
+    euler_to_mat3 = _mat.euler_to_mat3
+    mat3_to_euler = _mat.mat3_to_euler
+    tx, ty, tz = t
+
+    new_pos = []
+    new_rot = []
+    new_scales = [] if scales else None
+    for j in range(0, len(pos), 3):
+        x, y, z = mul_mat3_vec3(m, (pos[j], pos[j+1], pos[j+2]))
+        new_pos += (x + tx, y + ty, z + tz)
+
+        r = euler_to_mat3((rot[j], rot[j+1], rot[j+2]))
+        a = mul_mat3(m, r)
+        # Normalize each axis (column)
+        lengths = [(a[0][k] ** 2 + a[1][k] ** 2 + a[2][k] ** 2) ** 0.5 for k in range(3)]
+        cols = [[a[i][k] / lengths[k] for i in range(3)] for k in range(3)]
+        if reflects:
+            # Flip the axis that moved the most: the one least aligned with its previous direction
+            alignment = [sum(cols[k][i] * r[i][k] for i in range(3)) for k in range(3)]
+            k = alignment.index(min(alignment))
+            cols[k] = [-c for c in cols[k]]
+        new_rot += mat3_to_euler(_mat.transpose_mat3(cols))
+        if scales:
+            new_scales += lengths
+
+    return new_pos, new_rot, new_scales
+
+
+def rotation_matrices_numpy(rot: Sequence[float]):
+    """
+    Matrices of many rotations expressed like brick rotations, at once. Requires NumPy.
+    See rotation_matrix.
+
+    Args:
+        rot (Sequence[float]): Flat x, y, z triplets of rotations in degrees, or an n×3 array.
+
+    Returns:
+        numpy.ndarray: n×3×3 array of the rotation matrices.
+    """
+    np = importlib.import_module('numpy')
+    angles = np.radians(np.asarray(rot, dtype=np.float64).reshape(-1, 3))
+    sr, sp, sy = np.sin(angles).T
+    cr, cp, cy = np.cos(angles).T
+    r = np.empty((len(angles), 3, 3))
+    r[:, 0, 0] = cp * cy
+    r[:, 0, 1] = sr * sp * cy - cr * sy
+    r[:, 0, 2] = -(cr * sp * cy + sr * sy)
+    r[:, 1, 0] = cp * sy
+    r[:, 1, 1] = sr * sp * sy + cr * cy
+    r[:, 1, 2] = cy * sr - cr * sp * sy
+    r[:, 2, 0] = sp
+    r[:, 2, 1] = -sr * cp
+    r[:, 2, 2] = cr * cp
+    return r
+
+
+def _transform_numpy(
+    m: _mat.Matrix3,
+    t: _mat.TupleVec3,
+    pos: Sequence[float],
+    rot: Sequence[float],
+    scales: bool,
+    reflects: bool
+) -> tuple[list[float], list[float], list[float] | None]:
+    """See transform_arrays."""
+    np = importlib.import_module('numpy')
+
+    mm = np.array(m, dtype=np.float64)
+    new_pos = np.asarray(pos, dtype=np.float64).reshape(-1, 3) @ mm.T + np.array(t, dtype=np.float64)
+
+    r = rotation_matrices_numpy(rot)
+    a = mm @ r
+    # Normalize each axis (column)
+    lengths = np.linalg.norm(a, axis=1)
+    a /= lengths[:, None, :]
+    if reflects:
+        # Flip the axis that moved the most: the one least aligned with its previous direction
+        k = np.argmin(np.einsum('nik,nik->nk', a, r), axis=1)
+        a[np.arange(len(a)), :, k] *= -1
+
+    # See vhelper.mat.mat3_to_euler
+    pitch = np.arctan2(a[:, 2, 0], np.hypot(a[:, 0, 0], a[:, 1, 0]))
+    yaw = np.arctan2(a[:, 1, 0], a[:, 0, 0])
+    syx, syy = -np.sin(yaw), np.cos(yaw)
+    roll = np.arctan2(a[:, 0, 2] * syx + a[:, 1, 2] * syy, a[:, 0, 1] * syx + a[:, 1, 1] * syy)
+    new_rot = np.degrees(np.stack((roll, pitch, yaw), axis=1))
+
+    return (
+        new_pos.ravel().tolist(),
+        new_rot.ravel().tolist(),
+        lengths.ravel().tolist() if scales else None
+    )
+
+
+def rotation_matrix(rot: _mat.TupleVec3) -> _mat.Matrix3:
+    """Matrix of a rotation expressed like brick rotations. See vhelper.mat.euler_to_mat3."""
+    return _mat.euler_to_mat3(rot)
+
+
+def scale_matrix(factors: _mat.TupleVec3) -> _mat.Matrix3:
+    """Matrix scaling along the x, y and z axes by `factors`."""
+    return ((factors[0], 0.0, 0.0), (0.0, factors[1], 0.0), (0.0, 0.0, factors[2]))
+
+
+def mirror_matrix(normal: _mat.TupleVec3) -> _mat.Matrix3:
+    """Matrix of the reflection across the plane of normal `normal` going through the origin."""
+    nx, ny, nz = normal
+    inv_sq = 2.0 / (nx * nx + ny * ny + nz * nz)
+    return (
+        (1.0 - inv_sq * nx * nx, -inv_sq * nx * ny, -inv_sq * nx * nz),
+        (-inv_sq * ny * nx, 1.0 - inv_sq * ny * ny, -inv_sq * ny * nz),
+        (-inv_sq * nz * nx, -inv_sq * nz * ny, 1.0 - inv_sq * nz * nz),
+    )
+
+
+def pivot_translation(m: _mat.Matrix3, origin: _mat.TupleVec3) -> _mat.TupleVec3:
+    """Translation to apply after `m` so that it is applied around `origin` instead of (0, 0, 0)."""
+    mx, my, mz = _mat.mul_mat3_vec3(m, origin)
+    return (origin[0] - mx, origin[1] - my, origin[2] - mz)
@@ -1,4 +1,4 @@
-from typing import Self
+from typing import Self, Iterable
 from math import sqrt
 from dataclasses import dataclass
 from abc import ABC, abstractmethod
@@ -83,6 +83,34 @@ class Vec2(Vec):
     x: float
     y: float
 
+    @classmethod
+    def list_from_floats(cls, floats: Iterable[float]) -> list[Self]:
+        """
+        Builds vectors from consecutive x, y components, e.g. unpacked from a file.
+        Faster than calling the constructor for each vector.
+
+        Args:
+            floats (Iterable[float]): Components, 2 per vector.
+
+        Returns:
+            list[Self]: The vectors.
+        """
+        it = iter(floats)
+        if cls is not Vec2:
+            return [cls(x, y) for x, y in zip(it, it)]
+
+        # Set the slots directly: the __init__ of frozen dataclasses uses object.__setattr__
+        new = object.__new__
+        set_x, set_y = Vec2.x.__set__, Vec2.y.__set__
+        vectors = []
+        append = vectors.append
+        for x, y in zip(it, it):
+            v = new(Vec2)
+            set_x(v, x)
+            set_y(v, y)
+            append(v)
+        return vectors
+
     def as_tuple(self) -> tuple[float, float]:
         return (self.x, self.y)
 
@@ -143,6 +171,35 @@ class Vec3(Vec):
     y: float
     z: float
 
+    @classmethod
+    def list_from_floats(cls, floats: Iterable[float]) -> list[Self]:
+        """
+        Builds vectors from consecutive x, y, z components, e.g. unpacked from a file.
+        Faster than calling the constructor for each vector.
+
+        Args:
+            floats (Iterable[float]): Components, 3 per vector.
+
+        Returns:
+            list[Self]: The vectors.
+        """
+        it = iter(floats)
+        if cls is not Vec3:
+            return [cls(x, y, z) for x, y, z in zip(it, it, it)]
+
+        # Set the slots directly: the __init__ of frozen dataclasses uses object.__setattr__
+        new = object.__new__
+        set_x, set_y, set_z = Vec3.x.__set__, Vec3.y.__set__, Vec3.z.__set__
+        vectors = []
+        append = vectors.append
+        for x, y, z in zip(it, it, it):
+            v = new(Vec3)
+            set_x(v, x)
+            set_y(v, y)
+            set_z(v, z)
+            append(v)
+        return vectors
+
     def as_tuple(self) -> tuple[float, float, float]:
         return (self.x, self.y, self.z)
 
@@ -6,6 +6,8 @@ All operations are specialized for 3x3 matrices and 3-element vectors
 for performance and simplicity.
 """
 
+from math import sin, cos, atan2, hypot, radians, degrees, sqrt, copysign
+
 
 TupleVec3 = tuple[float, float, float]
 Matrix3 = tuple[TupleVec3, TupleVec3, TupleVec3]
@@ -67,3 +69,114 @@ def inv_mat3(m: Matrix3) -> Matrix3:
             (m[0][0] * m[1][1] - m[0][1] * m[1][0]) * inv_det,
         ),
     )
+
+def mul_mat3(a: Matrix3, b: Matrix3) -> Matrix3:
+    """Multiply two 3x3 matrices.
+
+    Args:
+        a (Matrix3): Left matrix.
+        b (Matrix3): Right matrix.
+
+    Returns:
+        Matrix3: a @ b.
+    """
+    a0, a1, a2 = a
+    b0, b1, b2 = b
+    return (
+        (
+            a0[0] * b0[0] + a0[1] * b1[0] + a0[2] * b2[0],
+            a0[0] * b0[1] + a0[1] * b1[1] + a0[2] * b2[1],
+            a0[0] * b0[2] + a0[1] * b1[2] + a0[2] * b2[2],
+        ),
+        (
+            a1[0] * b0[0] + a1[1] * b1[0] + a1[2] * b2[0],
+            a1[0] * b0[1] + a1[1] * b1[1] + a1[2] * b2[1],
+            a1[0] * b0[2] + a1[1] * b1[2] + a1[2] * b2[2],
+        ),
+        (
+            a2[0] * b0[0] + a2[1] * b1[0] + a2[2] * b2[0],
+            a2[0] * b0[1] + a2[1] * b1[1] + a2[2] * b2[1],
+            a2[0] * b0[2] + a2[1] * b1[2] + a2[2] * b2[2],
+        ),
+    )
+
+def transpose_mat3(m: Matrix3) -> Matrix3:
+    """Computes the transpose of a 3x3 matrix."""
+    return (
+        (m[0][0], m[1][0], m[2][0]),
+        (m[0][1], m[1][1], m[2][1]),
+        (m[0][2], m[1][2], m[2][2]),
+    )
+
+def euler_to_mat3(rot: TupleVec3) -> Matrix3:
+    """Computes the rotation matrix of a brick rotation.
+
+    Brick rotations are Unreal Engine rotators: x is the roll, y the pitch and z the yaw, in degrees.
+    The columns of the matrix are the local X, Y and Z axes of the brick.
+
+    Args:
+        rot (TupleVec3): Rotation (roll, pitch, yaw) in degrees.
+
+    Returns:
+        Matrix3: Rotation matrix.
+    """
+    roll, pitch, yaw = radians(rot[0]), radians(rot[1]), radians(rot[2])
+    sr, cr = sin(roll), cos(roll)
+    sp, cp = sin(pitch), cos(pitch)
+    sy, cy = sin(yaw), cos(yaw)
+    return (
+        (cp * cy, sr * sp * cy - cr * sy, -(cr * sp * cy + sr * sy)),
+        (cp * sy, sr * sp * sy + cr * cy, cy * sr - cr * sp * sy),
+        (sp, -sr * cp, cr * cp),
+    )
+
+def mat3_to_euler(m: Matrix3) -> TupleVec3:
+    """Computes the brick rotation of a rotation matrix. Inverse of euler_to_mat3.
+
+    Args:
+        m (Matrix3): Rotation matrix, its columns being the local X, Y and Z axes.
+
+    Returns:
+        TupleVec3: Rotation (roll, pitch, yaw) in degrees.
+    """
+    pitch = atan2(m[2][0], hypot(m[0][0], m[1][0]))
+    yaw = atan2(m[1][0], m[0][0])
+    # Y axis of the rotation without roll
+    syx, syy = -sin(yaw), cos(yaw)
+    roll = atan2(m[0][2] * syx + m[1][2] * syy, m[0][1] * syx + m[1][1] * syy)
+    return (degrees(roll), degrees(pitch), degrees(yaw))
+
+def eigen_sym_mat3(m: Matrix3) -> tuple[TupleVec3, Matrix3]:
+    """Computes the eigenvalues and eigenvectors of a symmetric 3x3 matrix (Jacobi method).
+
+    Args:
+        m (Matrix3): Symmetric matrix.
+
+    Returns:
+        tuple[TupleVec3, Matrix3]: Eigenvalues, and the matrix whose columns are the matching
+        unit eigenvectors.
+    """
+    a = [list(row) for row in m]
+    v = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]
+    for _ in range(32):
+        off = a[0][1] ** 2 + a[0][2] ** 2 + a[1][2] ** 2
+        if off <= 1e-30 * (a[0][0] ** 2 + a[1][1] ** 2 + a[2][2] ** 2):
+            break
+        for p, q in ((0, 1), (0, 2), (1, 2)):
+            if a[p][q] == 0.0:
+                continue
+            # Rotation in the (p, q) plane cancelling a[p][q]
+            theta = (a[q][q] - a[p][p]) / (2.0 * a[p][q])
+            t = copysign(1.0, theta) / (abs(theta) + sqrt(theta * theta + 1.0))
+            c = 1.0 / sqrt(t * t + 1.0)
+            s = t * c
+            for k in range(3):
+                akp, akq = a[k][p], a[k][q]
+                a[k][p], a[k][q] = c * akp - s * akq, s * akp + c * akq
+            for k in range(3):
+                apk, aqk = a[p][k], a[q][k]
+                a[p][k], a[q][k] = c * apk - s * aqk, s * apk + c * aqk
+            for k in range(3):
+                vkp, vkq = v[k][p], v[k][q]
+                v[k][p], v[k][q] = c * vkp - s * vkq, s * vkp + c * vkq
+    return (a[0][0], a[1][1], a[2][2]), (tuple(v[0]), tuple(v[1]), tuple(v[2]))